@@ -0,0 +1,351 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+designbench.py
+
+Times the model operations our designs depend on with a headless
+cadnano, on every design in tests/functionaltestinputs or on the designs
+and directories given:
+
+    python benchmarks/designbench.py -o before.json
+    python benchmarks/designbench.py -n 10 --only decode,autobreak designs/
+    python benchmarks/designbench.py --compare before.json after.json
+    python benchmarks/designbench.py --generate 250,500,1000,2000
+
+The benchmarks are decode, encode, scaffold (applying a scaffold
+sequence), autostaple, autobreak, stapleSequences (Part.getStapleSequences)
+and potentialCrossovers (Part.potentialCrossoverList for every helix).
+Before each repetition the design is loaded again, untimed, so that
+operations which change the model always start from the same state.
+
+The json results list, per design and benchmark, the seconds of every
+repetition with their median and variance, along with the python and
+platform they were measured on. --compare prints the ratio of the
+medians in two result files and exits with status 1 if any benchmark got
+slower than --threshold. --generate benchmarks synthetic honeycomb
+designs of the given helix counts (see designgen.py) instead of the test
+designs, to show how each operation scales.
+"""
+
+import sys, os, json, time, gc, platform, traceback, tempfile, shutil
+from StringIO import StringIO
+from optparse import OptionParser
+from timeit import default_timer
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import util
+util.qtFrameworkList = ['Dummy']  # no event loop, so never load a real Qt
+import cadnano
+from cadnanobatch import applyScaffold, findDesigns
+from benchmarks.designgen import generateDesign
+
+defaultDesignDir = os.path.join(cadnano.path(), 'tests', 'functionaltestinputs')
+
+
+def loadDesign(filename):
+    """Returns (document, part) for the design in filename."""
+    from model.document import Document
+    from model.io.decoder import decodeFile
+    document = Document()
+    decodeFile(document, filename)
+    part = document.selectedPart()
+    if part == None:
+        raise ValueError("No part found.")
+    return document, part
+# end def
+
+
+### BENCHMARKS ###
+# each is (name, setup, run): setup(filename, options) is not timed and
+# returns the state passed to run(state), which is timed
+
+def _setupDecode(filename, options):
+    return filename
+
+
+def _runDecode(filename):
+    loadDesign(filename)
+
+
+def _setupLoad(filename, options):
+    return loadDesign(filename)
+
+
+def _runEncode(state):
+    from model.io.encoder import encode
+    document, part = state
+    helixOrderList = part.importedVHelixOrder()
+    if helixOrderList == None:
+        helixOrderList = [vh.coord() for vh in part.getVirtualHelices()]
+    out = StringIO()
+    out.name = "benchmark.json"  # encode records the file name in the design
+    encode(document, helixOrderList, out)
+
+
+def _setupScaffold(filename, options):
+    document, part = loadDesign(filename)
+    return part, options['scaffold']
+
+
+def _runScaffold(state):
+    part, sequence = state
+    applyScaffold(part, sequence)
+
+
+def _runAutoStaple(state):
+    state[1].autoStaple()
+
+
+def _setupAutoBreak(filename, options):
+    state = loadDesign(filename)
+    autobreak = sys.modules.get('autobreak.autobreak')
+    if autobreak == None:
+        raise ValueError("The autobreak plugin is not loaded.")
+    autobreak.clearTokenCache()  # time solving, not cache lookups
+    return state[1], autobreak.breakStaples, options['autobreak']
+
+
+def _runAutoBreak(state):
+    part, breakStaples, settings = state
+    breakStaples(part, settings)
+
+
+def _setupStapleSequences(filename, options):
+    document, part = loadDesign(filename)
+    applyScaffold(part, options['scaffold'])
+    return part
+
+
+def _runStapleSequences(part):
+    part.getStapleSequences()
+
+
+def _runPotentialCrossovers(state):
+    part = state[1]
+    for vh in part.getVirtualHelices():
+        part.potentialCrossoverList(vh)
+
+
+benchmarks = [("decode", _setupDecode, _runDecode),
+              ("encode", _setupLoad, _runEncode),
+              ("scaffold", _setupScaffold, _runScaffold),
+              ("autostaple", _setupLoad, _runAutoStaple),
+              ("autobreak", _setupAutoBreak, _runAutoBreak),
+              ("stapleSequences", _setupStapleSequences, _runStapleSequences),
+              ("potentialCrossovers", _setupLoad, _runPotentialCrossovers)]
+benchmarkNames = [name for name, setup, run in benchmarks]
+
+
+### MEASURING ###
+def median(values):
+    ordered = sorted(values)
+    n = len(ordered)
+    if n % 2:
+        return ordered[n // 2]
+    return (ordered[n // 2 - 1] + ordered[n // 2]) / 2.
+# end def
+
+
+def variance(values):
+    """The sample variance, 0 for fewer than two values."""
+    n = len(values)
+    if n < 2:
+        return 0.
+    mean = sum(values) / float(n)
+    return sum([(v - mean)**2 for v in values]) / (n - 1)
+# end def
+
+
+def measure(setup, run, filename, options):
+    """Returns the seconds taken by each of options['repeat'] runs."""
+    times = []
+    for i in xrange(options['repeat']):
+        state = setup(filename, options)
+        gc.collect()  # so no run pays for collecting the last one's garbage
+        startTime = default_timer()
+        run(state)
+        times.append(default_timer() - startTime)
+        state = None
+    return times
+# end def
+
+
+def runBenchmarks(filenames, names, options, log=None):
+    """
+    Runs the benchmarks called names on each of filenames and returns a
+    list with one result dict per design and benchmark. log, if given, is
+    called with a line of text after each one.
+    """
+    results = []
+    for filename in filenames:
+        for name, setup, run in benchmarks:
+            if name not in names:
+                continue
+            result = {"design": os.path.basename(filename),
+                      "benchmark": name,
+                      "repeat": options['repeat']}
+            try:
+                times = measure(setup, run, filename, options)
+            except Exception, e:
+                result['error'] = "%s: %s" % (e.__class__.__name__, e)
+                result['traceback'] = traceback.format_exc()
+                line = "error: %s" % result['error']
+            else:
+                result['times'] = [round(t, 6) for t in times]
+                result['median'] = round(median(times), 6)
+                result['variance'] = variance(times)
+                line = "%10.4fs  (sd %.4fs)" % (result['median'],
+                                                 result['variance']**.5)
+            results.append(result)
+            if log != None:
+                log("%-32s %-20s %s" % (result['design'], name, line))
+    return results
+# end def
+
+
+def compareResults(before, after, threshold):
+    """
+    Returns (lines, slower): a text line per benchmark found in both
+    result dicts with the ratio of the medians, and the number of them
+    that took more than threshold times as long after.
+    """
+    old = {}
+    for result in before['results']:
+        if 'median' in result:
+            old[(result['design'], result['benchmark'])] = result['median']
+    lines, slower = [], 0
+    for result in after['results']:
+        key = (result['design'], result['benchmark'])
+        if key not in old or 'median' not in result:
+            continue
+        ratio = result['median'] / max(old[key], 1e-9)
+        flag = ""
+        if ratio > threshold:
+            flag = "  slower"
+            slower += 1
+        lines.append("%-32s %-20s %10.4fs %10.4fs %6.2fx%s" % \
+                     (key[0], key[1], old[key], result['median'], ratio, flag))
+    return lines, slower
+# end def
+
+
+def main(argv=None):
+    parser = OptionParser(usage="%prog [options] [design|directory ...]\n"
+                                "       %prog --compare before.json after.json")
+    parser.add_option("-n", "--repeat", type="int", default=5,
+                      help="repetitions of each benchmark (default: %default)")
+    parser.add_option("--only", default=None,
+                      help="comma separated benchmarks to run, of: " + \
+                           ", ".join(benchmarkNames))
+    parser.add_option("-o", "--output", default="-",
+                      help="where to write the json results (default: stdout)")
+    parser.add_option("--scaffold", metavar="NAME", default="p7308",
+                      help="scaffold sequence from data/dnasequences.py "
+                           "(default: %default)")
+    parser.add_option("--generate", metavar="HELICES", default=None,
+                      help="benchmark synthetic designs of these comma "
+                           "separated helix counts")
+    parser.add_option("--compare", action="store_true", default=False,
+                      help="compare two result files instead of running")
+    parser.add_option("--threshold", type="float", default=1.2,
+                      help="--compare: ratio of the medians counted as "
+                           "slower (default: %default)")
+    opts, args = parser.parse_args(argv)
+
+    if opts.compare:
+        if len(args) != 2:
+            parser.error("--compare needs two result files")
+        with open(args[0]) as f:
+            before = json.load(f)
+        with open(args[1]) as f:
+            after = json.load(f)
+        lines, slower = compareResults(before, after, opts.threshold)
+        for line in lines:
+            print line
+        return 1 if slower else 0
+
+    names = benchmarkNames
+    if opts.only != None:
+        names = [name.strip() for name in opts.only.split(',')]
+        unknown = [name for name in names if name not in benchmarkNames]
+        if unknown:
+            parser.error("unknown benchmark(s) %s" % ", ".join(unknown))
+    if opts.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    from data.dnasequences import sequences
+    if opts.scaffold not in sequences:
+        parser.error("unknown scaffold '%s'" % opts.scaffold)
+    sizes = []
+    if opts.generate != None:
+        try:
+            sizes = [int(n) for n in opts.generate.split(',')]
+        except ValueError:
+            parser.error("--generate takes comma separated helix counts")
+        if [n for n in sizes if n < 1]:
+            parser.error("--generate helix counts must be positive")
+    filenames = []
+    if args or not sizes:
+        filenames = findDesigns(args or [defaultDesignDir])
+        if not filenames:
+            parser.error("no designs found")
+
+    cadnano.initAppWithoutGui()
+    # the plugins and the decoder may print; stdout is kept for the results
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    options = {'repeat': opts.repeat,
+               'scaffold': sequences[opts.scaffold],
+               'autobreak': {'processes': 1}}
+    def log(line):
+        sys.stderr.write(line + "\n")
+    generatedDir = tempfile.mkdtemp(prefix="designbench") if sizes else None
+    try:
+        for n in sizes:
+            filename = os.path.join(generatedDir, "synthetic%d.json" % n)
+            with open(filename, 'w') as f:
+                f.write(json.dumps(generateDesign(os.path.basename(filename),
+                                                  helices=n)))
+            filenames.append(filename)
+        results = runBenchmarks(filenames, names, options, log)
+    finally:
+        sys.stdout = stdout
+        if generatedDir != None:
+            shutil.rmtree(generatedDir)
+    report = {"python": platform.python_version(),
+              "platform": platform.platform(),
+              "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "repeat": opts.repeat,
+              "scaffold": opts.scaffold,
+              "generated": sizes,
+              "results": results}
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if opts.output == "-":
+        print text
+    else:
+        with open(opts.output, 'w') as f:
+            f.write(text + "\n")
+    return 1 if [r for r in results if 'error' in r] else 0
+# end def
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,464 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+designgen.py
+
+Generates large synthetic designs for stress testing, as legacy json that
+any cadnano opens:
+
+    python benchmarks/designgen.py --helices 1000 --length 504 -o big.json
+    python benchmarks/designgen.py --lattice square --helices 2000 \
+                                   --routing helix --skips .01 -o sq.json
+
+The helices fill rows of an even number of columns in the order a raster
+scaffold visits them: along the first row, back along the second and so
+on, so that consecutive helices are lattice neighbors of opposite parity.
+The scaffold routing is one of
+
+    raster  one scaffold through every helix, joined at alternating ends
+    pairs   one scaffold per two consecutive helices
+    helix   one scaffold per helix
+
+Staples pair with every scaffold base. Each two neighboring helices get a
+staple double crossover at each of the lattice's staple crossover sites
+with probability --staple-density, except near the helix ends, where
+they would make short staples. Staples that close into a loop are
+opened, and all are then broken into pieces of about --break-length
+bases, away from crossovers. The fraction --long-staples of them is left
+two to four times as long, for autobreak to split. Insertions and skips go
+on the given fractions of the bases that are not at a crossover or a
+strand end.
+
+Legacy json stores no sequences, so the fraction of each scaffold given a
+random sequence (coverage) only applies to designs loaded with
+buildDesign. The same parameters and seed always give the same design.
+"""
+
+import sys, os, json
+from math import ceil, sqrt
+from optparse import OptionParser
+from random import Random
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import util
+util.qtFrameworkList = ['Dummy']  # no event loop, so never load a real Qt
+import cadnano
+from model.enum import LatticeType
+from model.parts.honeycombpart import HoneycombPart
+from model.parts.squarepart import SquarePart
+
+# per lattice: the part class and, in the order of its
+# getVirtualHelixNeighbors, the (row, col) offsets of the neighbors of an
+# even parity helix, which index the part's crossover tables
+lattices = {'honeycomb': (HoneycombPart, [(0, 1), (-1, 0), (0, -1)]),
+            'square': (SquarePart, [(0, 1), (1, 0), (0, -1), (-1, 0)])}
+routings = ('raster', 'pairs', 'helix')
+defaults = {'helices': 500,
+            'length': 252,
+            'lattice': 'honeycomb',
+            'columns': None,
+            'routing': 'raster',
+            'stapleDensity': 1.,
+            'breakLength': 42,
+            'longStaples': .1,
+            'insertions': 0.,
+            'skips': 0.,
+            'seed': 0}
+
+
+### STRAND ARRAYS ###
+# a legacy strand array has one [5'vh, 5'idx, 3'vh, 3'idx] entry per base,
+# -1 where there is no neighbor; arrays maps helix numbers to arrays
+
+def _strandArray(num, length, increasing):
+    """A strand covering every base of helix num, 5' to 3' in increasing idx."""
+    step = 1 if increasing else -1
+    array = [[num, i - step, num, i + step] for i in xrange(length)]
+    first, last = (0, length - 1) if increasing else (length - 1, 0)
+    array[first][0:2] = [-1, -1]
+    array[last][2:4] = [-1, -1]
+    return array
+# end def
+
+
+def _link(arrays, num5p, idx5p, num3p, idx3p):
+    arrays[num5p][idx5p][2:4] = [num3p, idx3p]
+    arrays[num3p][idx3p][0:2] = [num5p, idx5p]
+# end def
+
+
+def _unlink(arrays, num, idx5p, idx3p):
+    arrays[num][idx5p][2:4] = [-1, -1]
+    arrays[num][idx3p][0:2] = [-1, -1]
+# end def
+
+
+def _idx5p(arrays, num, idx):
+    """
+    Returns whichever of idx and idx+1 is on the 5' side of the bond
+    between them on helix num, or None if they are not bonded.
+    """
+    if arrays[num][idx][2:4] == [num, idx + 1]:
+        return idx
+    if arrays[num][idx + 1][2:4] == [num, idx]:
+        return idx + 1
+    return None
+# end def
+
+
+def _isCrossover(entry, num):
+    return entry[0] not in (-1, num) or entry[2] not in (-1, num)
+# end def
+
+
+def _doubleCrossover(arrays, numA, numB, idx):
+    """
+    Joins helices numA and numB, whose strands run in opposite directions,
+    with crossovers at idx and idx+1. Returns False, changing nothing, if
+    either strand is not continuous there.
+    """
+    idxA, idxB = _idx5p(arrays, numA, idx), _idx5p(arrays, numB, idx)
+    if idxA == None or idxB == None or idxA == idxB:
+        return False
+    _unlink(arrays, numA, idxA, 2*idx + 1 - idxA)
+    _unlink(arrays, numB, idxB, 2*idx + 1 - idxB)
+    _link(arrays, numA, idxA, numB, idxA)
+    _link(arrays, numB, idxB, numA, idxB)
+    return True
+# end def
+
+
+def _canBreak(path, k):
+    """
+    True if path, the bases of a staple as (num, idx), can be broken
+    between path[k] and path[k+1] leaving two bases on that helix on
+    either side. Indices wrap around, for loops.
+    """
+    n = len(path)
+    num = path[k % n][0]
+    return path[(k - 1) % n][0] == num and path[(k + 1) % n][0] == num and \
+           path[(k + 2) % n][0] == num
+# end def
+
+
+def _staplePaths(arrays):
+    """
+    Returns (paths, loops): the bases of each staple as (num, idx), 5' to
+    3', for the staples that have ends and for those closed into a loop.
+    """
+    visited = dict((num, [False]*len(array)) for num, array in arrays.iteritems())
+
+    def trace(num, idx):
+        path = []
+        while num != -1 and not visited[num][idx]:
+            visited[num][idx] = True
+            path.append((num, idx))
+            num, idx = arrays[num][idx][2:4]
+        return path
+    # end def
+
+    paths, loops = [], []
+    for num in sorted(arrays):
+        for idx, entry in enumerate(arrays[num]):
+            if entry[0] == -1 and not visited[num][idx]:
+                paths.append(trace(num, idx))
+    for num in sorted(arrays):
+        for idx in xrange(len(arrays[num])):
+            if not visited[num][idx]:
+                loops.append(trace(num, idx))
+    return paths, loops
+# end def
+
+
+def _pieceLengths(breakLength):
+    """The (shortest, longest) staple pieces made for breakLength."""
+    lo = max(1, int(round(.75*breakLength)))
+    return lo, max(lo, int(round(1.2*breakLength)))
+# end def
+
+
+def _breakStaples(arrays, breakLength, longStaples, rng):
+    """
+    Opens every staple loop and breaks the staples into pieces of about
+    breakLength bases, see _pieceLengths. A fraction longStaples of the
+    pieces are left two to four times that long, for autobreak to split.
+    """
+    lo, hi = _pieceLengths(breakLength)
+    paths, loops = _staplePaths(arrays)
+    for path in loops:
+        ks = [k for k in xrange(len(path)) if _canBreak(path, k)]
+        if not ks:
+            continue  # too short to open; the loaders accept loops
+        k = rng.choice(ks)
+        (num, idx5p), (num, idx3p) = path[k], path[(k + 1) % len(path)]
+        _unlink(arrays, num, idx5p, idx3p)
+        paths.append(path[k + 1:] + path[:k + 1])
+    for path in paths:
+        start = 0
+        while True:
+            if rng.random() < longStaples:
+                target = rng.randint(2*hi, 4*hi)
+            else:
+                target = rng.randint(lo, hi)
+            if len(path) - start < target + lo:
+                break  # too little left for another piece
+            # the breakable bond nearest to the target, looking further
+            # out once the range of piece lengths is exhausted
+            k, first, last = None, start + lo - 1, len(path) - lo - 1
+            for d in xrange(len(path)):
+                for c in (start + target - 1 + d, start + target - 1 - d):
+                    if first <= c <= last and _canBreak(path, c):
+                        k = c
+                        break
+                if k != None or (start + target - 1 - d < first and \
+                                 start + target - 1 + d > last):
+                    break
+            if k == None:
+                break
+            (num, idx5p), (num, idx3p) = path[k], path[k + 1]
+            _unlink(arrays, num, idx5p, idx3p)
+            start = k + 1
+# end def
+
+
+### GENERATOR ###
+def layout(helices, columns=None):
+    """
+    Returns the (row, col) of each of helices helices in raster order,
+    columns wide (rounded up to even).
+    """
+    if columns == None:
+        columns = int(ceil(sqrt(helices)))
+    columns = max(2, columns + columns % 2)
+    coords = []
+    for k in xrange(helices):
+        row, c = divmod(k, columns)
+        coords.append((row, c if row % 2 == 0 else columns - 1 - c))
+    return coords
+# end def
+
+
+def generateDesign(name="synthetic", **params):
+    """
+    Returns the legacy json dict of a synthetic design. params override
+    the entries of defaults; length is rounded up to whole lattice steps.
+    """
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise TypeError("Unknown parameter(s) %s" % ", ".join(sorted(unknown)))
+    p = dict(defaults)
+    p.update(params)
+    if p['lattice'] not in lattices:
+        raise ValueError("Unknown lattice '%s'" % p['lattice'])
+    if p['routing'] not in routings:
+        raise ValueError("Unknown routing '%s'" % p['routing'])
+    if p['helices'] < 1 or p['length'] < 1 or p['breakLength'] < 1:
+        raise ValueError("helices, length and breakLength must be positive")
+    if not 0 <= p['longStaples'] <= 1:
+        raise ValueError("longStaples must be between 0 and 1")
+    rng = Random(p['seed'])
+    partClass, neighborOffsets = lattices[p['lattice']]
+    step = partClass._step
+    length = int(ceil(p['length'] / float(step))) * step
+
+    coords = layout(p['helices'], p['columns'])
+    nums, nextNum = [], [0, 1]
+    for row, col in coords:
+        odd = (row % 2) ^ (col % 2)
+        nums.append(nextNum[odd])
+        nextNum[odd] += 2
+    numAt = dict(zip(coords, nums))
+    scaf, stap = {}, {}
+    for num in nums:
+        scaf[num] = _strandArray(num, length, num % 2 == 0)
+        stap[num] = _strandArray(num, length, num % 2 == 1)
+
+    # scaffold crossovers between consecutive helices, at the 3' end
+    # of the first
+    if p['routing'] != 'helix':
+        joinEvery = 1 if p['routing'] == 'raster' else 2
+        for k in xrange(0, len(nums) - 1, joinEvery):
+            idx = length - 1 if nums[k] % 2 == 0 else 0
+            _link(scaf, nums[k], idx, nums[k + 1], idx)
+
+    # staple crossovers between every two neighbors, seen from the even one,
+    # none so close to the helix ends that they make a short staple there
+    margin = _pieceLengths(p['breakLength'])[0] // 2
+    for (row, col), num in zip(coords, nums):
+        if num % 2:
+            continue
+        for direction, (dRow, dCol) in enumerate(neighborOffsets):
+            neighbor = numAt.get((row + dRow, col + dCol))
+            if neighbor == None:
+                continue
+            for offset in partClass._stapL[direction]:
+                for idx in xrange(offset, length - 1, step):
+                    if rng.random() < p['stapleDensity'] and \
+                            margin <= idx < length - 1 - margin:
+                        _doubleCrossover(stap, num, neighbor, idx)
+    _breakStaples(stap, p['breakLength'], p['longStaples'], rng)
+
+    from views import styles
+    colors = [int(c.name()[1:], 16) for c in styles.stapColors]
+    fraction = p['insertions'] + p['skips']
+    vstrands = []
+    for (row, col), num in zip(coords, nums):
+        scafArray, stapArray = scaf[num], stap[num]
+        loop, skip = [0]*length, [0]*length
+        if fraction > 0:
+            for i in xrange(length):
+                x = rng.random()
+                if x >= fraction or \
+                        -1 in scafArray[i] or _isCrossover(scafArray[i], num) or \
+                        -1 in stapArray[i] or _isCrossover(stapArray[i], num):
+                    continue
+                if x < p['insertions']:
+                    loop[i] = 1
+                else:
+                    skip[i] = -1
+        stapColors = [[i, rng.choice(colors)] for i in xrange(length) \
+                                              if stapArray[i][0] == -1]
+        vstrands.append({"row": row,
+                         "col": col,
+                         "num": num,
+                         "scaf": scafArray,
+                         "stap": stapArray,
+                         "loop": loop,
+                         "skip": skip,
+                         "scafLoop": [],
+                         "stapLoop": [],
+                         "stap_colors": stapColors})
+    return {"name": name, "vstrands": vstrands}
+# end def
+
+
+def applySequences(part, coverage, seed=0):
+    """
+    Gives the first coverage (0 to 1) of each scaffold oligo of part a
+    random sequence. Returns the number of bases set.
+    """
+    rng = Random(seed)
+    scaffolds = [o for o in part.oligos() if not o.isStaple()]
+    scaffolds.sort(key=lambda o: (o.strand5p().virtualHelix().number(),
+                                  o.strand5p().idx5Prime()))
+    total = 0
+    for oligo in scaffolds:
+        count = int(round(coverage * oligo.length()))
+        if count > 0:
+            sequence = ''.join([rng.choice('ACGT') for i in xrange(count)])
+            oligo.applySequence(sequence, useUndoStack=False)
+            total += count
+    return total
+# end def
+
+
+def buildDesign(document, coverage=0., **params):
+    """
+    Generates a design with params, see generateDesign, into document and
+    applies random scaffold sequence to the fraction coverage of it.
+    Returns the part.
+    """
+    from model.io.legacydecoder import import_legacy_dict
+    obj = generateDesign(**params)
+    if params.get('lattice', defaults['lattice']) == 'square':
+        latticeType = LatticeType.Square
+    else:
+        latticeType = LatticeType.Honeycomb
+    import_legacy_dict(document, obj, latticeType=latticeType)
+    part = document.selectedPart()
+    if coverage > 0:
+        applySequences(part, coverage, params.get('seed', defaults['seed']))
+    return part
+# end def
+
+
+def main(argv=None):
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("--helices", type="int", default=defaults['helices'],
+                      help="number of helices (default: %default)")
+    parser.add_option("--length", type="int", default=defaults['length'],
+                      help="bases per helix, rounded up to whole lattice "
+                           "steps (default: %default)")
+    parser.add_option("--lattice", type="choice", choices=sorted(lattices),
+                      default=defaults['lattice'],
+                      help="honeycomb or square (default: %default)")
+    parser.add_option("--columns", type="int", default=None,
+                      help="helices per row, rounded up to even "
+                           "(default: about the square root of --helices)")
+    parser.add_option("--routing", type="choice", choices=routings,
+                      default=defaults['routing'],
+                      help="scaffold routing: " + ", ".join(routings) + \
+                           " (default: %default)")
+    parser.add_option("--staple-density", type="float",
+                      default=defaults['stapleDensity'],
+                      help="fraction of staple crossover sites used "
+                           "(default: %default)")
+    parser.add_option("--break-length", type="int",
+                      default=defaults['breakLength'],
+                      help="typical staple length (default: %default)")
+    parser.add_option("--long-staples", type="float",
+                      default=defaults['longStaples'],
+                      help="fraction of staples left two to four times "
+                           "--break-length long (default: %default)")
+    parser.add_option("--insertions", type="float",
+                      default=defaults['insertions'],
+                      help="fraction of bases with an insertion "
+                           "(default: %default)")
+    parser.add_option("--skips", type="float", default=defaults['skips'],
+                      help="fraction of bases skipped (default: %default)")
+    parser.add_option("--seed", type="int", default=defaults['seed'],
+                      help="random seed (default: %default)")
+    parser.add_option("-o", "--output", default="-",
+                      help="where to write the json (default: stdout)")
+    opts, args = parser.parse_args(argv)
+    if args:
+        parser.error("unexpected arguments %s" % " ".join(args))
+    if opts.insertions + opts.skips > 1:
+        parser.error("--insertions and --skips add up to more than 1")
+
+    name = "synthetic" if opts.output == "-" else os.path.basename(opts.output)
+    try:
+        obj = generateDesign(name, helices=opts.helices, length=opts.length,
+                             lattice=opts.lattice, columns=opts.columns,
+                             routing=opts.routing,
+                             stapleDensity=opts.staple_density,
+                             breakLength=opts.break_length,
+                             longStaples=opts.long_staples,
+                             insertions=opts.insertions, skips=opts.skips,
+                             seed=opts.seed)
+    except ValueError, e:
+        parser.error(str(e))
+    # dumps, unlike dump, uses the C encoder
+    text = json.dumps(obj, separators=(',', ':'))
+    if opts.output == "-":
+        print text
+    else:
+        with open(opts.output, 'w') as f:
+            f.write(text)
+    return 0
+# end def
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -33,6 +33,9 @@ from glob import glob
 from code import interact
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))+"/include")
+# the headless app never talks to a real Qt event loop, so its signals
+# always come from the dummy framework
+from dummyqt.QtCore import pyqtSignal
 
 global sharedApp
 sharedApp = None
@@ -44,11 +47,23 @@ def ignoreEnv():
 
 class HeadlessCadnano(object):
     undoGroup = None
+    dontAskAndJustDiscardUnsavedChanges = True
+    documentWasCreatedSignal = pyqtSignal(object)  # doc
+    documentWindowWasCreatedSignal = pyqtSignal(object, object)  # doc, window
+
+    def __init__(self):
+        self.documentControllers = set()  # stays empty without a gui
+        self.activeDocument = None
+
     def isInMaya(self):
         return False
     class prefs():
+        honeycombRows = 30
+        honeycombCols = 32
+        honeycombSteps = 2
         squareRows = 50
         squareCols = 50
+        squareSteps = 2
     def isGui(self):
         return False
 # end def
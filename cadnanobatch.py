@@ -0,0 +1,407 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+cadnanobatch.py
+
+Exports staple csv files, runs autostaple and autobreak, and converts
+designs without opening the gui.
+
+    python cadnanobatch.py --csv --scaffold p7308 designs/
+    python cadnanobatch.py --convert .json.gz -o packed/ a.json b.json
+    python cadnanobatch.py --autostaple --autobreak --max-len 45 \
+                           --csv --convert .json -o broken/ designs/
+
+Each design is decoded by a headless cadnano in a pool of worker
+processes (one per core by default). The csv files are the bytes Export
+Staples writes for the same design. A json summary with one entry per
+design (status, outputs, staple count, seconds per stage, error) goes to
+stdout or to --summary. The exit status is 1 if any design failed.
+
+The stages run in the order load, autostaple, scaffold, autobreak, save
+and export, so a design is saved even if staple loops prevent its export.
+Autobreak settings come from --autobreak-settings, a json file of
+breakStaples settings such as {"maxStapleLen": 45}, overridden by the
+individual flags.
+"""
+
+import sys, os, json, time, signal, traceback, multiprocessing
+from math import ceil
+from optparse import OptionParser
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import util
+util.qtFrameworkList = ['Dummy']  # no event loop, so never load a real Qt
+import cadnano
+
+designSuffixes = ('.json', '.nno', '.cadnano')
+compressedSuffixes = ('.gz', '.gzip', '.bz2', '.zz', '.zlib', '.xz')
+
+
+class BatchError(Exception):
+    """A design that can be read but not exported, e.g. staple loops."""
+    pass
+
+
+class BatchTimeout(Exception):
+    pass
+
+
+def isDesignFile(filename):
+    name = filename.lower()
+    for suffix in compressedSuffixes:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return name.endswith(designSuffixes)
+# end def
+
+
+def findDesigns(paths):
+    """Expands directories (recursively) into the design files they hold."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for fname in sorted(filenames):
+                    if isDesignFile(fname):
+                        found.append(os.path.join(dirpath, fname))
+        else:
+            found.append(path)
+    return found
+# end def
+
+
+def outputFilename(filename, outdir, suffix):
+    """design.json.gz + .csv -> design.csv, in outdir if given."""
+    from model.io.compression import uncompressedFilename
+    base = os.path.splitext(uncompressedFilename(filename))[0]
+    if outdir:
+        base = os.path.join(outdir, os.path.basename(base))
+    return base + suffix
+# end def
+
+
+def parseBaseRef(ref):
+    """'12[34]' -> (12, 34)"""
+    vhNum, idx = ref.rstrip(']').split('[')
+    return int(vhNum), int(idx)
+# end def
+
+
+def applyScaffold(part, sequence, startRef=None):
+    """
+    Applies sequence to the scaffold oligo starting at startRef
+    (vhNum, idx), or to every scaffold oligo if startRef is None.
+    """
+    if startRef != None:
+        vhNum, idx = startRef
+        for vh in part.getVirtualHelices():
+            if vh.number() == vhNum:
+                strand = vh.scaffoldStrandSet().getStrand(idx)
+                if strand == None or strand.oligo() == None:
+                    break
+                strand.oligo().applySequence(sequence, useUndoStack=False)
+                return
+        raise BatchError("No scaffold at %d[%d]." % (vhNum, idx))
+    for oligo in list(part.oligos()):
+        if not oligo.isStaple():
+            oligo.applySequence(sequence, useUndoStack=False)
+# end def
+
+
+def _lap(timings, stage, startTime):
+    """Adds the time since startTime to timings[stage] and returns now."""
+    now = time.time()
+    timings[stage] = round(timings.get(stage, 0.) + now - startTime, 3)
+    return now
+# end def
+
+
+def _alarmSlot(signum, frame):
+    raise BatchTimeout()
+
+
+def initWorker():
+    # plugins and the decoder may print; stdout is kept for the summary
+    sys.stdout = sys.stderr
+    cadnano.initAppWithoutGui()
+
+
+def processDesign(job):
+    """
+    Runs in a worker process. job is (filename, options dict) and the
+    return value is the summary entry for filename.
+    """
+    from model.document import Document
+    from model.io.decoder import decodeFile
+    from model.io.encoder import encode
+    from model.io.compression import openDesignFile
+    from model.io.stapleexport import writeStapleCsv, writePlateLayout
+    filename, options = job
+    result = {"file": filename, "status": "ok", "outputs": [], "timings": {}}
+    timings = result['timings']
+    startTime = lapTime = time.time()
+    timeout = options['timeout']
+    useAlarm = timeout and hasattr(signal, 'SIGALRM')
+    if useAlarm:
+        signal.signal(signal.SIGALRM, _alarmSlot)
+        signal.alarm(int(ceil(timeout)))
+    try:
+        document = Document()
+        decodeFile(document, filename)
+        part = document.selectedPart()
+        if part == None:
+            raise BatchError("No part found.")
+        lapTime = _lap(timings, 'load', lapTime)
+        if options['autostaple']:
+            part.autoStaple()
+            lapTime = _lap(timings, 'autostaple', lapTime)
+        if options['scaffold'] != None:
+            applyScaffold(part, options['scaffold'], options['scaffoldStart'])
+            lapTime = _lap(timings, 'scaffold', lapTime)
+        if options['autobreak'] != None:
+            breakStaples = getattr(cadnano.app(), 'breakStaples', None)
+            if breakStaples == None:
+                raise BatchError("The autobreak plugin is not loaded.")
+            breakStaples(part, options['autobreak'])
+            lapTime = _lap(timings, 'autobreak', lapTime)
+            result['staples'] = len([o for o in part.oligos() if o.isStaple()])
+            if options['scaffold'] != None:
+                # breaks do not carry sequence over to the new staples
+                applyScaffold(part, options['scaffold'],
+                              options['scaffoldStart'])
+                lapTime = _lap(timings, 'scaffold', lapTime)
+        if options['convert']:
+            designName = outputFilename(filename, options['outdir'],
+                                        options['convert'])
+            if os.path.abspath(designName) == os.path.abspath(filename):
+                raise BatchError("Refusing to overwrite the input file.")
+            helixOrderList = part.importedVHelixOrder()
+            if helixOrderList == None:
+                helixOrderList = [vh.coord() for vh in part.getVirtualHelices()]
+            with openDesignFile(designName, 'w') as f:
+                encode(document, helixOrderList, f)
+            result['outputs'].append(designName)
+            lapTime = _lap(timings, 'save', lapTime)
+        if options['csv'] or options['plateSize']:
+            # same validation as actionExportStaplesSlot
+            stapLoopOlgs = part.getStapleLoopOligos()
+            if stapLoopOlgs:
+                locs = ", ".join([o.locString() for o in stapLoopOlgs])
+                raise BatchError("Part contains staple loop(s) at %s." % locs)
+        if options['csv']:
+            csvName = outputFilename(filename, options['outdir'], '.csv')
+            with open(csvName, 'w') as f:
+                result['staples'] = writeStapleCsv(part, f, options['sortBy'])
+            result['outputs'].append(csvName)
+        if options['plateSize']:
+            plateName = outputFilename(filename, options['outdir'],
+                                       '_plates.csv')
+            with open(plateName, 'w') as f:
+                writePlateLayout(part, f, options['sortBy'],
+                                 options['plateSize'],
+                                 os.path.basename(outputFilename(filename,
+                                                            None, '')))
+            result['outputs'].append(plateName)
+        if options['csv'] or options['plateSize']:
+            lapTime = _lap(timings, 'export', lapTime)
+    except BatchTimeout:
+        result['status'] = "timeout"
+        result['error'] = "Took longer than %gs." % timeout
+    except Exception, e:
+        result['status'] = "error"
+        result['error'] = "%s: %s" % (e.__class__.__name__, e)
+        if not isinstance(e, BatchError):
+            result['traceback'] = traceback.format_exc()
+    finally:
+        if useAlarm:
+            signal.alarm(0)
+    result['seconds'] = round(time.time() - startTime, 3)
+    return result
+# end def
+
+
+def autobreakSettings(filename=None, overrides=None):
+    """
+    Returns the breakStaples settings read from the json file filename,
+    updated with overrides (a dict, None values ignored). The design
+    workers are already a pool, so autobreak solves in-process unless the
+    settings ask for more processes.
+    """
+    settings = {'processes': 1}
+    if filename != None:
+        with open(filename) as f:
+            fileSettings = json.load(f)
+        if not isinstance(fileSettings, dict):
+            raise ValueError("%s does not hold a json object." % filename)
+        for key, value in fileSettings.iteritems():
+            settings[str(key)] = value
+    for key, value in (overrides or {}).iteritems():
+        if value != None:
+            settings[key] = value
+    return settings
+# end def
+
+
+def runBatch(filenames, options, processes=None):
+    """
+    Processes filenames on a pool of processes and returns the list of
+    summary entries, in the order of filenames. A design that hangs past
+    its timeout without the worker noticing (no SIGALRM, e.g. on Windows)
+    is reported as a timeout and its worker is killed with the pool.
+    """
+    if processes == None:
+        processes = multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes, initWorker)
+    pending = [(f, pool.apply_async(processDesign, ((f, options),)))
+               for f in filenames]
+    results = []
+    hung = False
+    grace = options['timeout'] + 5 if options['timeout'] else None
+    for filename, asyncResult in pending:
+        try:
+            results.append(asyncResult.get(grace))
+        except multiprocessing.TimeoutError:
+            hung = True
+            results.append({"file": filename, "status": "timeout",
+                            "outputs": [],
+                            "error": "Worker did not return in %gs." % grace})
+    if hung:
+        pool.terminate()
+    else:
+        pool.close()
+    pool.join()
+    return results
+# end def
+
+
+def main(argv=None):
+    parser = OptionParser(usage="%prog [options] design|directory ...")
+    parser.add_option("--csv", action="store_true", default=False,
+                      help="export staple sequences to <design>.csv")
+    parser.add_option("--sort", dest="sortBy", default="5p",
+                      choices=["5p", "length", "color"],
+                      help="staple order: 5p (helix and index of the 5' end), "
+                           "length or color (default: %default)")
+    parser.add_option("--plates", dest="plateSize", type="choice",
+                      choices=["96", "384"], default=None,
+                      help="also write a plate layout, <design>_plates.csv")
+    parser.add_option("--convert", metavar="SUFFIX", default=None,
+                      help="re-encode each design to <design>SUFFIX, e.g. "
+                           ".json or .json.gz")
+    parser.add_option("-o", "--outdir", default=None,
+                      help="write outputs here instead of next to the inputs")
+    parser.add_option("--scaffold", metavar="NAME", default=None,
+                      help="scaffold sequence to apply before exporting, "
+                           "a name from data/dnasequences.py or a file")
+    parser.add_option("--scaffold-start", metavar="VH[IDX]", default=None,
+                      help="only apply the scaffold to the oligo at VH[IDX]")
+    parser.add_option("-j", "--jobs", type="int", default=None,
+                      help="worker processes (default: one per core)")
+    parser.add_option("-t", "--timeout", type="float", default=300.,
+                      help="seconds allowed per design, 0 for no limit "
+                           "(default: %default)")
+    parser.add_option("--summary", default="-",
+                      help="where to write the json summary (default: stdout)")
+    parser.add_option("--autostaple", action="store_true", default=False,
+                      help="run autostaple after loading each design")
+    parser.add_option("--autobreak", action="store_true", default=False,
+                      help="break the staples with the autobreak plugin")
+    parser.add_option("--autobreak-settings", metavar="FILE", default=None,
+                      help="json file of autobreak settings, implies "
+                           "--autobreak")
+    parser.add_option("--min-leg", type="int", default=None,
+                      help="autobreak: minimum bases next to a crossover")
+    parser.add_option("--min-len", type="int", default=None,
+                      help="autobreak: minimum staple length")
+    parser.add_option("--max-len", type="int", default=None,
+                      help="autobreak: maximum staple length")
+    parser.add_option("--tgt-len", type="int", default=None,
+                      help="autobreak: target staple length")
+    parser.add_option("--scorer", default=None,
+                      help="autobreak: staple scorer, e.g. tgtLength or nnTm "
+                           "(needs --scaffold)")
+    opts, args = parser.parse_args(argv)
+    if not args:
+        parser.error("no designs given")
+    if not (opts.csv or opts.convert or opts.plateSize or opts.autostaple
+            or opts.autobreak or opts.autobreak_settings):
+        parser.error("nothing to do, give --csv, --plates, --convert, "
+                     "--autostaple and/or --autobreak")
+
+    scaffold = None
+    if opts.scaffold != None:
+        from data.dnasequences import sequences
+        if opts.scaffold in sequences:
+            scaffold = sequences[opts.scaffold]
+        elif os.path.isfile(opts.scaffold):
+            with open(opts.scaffold) as f:
+                scaffold = "".join(f.read().split())
+        else:
+            parser.error("unknown scaffold '%s'" % opts.scaffold)
+    breakSettings = None
+    if opts.autobreak or opts.autobreak_settings:
+        overrides = {'minStapleLegLen': opts.min_leg,
+                     'minStapleLen': opts.min_len,
+                     'maxStapleLen': opts.max_len,
+                     'tgtStapleLen': opts.tgt_len,
+                     'stapleScorer': opts.scorer}
+        try:
+            breakSettings = autobreakSettings(opts.autobreak_settings,
+                                              overrides)
+        except (IOError, ValueError), e:
+            parser.error("bad autobreak settings: %s" % e)
+    if opts.outdir and not os.path.isdir(opts.outdir):
+        os.makedirs(opts.outdir)
+    options = {'csv': opts.csv,
+               'sortBy': opts.sortBy,
+               'plateSize': int(opts.plateSize) if opts.plateSize else None,
+               'convert': opts.convert,
+               'outdir': opts.outdir,
+               'scaffold': scaffold,
+               'scaffoldStart': parseBaseRef(opts.scaffold_start)\
+                                if opts.scaffold_start else None,
+               'autostaple': opts.autostaple,
+               'autobreak': breakSettings,
+               'timeout': opts.timeout}
+
+    startTime = time.time()
+    results = runBatch(findDesigns(args), options, opts.jobs)
+    failed = [r for r in results if r['status'] != "ok"]
+    summary = {"designs": results,
+               "ok": len(results) - len(failed),
+               "failed": len(failed),
+               "seconds": round(time.time() - startTime, 3)}
+    text = json.dumps(summary, indent=2, sort_keys=True)
+    if opts.summary == "-":
+        print text
+    else:
+        with open(opts.summary, 'w') as f:
+            f.write(text + '\n')
+    return 1 if failed else 0
+# end def
+
+if __name__ == '__main__':
+    sys.exit(main())
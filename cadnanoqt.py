@@ -129,8 +129,8 @@ class CadnanoQt(QObject):
             defaultFile = path.expandvars(defaultFile)
             dc = DocumentController()
             doc = dc.document()
-            from model.io.decoder import decode
-            decode(doc, file(defaultFile).read())
+            from model.io.decoder import decodeFile
+            decodeFile(doc, defaultFile)
             print "Loaded default document: %s" % doc
         else:
             docCtrlrCount = len(self.documentControllers)
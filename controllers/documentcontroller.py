@@ -25,8 +25,11 @@
 import os
 from cadnano import app
 from model.document import Document
-from model.io.decoder import decode
+from model.io.decoder import decodeFile
+from model.io.compression import openDesignFile, compressionForFilename
 from model.io.encoder import encode
+from model.io.journal import EditJournal, hasJournal, recoverDocument
+from model.io.stapleexport import writeStapleCsv
 from views.documentwindow import DocumentWindow
 from views import styles
 import util
@@ -55,6 +58,7 @@ class DocumentController():
         self._filename = None
         self._fileOpenPath = None  # will be set in _readSettings
         self._hasNoAssociatedFile = True
+        self._journal = None  # crash recovery journal for the saved file
         self._pathViewInstance = None
         self._sliceViewInstance = None
         self._undoStack = None
@@ -358,7 +362,12 @@ class DocumentController():
         # self.win.pathscene.render(painter)
         # painter.end()
 
-        # Render item-by-item
+        # Render item-by-item. Only strands near the viewport have a
+        # StrandItem, so bind one to every strand for the export.
+        pools = [partItem.strandItemPool() \
+                                for partItem in self.win.pathroot.partItems()]
+        for pool in pools:
+            pool.bindAll()
         painter = QPainter()
         styleOption = QStyleOptionGraphicsItem()
         q = [self.win.pathroot]
@@ -371,6 +380,8 @@ class DocumentController():
                 graphicsItem.paint(painter, styleOption, None)
                 q.extend(graphicsItem.childItems())
         painter.end()
+        for pool in pools:
+            pool.refresh()
 
     def actionExportStaplesSlot(self):
         """
@@ -496,6 +507,7 @@ class DocumentController():
     ### PRIVATE SUPPORT METHODS ###
     def newDocument(self, doc=None, fname=None):
         """Creates a new Document, reusing the DocumentController."""
+        self._stopJournal()
         self._document.resetViews()
         self._document.removeAllParts()  # clear out old parts
         self._document.undoStack().clear()  # reset undostack
@@ -515,14 +527,16 @@ class DocumentController():
                             self.win,
                             "%s - Save As" % QApplication.applicationName(),
                             directory,
-                            "%s (*.json)" % QApplication.applicationName())
+                            "%s (*.json *.json.gz *.json.bz2 *.json.zz)" %\
+                                QApplication.applicationName())
             self.writeDocumentToFile(fname)
         else:  # access through non-blocking callback
             fdialog = QFileDialog(
                             self.win,
                             "%s - Save As" % QApplication.applicationName(),
                             directory,
-                            "%s (*.json)" % QApplication.applicationName())
+                            "%s (*.json *.json.gz *.json.bz2 *.json.zz)" %\
+                                QApplication.applicationName())
             fdialog.setAcceptMode(QFileDialog.AcceptSave)
             fdialog.setWindowFlags(Qt.Sheet)
             fdialog.setWindowModality(Qt.WindowModal)
@@ -573,10 +587,9 @@ class DocumentController():
             # manual garbage collection to prevent hang (in osx)
             del self.saveStaplesDialog
             self.saveStaplesDialog = None
-        # write the file
-        output = self.activePart().getStapleSequences()
+        # write the file one staple at a time
         with open(fname, 'w') as f:
-            f.write(output)
+            writeStapleCsv(self.activePart(), f)
     # end def
 
     def newClickedCallback(self):
@@ -610,7 +623,14 @@ class DocumentController():
         fname = str(fname)
         self._writeFileOpenPath(os.path.dirname(fname))
         self.newDocument(fname=fname)
-        decode(self._document, file(fname).read())
+        if hasJournal(fname) and self._askToRecover(fname) and\
+           recoverDocument(self._document, fname):
+            self._startJournal(fname, recovered=True)
+            self.win.setWindowModified(True)
+        else:
+            # helices show up at once, strands fill in as the gui idles
+            decodeFile(self._document, fname, lazy=True)
+            self._startJournal(fname)
         if hasattr(self, "filesavedialog"): # user did save
             if self.fileopendialog != None:
                 self.fileopendialog.filesSelected.disconnect(\
@@ -628,7 +648,8 @@ class DocumentController():
         if fname.isEmpty() or os.path.isdir(fname):
             return False
         fname = str(fname)
-        if not fname.lower().endswith(".json"):
+        if not fname.lower().endswith(".json") and\
+           compressionForFilename(fname) == None:
             fname += ".json"
         if self.filesavedialog != None:
             self.filesavedialog.filesSelected.disconnect(
@@ -643,6 +664,7 @@ class DocumentController():
         """Intercept close events when user attempts to close the window."""
         if self.maybeSave():
             event.accept()
+            self._stopJournal()
             if app().isInMaya():
                 self.windock.setVisible(False)
                 del self.windock
@@ -681,7 +703,7 @@ class DocumentController():
             fname = QFileDialog.getOpenFileName(
                         None,
                         "Open Document", path,
-                        "cadnano1 / cadnano2 Files (*.nno *.json *.cadnano)")
+                        "cadnano1 / cadnano2 Files (*.nno *.json *.cadnano *.gz *.bz2 *.zz)")
             self.filesavedialog = None
             self.openAfterMaybeSaveCallback(fname)
         else:  # access through non-blocking callback
@@ -689,7 +711,7 @@ class DocumentController():
                         self.win,
                         "Open Document",
                         path,
-                        "cadnano1 / cadnano2 Files (*.nno *.json *.cadnano)")
+                        "cadnano1 / cadnano2 Files (*.nno *.json *.cadnano *.gz *.bz2 *.zz)")
             fdialog.setAcceptMode(QFileDialog.AcceptOpen)
             fdialog.setWindowFlags(Qt.Sheet)
             fdialog.setWindowModality(Qt.WindowModal)
@@ -729,7 +751,7 @@ class DocumentController():
             assert(not self._hasNoAssociatedFile)
             filename = self.filename()
         try:
-            with open(filename, 'w') as f:
+            with openDesignFile(filename, 'w') as f:
                 helixOrderList = self.win.pathroot.getSelectedPartOrderedVHList()
                 encode(self._document, helixOrderList, f)
         except IOError:
@@ -745,8 +767,46 @@ class DocumentController():
             return False
         self.undoStack().setClean()
         self.setFilename(filename)
+        self._startJournal(filename)
         return True
 
+    def _startJournal(self, filename, recovered=False):
+        """
+        Journals every edit made after filename was opened or saved, so
+        unsaved work can be recovered after a crash. A recovered document
+        is compacted into the journal at once, since it differs from
+        the file on disk until the user saves.
+        """
+        if self._journal != None:
+            self._journal.detach()
+        self._journal = EditJournal(self._document, filename,
+                            self.win.pathroot.getSelectedPartOrderedVHList)
+        if recovered:
+            self._journal.compact()
+        else:
+            self._journal.reset()
+
+    def _stopJournal(self):
+        """The document was saved or its changes discarded by the user."""
+        if self._journal != None:
+            self._journal.detach()
+            self._journal.discard()
+            self._journal = None
+
+    def _askToRecover(self, filename):
+        """Offers to replay the journal left behind by a crash."""
+        if app().dontAskAndJustDiscardUnsavedChanges:
+            return False
+        recoverbox = QMessageBox(QMessageBox.Question, "cadnano",
+            "'%s' has unsaved changes from a previous session.\n"
+            "Do you want to recover them?" % os.path.basename(filename),
+            QMessageBox.Yes | QMessageBox.No,
+            self.win,
+            Qt.Dialog | Qt.MSWindowsFixedSizeDialogHint)
+        ret = recoverbox.exec_()
+        del recoverbox  # manual garbage collection to prevent hang (in osx)
+        return ret == QMessageBox.Yes
+
     def actionCadnanoWebsiteSlot(self):
         import webbrowser
         webbrowser.open("http://cadnano.org/")
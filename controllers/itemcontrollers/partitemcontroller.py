@@ -37,6 +37,8 @@ class PartItemController(object):
             mP.partHideSignal.connect(pI.partHideSlot)
         if hasattr(pI, "partActiveVirtualHelixChangedSlot"):
             mP.partActiveVirtualHelixChangedSignal.connect(pI.partActiveVirtualHelixChangedSlot)
+        if hasattr(pI, "partStrandChangedSlot"):
+            mP.partStrandChangedSignal.connect(pI.partStrandChangedSlot)
 
         mP.partDimensionsChangedSignal.connect(pI.partDimensionsChangedSlot)
         mP.partParentChangedSignal.connect(pI.partParentChangedSlot)
@@ -57,6 +59,8 @@ class PartItemController(object):
             mP.partHideSignal.disconnect(pI.partHideSlot)
         if hasattr(pI, "partActiveVirtualHelixChangedSlot"):
             mP.partActiveVirtualHelixChangedSignal.disconnect(pI.partActiveVirtualHelixChangedSlot)
+        if hasattr(pI, "partStrandChangedSlot"):
+            mP.partStrandChangedSignal.disconnect(pI.partStrandChangedSlot)
 
         mP.partDimensionsChangedSignal.disconnect(pI.partDimensionsChangedSlot)
         mP.partParentChangedSignal.disconnect(pI.partParentChangedSlot)
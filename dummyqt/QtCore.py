@@ -1,4 +1,13 @@
-QObject = object
+class QObject(object):
+    """Minimal stand-in for QObject: tracks the parent and nothing more."""
+    def __init__(self, parent=None, *args, **kwargs):
+        self._dummyParent = parent
+    def parent(self):
+        return self._dummyParent
+    def setParent(self, parent):
+        self._dummyParent = parent
+    def deleteLater(self):
+        pass
 
 class Qt(object):
     pass
@@ -8,22 +17,39 @@ class pyqtSignal(object):
         """ We don't actually do anything with argtypes because
         the real Qt will perform checks in the Gui version of
         cadnano which should suffice. """
-        self.signalEmitters = {}
         self.argtypes = args
-    def __get__(self, emitter):
+        self.name = '_dummySignal%d' % id(self)
+    def __get__(self, emitter, emitterType=None):
+        if emitter is None:
+            return self
+        # bound signals live on the instance so they go away with it
         try:
-            return self.signalEmitters.get(emitter)
+            return emitter.__dict__[self.name]
         except KeyError:
-            self.signalEmitters[emitter] = pyqtBoundSignal()
-            return emitter
+            bound = emitter.__dict__[self.name] = pyqtBoundSignal()
+            return bound
 
 class pyqtBoundSignal(object):
     def __init__(self):
-        self.targets = {}
+        self.targets = []
     def connect(self, target):
-        self.targets.add(target)
+        self.targets.append(target)
     def disconnect(self, target):
         self.targets.remove(target)
     def emit(self, *args):
-        for t in self.targets:
-            t(*args)
\ No newline at end of file
+        for t in list(self.targets):
+            t(*args)
+
+class QTimer(QObject):
+    """
+    There is no event loop, so singleShot callbacks wait in pending until
+    runPending is called.
+    """
+    pending = []
+    @staticmethod
+    def singleShot(msec, callback):
+        QTimer.pending.append(callback)
+    @staticmethod
+    def runPending():
+        while QTimer.pending:
+            QTimer.pending.pop(0)()
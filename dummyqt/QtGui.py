@@ -1,73 +1,90 @@
+import re
+from dummyqt.QtCore import pyqtSignal
+
 class QUndoCommand(object):
-    children = []
     name = "untitled"
+    def __init__(self, *args):
+        self.children = []
     def undo(self):
         for c in reversed(self.children):
             c.undo()
     def redo(self):
         for c in self.children:
             c.redo()
+    def childCount(self):
+        return len(self.children)
+    def child(self, i):
+        return self.children[i]
 
 class QUndoStack(object):
-    undoCmds = []
-    macroStack = []  # list of lists
-    macroNameStack = []
-    index = 0
-    clean = True
+    """
+    Mimics the QUndoStack semantics cadnano relies on. index is the number
+    of commands that are currently applied, as in Qt.
+    """
+    indexChanged = pyqtSignal(int)
+    def __init__(self, *args):
+        self.undoCmds = []
+        self.macroStack = []  # list of lists
+        self.macroNameStack = []
+        self._index = 0
+        self.cleanIndex = 0
+    def index(self):
+        return self._index
+    def count(self):
+        return len(self.undoCmds)
+    def command(self, i):
+        return self.undoCmds[i]
     def isClean(self):
-        return self.clean
+        return self._index == self.cleanIndex
     def setClean(self):
-        self.clean = True
-    def clean(self):
-        self.clean = True
+        self.cleanIndex = self._index
+    def clear(self):
         self.undoCmds = []
-        self.index = 0
+        self._index = 0
+        self.cleanIndex = 0
+        self.indexChanged.emit(0)
+    def canUndo(self):
+        return not self.macroStack and self._index > 0
+    def canRedo(self):
+        return not self.macroStack and self._index < len(self.undoCmds)
     def beginMacro(self, macroName):
         self.macroStack.append([])
         self.macroNameStack.append(macroName)
-        self.clean = False
-    def push(self, cmd):
+    def _append(self, cmd):
         if self.macroStack:
             self.macroStack[-1].append(cmd)
         else:
+            del self.undoCmds[self._index:]
             self.undoCmds.append(cmd)
-            self.index = len(self.undoCmds) - 1
+            self._index = len(self.undoCmds)
+            self.indexChanged.emit(self._index)
+    def push(self, cmd):
         cmd.redo()
-        self.clean = False
+        self._append(cmd)
     def endMacro(self):
-        l = len(self.macroStack)
-        if l == 0:
+        if not self.macroStack:
             assert(False)  # Can't end a macro that wasn't begun
         cmd = QUndoCommand()
         cmd.children = self.macroStack.pop()
         cmd.name = self.macroNameStack.pop()
-        if l == 1:
-            self.undoCmds.append(cmd)
-            self.index = len(self.undoCmds) - 1
-        else:
-            self.macroStack[-1].append(cmd)
-        self.clean = False
+        self._append(cmd)
     def undo(self):
         assert(not self.macroStack)  # Can't undo in the middle of a macro!
-        if self.index > 0:
-            cmd = self.undoCmds[self.index]
-            self.index = self.index - 1
-            cmd.undo()
+        if self._index > 0:
+            self._index -= 1
+            self.undoCmds[self._index].undo()
+            self.indexChanged.emit(self._index)
     def redo(self):
-        assert(not macroStack)  # Can't redo in the middle of a macro
-        if self.index < len(self.undoCmds) - 1:
-            cmd = self.undoCmds[self.index + 1]
-            self.index = self.index + 1
-            cmd.redo()
+        assert(not self.macroStack)  # Can't redo in the middle of a macro
+        if self._index < len(self.undoCmds):
+            self.undoCmds[self._index].redo()
+            self._index += 1
+            self.indexChanged.emit(self._index)
 
 class QColor(object):
-    r = 0
-    g = 0
-    b = 0
-    a = 0
     def __init__(self, *args):
         if len(args) == 1:
-            assert(type(args[0]) == str)
+            assert(isinstance(args[0], basestring))
             hvals = re.findall('[0-9a-fA-F]{2}', args[0])
             hvals = [int(hv, 16) for hv in hvals]
         elif len(args) == 3:
@@ -82,7 +99,17 @@ class QColor(object):
             hvals.append(255)
         for hv in hvals:
             assert(0 <= hv <= 255)
-        r, g, b, a = hvals
+        self.r, self.g, self.b, self.a = hvals
+    def name(self):
+        return "#%02x%02x%02x" % (self.r, self.g, self.b)
+    def red(self):
+        return self.r
+    def green(self):
+        return self.g
+    def blue(self):
+        return self.b
+    def alpha(self):
+        return self.a
 
 class QFont(object):
     dummy = True
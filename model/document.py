@@ -137,6 +137,34 @@ class Document(QObject):
             return False
     # end def
 
+    def addStrandsToSelection(self, strandValues):
+        """
+        Adds a dict of strand: (lowSelected, highSelected) to the selection
+        in one pass. Unlike addStrandToSelection the strands are not queued
+        for selectedChangedSignal, so views restyle only the items they
+        show.
+        """
+        sDict = self._selectionDict
+        for strand, value in strandValues.iteritems():
+            sS = strand.strandSet()
+            if sS in sDict:
+                sDict[sS][strand] = value
+            else:
+                sDict[sS] = {strand: value}
+    # end def
+
+    def removeStrandsFromSelection(self, strands):
+        """The bulk counterpart of addStrandsToSelection."""
+        sDict = self._selectionDict
+        for strand in strands:
+            sS = strand.strandSet()
+            temp = sDict.get(sS)
+            if temp != None and strand in temp:
+                del temp[strand]
+                if len(temp) == 0:
+                    del sDict[sS]
+    # end def
+
     def selectionDict(self):
         return self._selectionDict
     # end def
@@ -0,0 +1,216 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+compression.py
+
+Transparent compression for design files. Legacy json designs are mostly
+repeated [-1,-1,-1,-1] tuples and shrink 20-50x under any general purpose
+compressor, so saving with a compressed suffix (foo.json.gz, foo.json.bz2,
+foo.json.zz) writes a compressed stream. Opening never trusts the suffix:
+the format is detected from the leading magic bytes and the file is
+decompressed chunk by chunk as the decoder reads it. Decompressing a saved
+file by hand yields exactly what an uncompressed save would have written.
+"""
+
+import gzip, bz2, zlib
+from os.path import splitext
+try:
+    import lzma  # python 3.3+, or backports.lzma
+except ImportError:
+    lzma = None
+
+READ_CHUNK_SIZE = 1 << 16
+
+GZIP = 'gzip'
+BZIP2 = 'bzip2'
+ZLIB = 'zlib'
+LZMA = 'lzma'
+
+# suffix -> compression type used when saving
+compressionSuffixes = {'.gz': GZIP,
+                       '.gzip': GZIP,
+                       '.bz2': BZIP2,
+                       '.zz': ZLIB,
+                       '.zlib': ZLIB}
+if lzma:
+    compressionSuffixes['.xz'] = LZMA
+
+
+def detectCompression(header):
+    """
+    Returns the compression type for a file beginning with the string
+    header (at least 6 bytes when available), or None for plain text.
+    """
+    if header.startswith('\x1f\x8b'):
+        return GZIP
+    if header.startswith('BZh'):
+        return BZIP2
+    if header.startswith('\xfd7zXZ\x00'):
+        return LZMA
+    if len(header) >= 2:
+        cmf, flg = ord(header[0]), ord(header[1])
+        # deflate method with a valid header checksum; plain json can
+        # never start like this since 0x78 is 'x'
+        if cmf & 0x0f == 8 and (cmf << 8 | flg) % 31 == 0:
+            return ZLIB
+    return None
+# end def
+
+
+def compressionForFilename(filename):
+    """Returns the compression type to use when saving to filename."""
+    return compressionSuffixes.get(splitext(str(filename))[1].lower(), None)
+
+
+def uncompressedFilename(filename):
+    """foo.json.gz -> foo.json; other names are returned untouched."""
+    root, ext = splitext(str(filename))
+    if ext.lower() in compressionSuffixes:
+        return root
+    return str(filename)
+
+
+class ZlibReader(object):
+    """Read-only file object that inflates a raw zlib stream on demand."""
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._inflater = zlib.decompressobj()
+        self._buffer = ''
+        self._eof = False
+        self.name = getattr(fileobj, 'name', None)
+
+    def _fill(self, size):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self._fileobj.read(READ_CHUNK_SIZE)
+            if chunk:
+                self._buffer += self._inflater.decompress(chunk)
+            else:
+                self._buffer += self._inflater.flush()
+                self._eof = True
+
+    def read(self, size=-1):
+        self._fill(size)
+        if size < 0:
+            data, self._buffer = self._buffer, ''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self._fileobj.close()
+# end class
+
+
+class ZlibWriter(object):
+    """Write-only file object that deflates into a raw zlib stream."""
+    def __init__(self, fileobj, level=9):
+        self._fileobj = fileobj
+        self._deflater = zlib.compressobj(level)
+        self.name = getattr(fileobj, 'name', None)
+
+    def write(self, data):
+        self._fileobj.write(self._deflater.compress(data))
+
+    def close(self):
+        self._fileobj.write(self._deflater.flush())
+        self._fileobj.close()
+# end class
+
+
+class DesignFile(object):
+    """
+    Thin wrapper returned by openDesignFile so callers get one object for
+    every format. name is always the uncompressed file name, which keeps
+    the "name" field written by the encoder identical to a plain save.
+    """
+    def __init__(self, stream, name, compression):
+        self._stream = stream
+        self.name = name
+        self.compression = compression
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+    def write(self, data):
+        self._stream.write(data)
+
+    def close(self):
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+        return False
+# end class
+
+
+def openDesignFile(filename, mode='r'):
+    """
+    Opens filename for reading ('r') or writing ('w').
+
+    Reading sniffs the magic bytes and returns a file object that streams
+    the decompressed contents. Writing picks the compressor from the
+    suffix of filename (see compressionSuffixes) and falls back to plain
+    text for anything else, e.g. .json.
+    """
+    filename = str(filename)
+    name = uncompressedFilename(filename)
+    if mode.startswith('r'):
+        raw = open(filename, 'rb')
+        compression = detectCompression(raw.read(6))
+        raw.seek(0)
+        if compression == GZIP:
+            stream = gzip.GzipFile(fileobj=raw, mode='rb')
+        elif compression == BZIP2:
+            raw.close()
+            stream = bz2.BZ2File(filename, 'rb')
+        elif compression == ZLIB:
+            stream = ZlibReader(raw)
+        elif compression == LZMA:
+            if lzma is None:
+                raw.close()
+                raise IOError("'%s' is lzma compressed, which this python "
+                              "cannot read." % filename)
+            stream = lzma.LZMAFile(raw, 'rb')
+        else:
+            stream = raw
+        return DesignFile(stream, name, compression)
+    else:
+        compression = compressionForFilename(filename)
+        if compression == GZIP:
+            # mtime=0 keeps repeated saves of the same design byte-identical
+            stream = gzip.GzipFile(filename, 'wb', 9, mtime=0)
+        elif compression == BZIP2:
+            stream = bz2.BZ2File(filename, 'wb')
+        elif compression == ZLIB:
+            stream = ZlibWriter(open(filename, 'wb'))
+        elif compression == LZMA:
+            stream = lzma.LZMAFile(filename, 'wb')
+        else:
+            stream = open(filename, 'w')
+        return DesignFile(stream, name, compression)
+# end def
@@ -25,7 +25,7 @@
 import json
 from exceptions import ImportError
 from legacydecoder import import_legacy_dict
-from ui.dialogs.ui_latticetype import Ui_LatticeType
+from compression import openDesignFile
 import util, cadnano
 if cadnano.app().isGui():#headless:
     from ui.dialogs.ui_latticetype import Ui_LatticeType
@@ -52,6 +52,20 @@ def decode(document, string):
     #     dialog.exec_()
     #     return
     packageObject = json.loads(string)
+    importPackageObject(document, packageObject)
 
+def decodeFile(document, filename, lazy=False):
+    """
+    Decodes the design stored in filename into document. Compressed files
+    are recognized by their magic bytes and inflated as the parser reads,
+    so the compressed bytes are never held in memory alongside the text.
+    With lazy=True strands are installed after returning, see
+    import_legacy_dict.
+    """
+    with openDesignFile(filename) as f:
+        packageObject = json.load(f)
+    importPackageObject(document, packageObject, lazy)
+
+def importPackageObject(document, packageObject, lazy=False):
     if packageObject.get('.format', None) != 'caDNAno2':
-        import_legacy_dict(document, packageObject)
\ No newline at end of file
+        import_legacy_dict(document, packageObject, lazy=lazy)
\ No newline at end of file
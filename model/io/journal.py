@@ -0,0 +1,342 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+journal.py
+
+Append-only edit journal kept next to a saved design (foo.json.journal).
+
+Every time a command is done, undone or redone on the document's undo
+stack, the virtual helices it changed are re-encoded with
+legacy_dict_from_vh and appended to the journal as one json line:
+
+    {"seq": 12, "vh": [[row, col, vstrandDict or null], ...]}
+
+A null entry means the helix no longer exists. Because each record holds
+the post-edit state of the helices it names, replay is a plain overwrite
+of "vstrands" entries in order, and undo needs no special handling. The
+first line of the journal names what the records apply to: either the
+saved design file ({"base": "foo.json"}) or, after compaction, a full
+legacy dictionary ({"snapshot": {...}}).
+
+Appending costs time proportional to the helices touched by the edit,
+not to the size of the design. Every compactEvery records the journal is
+rewritten as a single snapshot so that recovery stays fast.
+"""
+
+import json, os
+from compression import openDesignFile
+from decoder import importPackageObject
+from legacyencoder import legacy_dict_from_doc, legacy_dict_from_vh
+from model.oligo import Oligo
+from model.parts.part import Part
+from model.strand import Strand
+from model.strandset import StrandSet
+from model.virtualhelix import VirtualHelix
+
+JOURNAL_SUFFIX = ".journal"
+
+
+def journalFilenameFor(filename):
+    return str(filename) + JOURNAL_SUFFIX
+
+
+def hasJournal(filename):
+    """True if a journal with records exists for the design filename."""
+    jname = journalFilenameFor(filename)
+    return os.path.isfile(jname) and os.path.getsize(jname) > 0
+
+
+def readJournal(filename):
+    """
+    Returns the legacy dictionary for filename with all of its journal
+    records applied, or None if the journal holds nothing to recover.
+    A truncated last line (the crash happened mid-write) is ignored.
+    """
+    if not hasJournal(filename):
+        return None
+    with open(journalFilenameFor(filename)) as f:
+        lines = f.read().split('\n')
+    try:
+        header = json.loads(lines[0])
+    except ValueError:
+        return None
+    if 'snapshot' in header:
+        obj = header['snapshot']
+    else:
+        with openDesignFile(filename) as f:
+            obj = json.load(f)
+    records = []
+    for line in lines[1:]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break  # partial record from a crash, or the trailing newline
+    if not records and 'snapshot' not in header:
+        return None
+    return applyRecords(obj, records)
+# end def
+
+
+def applyRecords(obj, records):
+    """Overwrites obj['vstrands'] entries with the journaled helix states."""
+    vstrands = obj['vstrands']
+    coordToIndex = dict(((h['row'], h['col']), i)
+                        for i, h in enumerate(vstrands))
+    for record in records:
+        for row, col, vhDict in record['vh']:
+            i = coordToIndex.get((row, col), None)
+            if vhDict == None:
+                if i != None:
+                    vstrands[i] = None
+                    del coordToIndex[(row, col)]
+            elif i == None:
+                coordToIndex[(row, col)] = len(vstrands)
+                vstrands.append(vhDict)
+            else:
+                vstrands[i] = vhDict
+    obj['vstrands'] = [h for h in vstrands if h != None]
+    return obj
+# end def
+
+
+def recoverDocument(document, filename):
+    """
+    Decodes filename into document with its journal replayed on top.
+    Returns False if there was nothing to recover.
+    """
+    obj = readJournal(filename)
+    if obj == None or not obj['vstrands']:
+        return False
+    importPackageObject(document, obj)
+    return True
+# end def
+
+
+class EditJournal(object):
+    """
+    Watches a document's undo stack and appends one record per done,
+    undone or redone command to the journal of filename.
+
+    helixOrderFunc, if given, returns the (row, col) order to use for
+    snapshots, e.g. the path view order used by the encoder.
+
+    The helices a command changed are those the part reported through
+    partStrandChangedSignal or partVirtualHelixAddedSignal while it ran,
+    plus any the command itself refers to, which covers removed helices
+    and colour changes.
+    """
+    compactEvery = 500
+
+    def __init__(self, document, filename, helixOrderFunc=None):
+        self._document = document
+        self._filename = str(filename)
+        self._helixOrderFunc = helixOrderFunc
+        self._stack = document.undoStack()
+        self._lastIndex = self._stack.index()
+        self._seq = 0
+        self._recordsSinceCompaction = 0
+        self._file = None
+        self._part = None
+        self._changed = set()  # helices the part reported since the last record
+        self._stack.indexChanged.connect(self.undoStackIndexChangedSlot)
+        document.documentPartAddedSignal.connect(self.documentPartAddedSlot)
+        self._watchPart(document.selectedPart())
+    # end def
+
+    ### SLOTS ###
+    def documentPartAddedSlot(self, document, part):
+        self._watchPart(part)
+    # end def
+
+    def partHelixChangedSlot(self, part, virtualHelix):
+        self._changed.add(virtualHelix)
+    # end def
+
+    def undoStackIndexChangedSlot(self, index):
+        """Journals the commands between the last seen index and index."""
+        lastIndex, self._lastIndex = self._lastIndex, index
+        helices, self._changed = self._changed, set()
+        if self._stack.count() < max(lastIndex, index):
+            return  # the stack was cleared
+        lo, hi = min(lastIndex, index), max(lastIndex, index)
+        touchesAll = False
+        for i in range(lo, hi):
+            touchesAll |= self._collectHelices(self._stack.command(i), helices)
+        part = self._document.selectedPart()
+        if part == None:
+            return
+        if touchesAll:
+            helices.update(part.getVirtualHelices())
+        if helices:
+            self.append(part, helices)
+    # end def
+
+    ### PUBLIC METHODS ###
+    def filename(self):
+        return journalFilenameFor(self._filename)
+
+    def append(self, part, helices):
+        numBases = part.maxBaseIdx()+1
+        entries = []
+        for vh in helices:
+            row, col = vh.coord()
+            if part.virtualHelixAtCoord((row, col)) is vh:
+                entries.append([row, col, legacy_dict_from_vh(part, vh, numBases)])
+            else:
+                entries.append([row, col, None])
+        self._seq += 1
+        if self._file == None:
+            self._file = open(self.filename(), 'a')
+            if self._file.tell() == 0:
+                self._writeLine(self._file,
+                                {"base": os.path.basename(self._filename)})
+        self._writeLine(self._file, {"seq": self._seq, "vh": entries})
+        self._file.flush()
+        self._recordsSinceCompaction += 1
+        if self._recordsSinceCompaction >= self.compactEvery:
+            self.compact()
+    # end def
+
+    def compact(self):
+        """
+        Replaces the journal with a single snapshot of the document. The
+        new journal is written beside the old one and renamed over it, so
+        a crash during compaction leaves the previous journal intact.
+        """
+        part = self._document.selectedPart()
+        if part == None:
+            return
+        if self._helixOrderFunc != None:
+            helixOrderList = self._helixOrderFunc()
+        else:
+            helixOrderList = [vh.coord() for vh in part.getVirtualHelices()]
+        obj = legacy_dict_from_doc(self._document, self._filename,
+                                   helixOrderList)
+        self.close()
+        tmpName = self.filename() + ".tmp"
+        with open(tmpName, 'w') as f:
+            self._writeLine(f, {"snapshot": obj})
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmpName, self.filename())
+        self._recordsSinceCompaction = 0
+    # end def
+
+    def reset(self, filename=None):
+        """
+        Called after the document was written to disk: the saved file is
+        now the base, so the journal starts over.
+        """
+        if filename != None:
+            self._filename = str(filename)
+        self.discard()
+        self._lastIndex = self._stack.index()
+        self._changed.clear()
+    # end def
+
+    def discard(self):
+        """Closes and removes the journal."""
+        self.close()
+        if os.path.isfile(self.filename()):
+            os.remove(self.filename())
+        self._recordsSinceCompaction = 0
+    # end def
+
+    def close(self):
+        if self._file != None:
+            self._file.close()
+            self._file = None
+    # end def
+
+    def detach(self):
+        """Stops watching the undo stack; the journal file is kept."""
+        self._stack.indexChanged.disconnect(self.undoStackIndexChangedSlot)
+        self._document.documentPartAddedSignal.disconnect(\
+                                                    self.documentPartAddedSlot)
+        self._watchPart(None)
+        self.close()
+    # end def
+
+    ### PRIVATE SUPPORT METHODS ###
+    def _watchPart(self, part):
+        """Collects the helices part reports as changed."""
+        if part is self._part:
+            return
+        if self._part != None:
+            self._part.partStrandChangedSignal.disconnect(\
+                                                    self.partHelixChangedSlot)
+            self._part.partVirtualHelixAddedSignal.disconnect(\
+                                                    self.partHelixChangedSlot)
+        self._part = part
+        if part != None:
+            part.partStrandChangedSignal.connect(self.partHelixChangedSlot)
+            part.partVirtualHelixAddedSignal.connect(self.partHelixChangedSlot)
+    # end def
+
+    def _writeLine(self, f, record):
+        f.write(json.dumps(record, separators=(',',':')))
+        f.write('\n')
+    # end def
+
+    def _collectHelices(self, command, helices):
+        """
+        Adds every virtualhelix referenced by command (and its children,
+        for macros) to helices. Returns True if the command can change
+        every helix in the part at once.
+        """
+        touchesAll = isinstance(command, Part.ResizePartCommand)
+        for value in getattr(command, '__dict__', {}).itervalues():
+            if isinstance(value, (list, tuple, set)):
+                for v in value:
+                    self._collectHelix(v, helices)
+            elif isinstance(value, dict):
+                for v in value.itervalues():
+                    self._collectHelix(v, helices)
+            else:
+                self._collectHelix(value, helices)
+        for i in range(command.childCount()):
+            touchesAll |= self._collectHelices(command.child(i), helices)
+        return touchesAll
+    # end def
+
+    def _collectHelix(self, obj, helices):
+        if isinstance(obj, VirtualHelix):
+            helices.add(obj)
+        elif isinstance(obj, StrandSet):
+            helices.add(obj.virtualHelix())
+        elif isinstance(obj, Strand):
+            helices.add(obj.virtualHelix())
+            # xover partners store this strand's indices in their arrays
+            for neighbor in (obj.connection5p(), obj.connection3p()):
+                if neighbor != None:
+                    helices.add(neighbor.virtualHelix())
+            # colours are stored with the 5' end of the strand's oligo
+            self._collectHelix(obj.oligo(), helices)
+        elif isinstance(obj, Oligo):
+            strand5p = obj.strand5p()
+            if strand5p != None:
+                helices.add(strand5p.virtualHelix())
+    # end def
+# end class
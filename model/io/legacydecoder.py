@@ -22,7 +22,7 @@
 #
 # http://www.opensource.org/licenses/mit-license.php
 
-from collections import defaultdict
+from collections import deque
 from model.document import Document
 from model.enum import LatticeType, StrandType
 from model.parts.honeycombpart import HoneycombPart
@@ -33,6 +33,7 @@ import util, cadnano
 # import Qt stuff into the module namespace with PySide, PyQt4 independence
 util.qtWrapImport('QtGui', globals(),  ['QColor'])
 if cadnano.app().isGui():
+    util.qtWrapImport('QtCore', globals(),  ['QTimer'])
     from ui.dialogs.ui_latticetype import Ui_LatticeType
     util.qtWrapImport('QtGui', globals(),  ['QDialog', 'QDialogButtonBox'])
 
@@ -53,10 +54,13 @@ STAPLE = "staple"
 INSERTION = "insertion"
 DELETION = "deletion"
 
-def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
+def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb, lazy=False):
     """
     Parses a dictionary (obj) created from reading a json file and uses it
     to populate the given document with model data.
+
+    With lazy=True only the part and its virtualhelices are created before
+    returning; strands follow in the background (see LegacyStrandLoader).
     """
     numBases = len(obj['vstrands'][0]['scaf'])
     if cadnano.app().isGui():
@@ -80,8 +84,11 @@ def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
                 latticeType = LatticeType.Square
             else:
                 latticeType = LatticeType.Honeycomb
-    else:  # Headless, assume the latticeType arg was meaningful
-        pass
+    else:  # Headless, trust the latticeType arg unless the size decides it
+        if numBases % 32 == 0 and numBases % 21 != 0:
+            latticeType = LatticeType.Square
+        elif numBases % 21 == 0 and numBases % 32 != 0:
+            latticeType = LatticeType.Honeycomb
 
     # DETERMINE MAX ROW,COL
     maxRowJson = maxColJson = 0
@@ -101,7 +108,7 @@ def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
             if helix['col'] != 0:
                 isSQ100 = False
                 break
-        if isSQ100:
+        if isSQ100 and cadnano.app().isGui():
             dialogLT.label.setText("Is this a SQ100 file?")
             if dialog.exec_() == 1:
                 nRows, nCols = 100, 1
@@ -134,129 +141,260 @@ def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
         part.createVirtualHelix(row, col, useUndoStack=False)
     part.setImportedVHelixOrder(orderedCoordList)
 
-    # INSTALL STRANDS AND COLLECT XOVER LOCATIONS
-    numHelixes = len(obj['vstrands'])-1
-    scaf_seg = defaultdict(list)
-    scaf_xo = defaultdict(list)
-    stap_seg = defaultdict(list)
-    stap_xo = defaultdict(list)
-    try:
-        for helix in obj['vstrands']:
-            vhNum = helix['num']
-            row = helix['row']
-            col = helix['col']
-            scaf = helix['scaf']
-            stap = helix['stap']
-            insertions = helix['loop']
-            skips = helix['skip']
-            vh = part.virtualHelixAtCoord((row, col))
-            scafStrandSet = vh.scaffoldStrandSet()
-            stapStrandSet = vh.stapleStrandSet()
-            assert(len(scaf)==len(stap) and len(stap)==part.maxBaseIdx()+1 and\
-                   len(scaf)==len(insertions) and len(insertions)==len(skips))
-            # read scaffold segments and xovers
-            for i in range(len(scaf)):
-                fiveVH, fiveIdx, threeVH, threeIdx = scaf[i]
-                if fiveVH == -1 and threeVH == -1:
-                    continue  # null base
-                if isSegmentStartOrEnd(StrandType.Scaffold, vhNum, i, fiveVH,\
-                                       fiveIdx, threeVH, threeIdx):
-                    scaf_seg[vhNum].append(i)
-                if fiveVH != vhNum and threeVH != vhNum:  # special case
-                    scaf_seg[vhNum].append(i)  # end segment on a double crossover
-                if is3primeXover(StrandType.Scaffold, vhNum, i, threeVH, threeIdx):
-                    scaf_xo[vhNum].append((i, threeVH, threeIdx))
-            assert (len(scaf_seg[vhNum]) % 2 == 0)
-            # install scaffold segments
-            for i in range(0, len(scaf_seg[vhNum]), 2):
-                lowIdx = scaf_seg[vhNum][i]
-                highIdx = scaf_seg[vhNum][i+1]
-                scafStrandSet.createStrand(lowIdx, highIdx, useUndoStack=False)
-            # read staple segments and xovers
-            for i in range(len(stap)):
-                fiveVH, fiveIdx, threeVH, threeIdx = stap[i]
-                if fiveVH == -1 and threeVH == -1:
-                    continue  # null base
-                if isSegmentStartOrEnd(StrandType.Staple, vhNum, i, fiveVH,\
-                                       fiveIdx, threeVH, threeIdx):
-                    stap_seg[vhNum].append(i)
-                if fiveVH != vhNum and threeVH != vhNum:  # special case
-                    stap_seg[vhNum].append(i)  # end segment on a double crossover
-                if is3primeXover(StrandType.Staple, vhNum, i, threeVH, threeIdx):
-                    stap_xo[vhNum].append((i, threeVH, threeIdx))
-            assert (len(stap_seg[vhNum]) % 2 == 0)
-            # install staple segments
-            for i in range(0, len(stap_seg[vhNum]), 2):
-                lowIdx = stap_seg[vhNum][i]
-                highIdx = stap_seg[vhNum][i+1]
-                stapStrandSet.createStrand(lowIdx, highIdx, useUndoStack=False)
-    except AssertionError:
+    def reportError(message):
         if not cadnano.app().isGui():
-            print "Unrecognized file format."
+            print message
         else:
-            dialogLT.label.setText("Unrecognized file format.")
+            dialogLT.label.setText(message)
             dialogLT.buttonBox.setStandardButtons(QDialogButtonBox.Ok)
             dialog.exec_()
 
-    # INSTALL XOVERS
-    for helix in obj['vstrands']:
-        vhNum = helix['num']
-        row = helix['row']
-        col = helix['col']
+    # INSTALL STRANDS, XOVERS, INSERTIONS AND COLORS
+    loader = LegacyStrandLoader(part, obj, vhNumToCoord, reportError)
+    if lazy:
+        loader.start()
+    else:
+        loader.finish()
+# end def
+
+
+class LegacyStrandLoader(object):
+    """
+    Installs the strands of a legacy design onto a part whose
+    virtualhelices already exist.
+
+    finish() does everything at once, in the same order as the original
+    eager importer. start() instead lets the views draw the bare helices
+    and fills them in a few helices per event loop iteration; a helix
+    asked for with prioritize() jumps the queue, and the part calls
+    finish() as soon as it is edited or queried as a whole. Colours are
+    applied last because oligos merge as xovers are installed.
+    """
+    helicesPerStep = 4
+
+    def __init__(self, part, obj, vhNumToCoord, errorFunc):
+        self._part = part
+        self._vhNumToCoord = vhNumToCoord
+        self._errorFunc = errorFunc
+        self._helices = obj['vstrands']
+        self._helixForNum = dict((h['num'], h) for h in self._helices)
+        self._queue = deque(h['num'] for h in self._helices)
+        # per vhNum: [scaffold, staple] lists
+        self._segments = {}
+        self._xovers = {}
+        self._partners = {}
+        self._installedXovers = set()  # (vhNum, strandType, idx5p)
+        self._materialized = set()
+        self._prioritized = set()  # vhNums moved to the front of _queue
+        self._failed = False
+        self._busy = False
+        self._done = False
+    # end def
+
+    ### PUBLIC METHODS ###
+    def isBusy(self):
+        return self._busy
+
+    def start(self):
+        """Loads in the background when there is an event loop to yield to."""
+        self._part.setLazyLoader(self)
+        if cadnano.app().isGui():
+            QTimer.singleShot(0, self._step)
+        else:
+            self.finish()
+    # end def
+
+    def prioritize(self, virtualHelix):
+        """
+        Moves virtualHelix to the front of the queue. It is called on every
+        repaint of the helix, so each helix is moved at most once.
+        """
+        vhNum = virtualHelix.number()
+        if vhNum not in self._materialized and vhNum not in self._prioritized:
+            self._prioritized.add(vhNum)
+            self._queue.appendleft(vhNum)
+    # end def
+
+    def cancel(self):
+        self._done = True
+        self._queue.clear()
+    # end def
+
+    def finish(self):
+        if self._done:
+            return
+        self._busy = True
+        try:
+            for helix in self._helices:
+                if not self._readAndInstallStrands(helix['num']):
+                    break
+            for helix in self._helices:
+                self._installXovers(helix['num'])
+            for helix in self._helices:
+                self._installInsertions(helix['num'])
+            self._installColors()
+        finally:
+            self._busy = False
+        self._done = True
+        self._part.setLazyLoader(None)
+    # end def
+
+    def materialize(self, vhNum):
+        """Installs one helix with its xovers and the strands they join."""
+        if vhNum in self._materialized or self._failed:
+            return
+        self._busy = True
+        try:
+            if not self._readAndInstallStrands(vhNum):
+                return
+            for partnerNum in self._partners[vhNum]:
+                if not self._readAndInstallStrands(partnerNum):
+                    return
+            self._installXovers(vhNum)
+            for partnerNum in self._partners[vhNum]:
+                self._installXovers(partnerNum, toVhNum=vhNum)
+            self._installInsertions(vhNum)
+            self._materialized.add(vhNum)
+        finally:
+            self._busy = False
+    # end def
+
+    ### PRIVATE SUPPORT METHODS ###
+    def _step(self):
+        if self._done:
+            return
+        if self._part not in self._part.document().parts():
+            self.cancel()  # the document was closed or reset
+            return
+        for i in range(self.helicesPerStep):
+            if not self._queue:
+                break
+            self.materialize(self._queue.popleft())
+        if self._queue and not self._failed:
+            QTimer.singleShot(0, self._step)
+        else:
+            self.finish()
+    # end def
+
+    def _readAndInstallStrands(self, vhNum):
+        """
+        Reads the segment ends and 3' xovers of a helix and creates its
+        strands. Returns False if the file turned out to be malformed.
+        """
+        if vhNum in self._segments:
+            return True
+        if self._failed:
+            return False
+        part = self._part
+        helix = self._helixForNum[vhNum]
         scaf = helix['scaf']
         stap = helix['stap']
         insertions = helix['loop']
         skips = helix['skip']
-        fromVh = part.virtualHelixAtCoord((row, col))
-        scafStrandSet = fromVh.scaffoldStrandSet()
-        stapStrandSet = fromVh.stapleStrandSet()
-        # install scaffold xovers
-        for (idx5p, toVhNum, idx3p) in scaf_xo[vhNum]:
-            # idx3p is 3' end of strand5p, idx5p is 5' end of strand3p
-            strand5p = scafStrandSet.getStrand(idx5p)
-            toVh = part.virtualHelixAtCoord(vhNumToCoord[toVhNum])
-            strand3p = toVh.scaffoldStrandSet().getStrand(idx3p)
-            part.createXover(strand5p, idx5p, strand3p, idx3p, useUndoStack=False)
-        # install staple xovers
-        for (idx5p, toVhNum, idx3p) in stap_xo[vhNum]:
-            # idx3p is 3' end of strand5p, idx5p is 5' end of strand3p
-            strand5p = stapStrandSet.getStrand(idx5p)
-            toVh = part.virtualHelixAtCoord(vhNumToCoord[toVhNum])
-            strand3p = toVh.stapleStrandSet().getStrand(idx3p)
-            part.createXover(strand5p, idx5p, strand3p, idx3p, useUndoStack=False)
+        vh = part.virtualHelixAtCoord(self._vhNumToCoord[vhNum])
+        segments = [[], []]
+        xovers = [[], []]
+        partners = set()
+        try:
+            assert(len(scaf)==len(stap) and len(stap)==part.maxBaseIdx()+1 and\
+                   len(scaf)==len(insertions) and len(insertions)==len(skips))
+            for strandType, array, strandSet in \
+                    ((StrandType.Scaffold, scaf, vh.scaffoldStrandSet()),
+                     (StrandType.Staple, stap, vh.stapleStrandSet())):
+                seg = segments[strandType]
+                xo = xovers[strandType]
+                # read segments and xovers
+                for i in range(len(array)):
+                    fiveVH, fiveIdx, threeVH, threeIdx = array[i]
+                    if fiveVH == -1 and threeVH == -1:
+                        continue  # null base
+                    if isSegmentStartOrEnd(strandType, vhNum, i, fiveVH,\
+                                           fiveIdx, threeVH, threeIdx):
+                        seg.append(i)
+                    if fiveVH != vhNum and threeVH != vhNum:  # special case
+                        seg.append(i)  # end segment on a double crossover
+                    if is3primeXover(strandType, vhNum, i, threeVH, threeIdx):
+                        xo.append((i, threeVH, threeIdx))
+                    partners.update((fiveVH, threeVH))
+                assert (len(seg) % 2 == 0)
+                # install segments
+                for i in range(0, len(seg), 2):
+                    lowIdx = seg[i]
+                    highIdx = seg[i+1]
+                    strandSet.createStrand(lowIdx, highIdx, useUndoStack=False)
+        except AssertionError:
+            self._failed = True
+            self._errorFunc("Unrecognized file format.")
+            return False
+        partners.difference_update((-1, vhNum))
+        self._segments[vhNum] = segments
+        self._xovers[vhNum] = xovers
+        self._partners[vhNum] = partners
+        return True
+    # end def
 
-    # SET DEFAULT COLOR
-    for oligo in part.oligos():
-        if oligo.isStaple():
-            defaultColor = styles.DEFAULT_STAP_COLOR
-        else:
-            defaultColor = styles.DEFAULT_SCAF_COLOR
-        oligo.applyColor(defaultColor, useUndoStack=False)
+    def _installXovers(self, vhNum, toVhNum=None):
+        """Installs the xovers leaving vhNum, or only those into toVhNum."""
+        if vhNum not in self._xovers:
+            return
+        part = self._part
+        fromVh = part.virtualHelixAtCoord(self._vhNumToCoord[vhNum])
+        for strandType, strandSet in \
+                ((StrandType.Scaffold, fromVh.scaffoldStrandSet()),
+                 (StrandType.Staple, fromVh.stapleStrandSet())):
+            for (idx5p, xoVhNum, idx3p) in self._xovers[vhNum][strandType]:
+                if toVhNum != None and xoVhNum != toVhNum:
+                    continue
+                key = (vhNum, strandType, idx5p)
+                if key in self._installedXovers:
+                    continue
+                self._installedXovers.add(key)
+                # idx3p is 3' end of strand5p, idx5p is 5' end of strand3p
+                strand5p = strandSet.getStrand(idx5p)
+                toVh = part.virtualHelixAtCoord(self._vhNumToCoord[xoVhNum])
+                strand3p = toVh.getStrandSetByType(strandType).getStrand(idx3p)
+                part.createXover(strand5p, idx5p, strand3p, idx3p, useUndoStack=False)
+    # end def
 
-    # COLORS, INSERTIONS, SKIPS
-    for helix in obj['vstrands']:
-        vhNum = helix['num']
-        row = helix['row']
-        col = helix['col']
-        scaf = helix['scaf']
-        stap = helix['stap']
+    def _installInsertions(self, vhNum):
+        """Installs the insertions and skips of a helix, once."""
+        if vhNum not in self._segments or vhNum in self._materialized:
+            return
+        helix = self._helixForNum[vhNum]
         insertions = helix['loop']
         skips = helix['skip']
-        vh = part.virtualHelixAtCoord((row, col))
+        vh = self._part.virtualHelixAtCoord(self._vhNumToCoord[vhNum])
         scafStrandSet = vh.scaffoldStrandSet()
-        stapStrandSet = vh.stapleStrandSet()
-        # install insertions and skips
-        for baseIdx in range(len(stap)):
+        for baseIdx in range(len(insertions)):
             sumOfInsertSkip = insertions[baseIdx] + skips[baseIdx]
             if sumOfInsertSkip != 0:
                 strand = scafStrandSet.getStrand(baseIdx)
                 strand.addInsertion(baseIdx, sumOfInsertSkip, useUndoStack=False)
         # end for
+        self._materialized.add(vhNum)
+    # end def
+
+    def _installColors(self):
+        part = self._part
+        # SET DEFAULT COLOR
+        for oligo in part.oligos():
+            if oligo.isStaple():
+                defaultColor = styles.DEFAULT_STAP_COLOR
+            else:
+                defaultColor = styles.DEFAULT_SCAF_COLOR
+            oligo.applyColor(defaultColor, useUndoStack=False)
         # populate colors
-        for baseIdx, colorNumber in helix['stap_colors']:
-            color = QColor((colorNumber>>16)&0xFF, (colorNumber>>8)&0xFF, colorNumber&0xFF).name()
-            strand = stapStrandSet.getStrand(baseIdx)
-            strand.oligo().applyColor(color, useUndoStack=False)
+        for helix in self._helices:
+            if helix['num'] not in self._segments:
+                continue
+            vh = part.virtualHelixAtCoord(self._vhNumToCoord[helix['num']])
+            stapStrandSet = vh.stapleStrandSet()
+            for baseIdx, colorNumber in helix['stap_colors']:
+                color = QColor((colorNumber>>16)&0xFF, (colorNumber>>8)&0xFF, colorNumber&0xFF).name()
+                strand = stapStrandSet.getStrand(baseIdx)
+                strand.oligo().applyColor(color, useUndoStack=False)
+    # end def
+# end class
 
 def isSegmentStartOrEnd(strandType, vhNum, baseIdx, fiveVH, fiveIdx, threeVH, threeIdx):
     """Returns True if the base is a breakpoint or crossover."""
@@ -27,40 +27,48 @@ from model.enum import StrandType
 
 def legacy_dict_from_doc(document, fname, helixOrderList):
     part = document.selectedPart()
+    part.materializeAll()
     numBases = part.maxBaseIdx()+1
 
     # iterate through virtualhelix list
     vhList = []
     for row, col in helixOrderList:
         vh = part.virtualHelixAtCoord((row, col))
-        # insertions and skips
-        insertionDict = part.insertions()[(row, col)]
-        insts = [0 for i in range(numBases)]
-        skips = [0 for i in range(numBases)]
-        for idx, insertion in insertionDict.iteritems():
-            if insertion.isSkip():
-                skips[idx] = insertion.length()
-            else:
-                insts[idx] = insertion.length()
-        # colors
-        stapColors = []
-        stapStrandSet = vh.stapleStrandSet()
-        for strand in stapStrandSet:
-            if strand.connection5p() == None:
-                c = str(strand.oligo().color())[1:]  # drop the hash
-                stapColors.append([strand.idx5Prime(), int(c, 16)])
-
-        vhDict = {"row":row,
-                  "col":col,
-                  "num":vh.number(),
-                  "scaf":vh.getLegacyStrandSetArray(StrandType.Scaffold),
-                  "stap":vh.getLegacyStrandSetArray(StrandType.Staple),
-                  "loop":insts,
-                  "skip":skips,
-                  "scafLoop":[],
-                  "stapLoop":[],
-                  "stap_colors":stapColors}
-        vhList.append(vhDict)
+        vhList.append(legacy_dict_from_vh(part, vh, numBases))
     bname = basename(str(fname))
     obj = {"name":bname , "vstrands":vhList}
     return obj
+
+def legacy_dict_from_vh(part, vh, numBases=None):
+    """Returns the legacy "vstrands" entry for a single virtualhelix."""
+    if numBases == None:
+        numBases = part.maxBaseIdx()+1
+    row, col = vh.coord()
+    # insertions and skips
+    insertionDict = part.insertions()[(row, col)]
+    insts = [0 for i in range(numBases)]
+    skips = [0 for i in range(numBases)]
+    for idx, insertion in insertionDict.iteritems():
+        if insertion.isSkip():
+            skips[idx] = insertion.length()
+        else:
+            insts[idx] = insertion.length()
+    # colors
+    stapColors = []
+    stapStrandSet = vh.stapleStrandSet()
+    for strand in stapStrandSet:
+        if strand.connection5p() == None:
+            c = str(strand.oligo().color())[1:]  # drop the hash
+            stapColors.append([strand.idx5Prime(), int(c, 16)])
+
+    vhDict = {"row":row,
+              "col":col,
+              "num":vh.number(),
+              "scaf":vh.getLegacyStrandSetArray(StrandType.Scaffold),
+              "stap":vh.getLegacyStrandSetArray(StrandType.Staple),
+              "loop":insts,
+              "skip":skips,
+              "scafLoop":[],
+              "stapLoop":[],
+              "stap_colors":stapColors}
+    return vhDict
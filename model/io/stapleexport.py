@@ -0,0 +1,119 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+stapleexport.py
+
+Staple export as a pipeline of generators. Sort keys are computed from
+what each oligo already knows (its 5' end, cached length and colour), so
+ordering never walks a strand. Each row's sequence is then built just
+before it is written, and only one row is in memory at a time.
+"""
+
+CSV_HEADER = "Start,End,Sequence,Length,Color\n"
+PLATE_HEADER = "Plate Name,Well Position,Sequence Name,Sequence\n"
+
+
+def _key5p(oligo):
+    strand5p = oligo.strand5p()
+    return (strand5p.virtualHelix().number(), strand5p.idx5Prime())
+
+def _keyLength(oligo):
+    return (oligo.length(),) + _key5p(oligo)
+
+def _keyColor(oligo):
+    return (oligo.color(),) + _key5p(oligo)
+
+# sortBy name -> function computing the key of an oligo
+sortKeys = {'5p': _key5p,
+            'length': _keyLength,
+            'color': _keyColor}
+
+
+def stapleOligos(part, sortBy='5p'):
+    """Returns the staple oligos of part ordered by sortKeys[sortBy]."""
+    keyFunc = sortKeys[sortBy]
+    keyed = [(keyFunc(o), o) for o in part.oligos() if o.isStaple()]
+    keyed.sort(key=lambda pair: pair[0])
+    return [o for key, o in keyed]
+# end def
+
+
+def iterStapleRows(part, sortBy='5p'):
+    """Yields the csv row of every staple, as written by Export Staples."""
+    for oligo in stapleOligos(part, sortBy):
+        yield oligo.sequenceExport()
+# end def
+
+
+def writeStapleCsv(part, f, sortBy='5p'):
+    """
+    Writes the staple csv of part to the file object f row by row.
+    Returns the number of staples written.
+    """
+    f.write(CSV_HEADER)
+    count = 0
+    for row in iterStapleRows(part, sortBy):
+        f.write(row)
+        count += 1
+    return count
+# end def
+
+
+def iterWells(plateSize=96):
+    """
+    Yields (plateNumber, well) forever, filling plates row by row:
+    A1, A2, ... A12, B1, ... H12 for 96 wells; 16 x 24 for 384.
+    """
+    if plateSize == 96:
+        nRows, nCols = 8, 12
+    elif plateSize == 384:
+        nRows, nCols = 16, 24
+    else:
+        raise ValueError("Plates have 96 or 384 wells, not %d." % plateSize)
+    plate = 1
+    while True:
+        for r in range(nRows):
+            for c in range(nCols):
+                yield plate, "%s%d" % (chr(ord('A') + r), c + 1)
+        plate += 1
+# end def
+
+
+def writePlateLayout(part, f, sortBy='5p', plateSize=96, plateName="Plate"):
+    """
+    Writes one row per staple in the plate upload layout used by oligo
+    vendors: plate, well, name (5'-3' location) and sequence. Returns the
+    number of staples written.
+    """
+    f.write(PLATE_HEADER)
+    wells = iterWells(plateSize)
+    count = 0
+    for oligo in stapleOligos(part, sortBy):
+        start, end, seq = oligo.sequenceExport().split(',')[:3]
+        plate, well = wells.next()
+        f.write("%s %d,%s,%s-%s,%s\n" % (plateName, plate, well, start, end, seq))
+        count += 1
+    return count
+# end def
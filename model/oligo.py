@@ -28,7 +28,9 @@
 
 import util
 import copy
+import random
 from strand import Strand
+from views import styles
 # import Qt stuff into the module namespace with PySide, PyQt4 independence
 util.qtWrapImport('QtCore', globals(), ['pyqtSignal', 'QObject'])
 util.qtWrapImport('QtGui', globals(), ['QUndoCommand'])
@@ -139,15 +141,16 @@ class Oligo(QObject):
     def sequenceExport(self):
         vhNum5p = self.strand5p().virtualHelix().number()
         idx5p = self.strand5p().idx5Prime()
-        seq = ''
+        seqs = []
         if self.isLoop():
             # print "A loop exists"
             raise Exception
         for strand in self.strand5p().generator3pStrand():
-            seq = seq + Strand.sequence(strand, forExport=True)
+            seqs.append(Strand.sequence(strand, forExport=True))
             if strand.connection3p() == None:  # last strand in the oligo
                 vhNum3p = strand.virtualHelix().number()
                 idx3p = strand.idx3Prime()
+        seq = ''.join(seqs)
         output = "%d[%d],%d[%d],%s,%s,%s\n" % \
                 (vhNum5p, idx5p, vhNum3p, idx3p, seq, len(seq), self._color)
         return output
@@ -187,6 +190,20 @@ class Oligo(QObject):
         return Oligo.ApplySequenceCommand(self, sequence)
     # end def
 
+    def splitAtPositions(self, positions, updateSequence=True, useUndoStack=True):
+        """
+        Splits the oligo before each of the sorted positions, counted in
+        bases (insertions included) from the 5' end of strand5p, as a single
+        command. A loop is opened at positions[0]. Raises ValueError before
+        changing anything if a position falls on a crossover, too close to a
+        strand end or inside an insertion.
+        """
+        if not positions:
+            return
+        c = Oligo.SplitAtPositionsCommand(self, positions, updateSequence)
+        util.execCommandList(self, [c], desc="Split", useUndoStack=useUndoStack)
+    # end def
+
     def setLoop(self, bool):
         self._isLoop = bool
 
@@ -398,6 +415,212 @@ class Oligo(QObject):
         # end def
     # end class
 
+    class SplitAtPositionsCommand(QUndoCommand):
+        """
+        Splits one oligo at many positions at once. The oligo is walked a
+        single time in __init__, which works out the pieces of every strand
+        that gets cut and the runs of strands that form the new oligos.
+        redo and undo then swap strands and oligos without re-walking, and
+        every affected strand is signalled exactly once, where splitting
+        one break at a time re-walks and re-signals the rest of the oligo
+        for each break.
+        """
+        def __init__(self, oligo, positions, updateSequence=True):
+            super(Oligo.SplitAtPositionsCommand, self).__init__()
+            self._oldOligo = oligo
+            self._part = part = oligo.part()
+            isLoop = oligo.isLoop()
+            length = oligo.length()
+            positions = list(positions)
+            for i in range(len(positions)):
+                p = positions[i]
+                if not 0 < p < length or (i and p <= positions[i-1]):
+                    raise ValueError("Split positions must be sorted and "
+                                     "within the oligo, got %s." % positions)
+            strand5p = oligo.strand5p()
+            colorList = styles.stapColors if strand5p.isStaple() \
+                                          else styles.scafColors
+
+            # walk the oligo once, collecting the units (uncut strands and
+            # pieces of cut strands) in 5' to 3' order and the unit index
+            # at which each new oligo begins
+            self._oldStrands = oldStrands = []  # strands that get cut
+            self._pieces = pieces = []          # what replaces them
+            self._firstPieces = firstPieces = []
+            self._lastPieces = lastPieces = []
+            self._keptStrands = keptStrands = []  # uncut, new oligo only
+            units, runStarts = [], []
+            offset, pIdx, nPos = 0, 0, len(positions)
+            for strand in strand5p.generator3pStrand():
+                tL = strand.totalLength()
+                if pIdx < nPos and positions[pIdx] == offset:
+                    raise ValueError("Cannot split at a crossover, position "
+                                     "%d." % offset)
+                cuts = []
+                while pIdx < nPos and positions[pIdx] < offset + tL:
+                    cuts.append(positions[pIdx] - offset)
+                    pIdx += 1
+                if not cuts:
+                    units.append(strand)
+                    keptStrands.append(strand)
+                else:
+                    strandPieces = self._cutStrand(strand, cuts, updateSequence)
+                    oldStrands.append(strand)
+                    firstPieces.append(strandPieces[0])
+                    lastPieces.append(strandPieces[-1])
+                    for piece in strandPieces:
+                        if piece is not strandPieces[0]:
+                            runStarts.append(len(units))
+                        units.append(piece)
+                        pieces.append(piece)
+                offset += tL
+            # end for
+
+            # reconnect the units, across cut strands as well
+            replacement = dict((s, (f, l)) for s, f, l in
+                               zip(oldStrands, firstPieces, lastPieces))
+            for strand, first, last in zip(oldStrands, firstPieces, lastPieces):
+                s5p, s3p = strand.connection5p(), strand.connection3p()
+                first.setConnection5p(replacement[s5p][1] if s5p in replacement
+                                                          else s5p)
+                last.setConnection3p(replacement[s3p][0] if s3p in replacement
+                                                         else s3p)
+            # uncut strands next to a cut one point at its end pieces instead
+            # (neighbor, oldStrand, piece)
+            self._neighbors5p = [(s.connection5p(), s, f) for s, f in
+                                 zip(oldStrands, firstPieces)
+                                 if s.connection5p() != None and
+                                    s.connection5p() not in replacement]
+            self._neighbors3p = [(s.connection3p(), s, l) for s, l in
+                                 zip(oldStrands, lastPieces)
+                                 if s.connection3p() != None and
+                                    s.connection3p() not in replacement]
+
+            # group the units into the new oligos
+            if not isLoop:
+                runStarts.insert(0, 0)
+            runs = []
+            for i in range(len(runStarts)):
+                start = runStarts[i]
+                if i+1 < len(runStarts):
+                    runs.append(units[start:runStarts[i+1]])
+                elif isLoop:  # the last run wraps around to the first cut
+                    runs.append(units[start:] + units[:runStarts[0]])
+                else:
+                    runs.append(units[start:])
+            self._newOligos = newOligos = []
+            self._runs = runs
+            for run in runs:
+                olg = Oligo(part, oligo.color() if not newOligos else \
+                                    random.choice(colorList).name())
+                olg.setStrand5p(run[0])
+                olg._length = sum(unit.totalLength() for unit in run)
+                newOligos.append(olg)
+            # end for
+        # end def
+
+        def _cutStrand(self, strand, cuts, updateSequence):
+            """
+            Returns copies of strand covering its bases in 5' to 3' order,
+            split cuts[i] bases (insertions included) after its 5' end.
+            """
+            is5to3 = strand.isDrawn5to3()
+            step = 1 if is5to3 else -1
+            idx5p, idx3p = strand.idx5Prime(), strand.idx3Prime()
+            insertions = self._part.insertions()[strand.virtualHelix().coord()]
+            # 5' index of each piece after the first
+            starts = []
+            count, idx, c = 0, idx5p, 0
+            while c < len(cuts):
+                count += 1
+                if idx in insertions:
+                    count += insertions[idx].length()
+                if count > cuts[c]:
+                    raise ValueError("Cannot split inside an insertion, "
+                                     "position %d." % cuts[c])
+                if count == cuts[c]:
+                    # same rules as StrandSet.strandCanBeSplit
+                    lo = idx5p if not starts else starts[-1]
+                    if idx == lo or abs(idx - idx3p) <= 1:
+                        raise ValueError("Cannot split %s at %d." % (strand, idx))
+                    starts.append(idx + step)
+                    c += 1
+                idx += step
+            # end while
+            bounds = [idx5p] + starts
+            ends = [s - step for s in starts] + [idx3p]
+            oldSequence = strand._sequence
+            seqOffset = 0
+            pieces = []
+            for lo, hi in zip(bounds, ends):
+                piece = strand.shallowCopy()
+                piece.setIdxs((min(lo, hi), max(lo, hi)))
+                piece.setConnection5p(None)
+                piece.setConnection3p(None)
+                if updateSequence and oldSequence:
+                    tL = piece.totalLength()
+                    piece._sequence = oldSequence[seqOffset:seqOffset + tL]
+                    seqOffset += tL
+                pieces.append(piece)
+            return pieces
+        # end def
+
+        def redo(self):
+            part = self._part
+            for strand in self._oldStrands:
+                strand.strandSet()._removeFromStrandList(strand)
+            for piece in self._pieces:
+                sS = piece.strandSet()
+                isInSet, overlap, sSetIdx = sS._findIndexOfRangeFor(piece)
+                sS._addToStrandList(piece, sSetIdx)
+            for neighbor, strand, first in self._neighbors5p:
+                neighbor.setConnection3p(first)
+            for neighbor, strand, last in self._neighbors3p:
+                neighbor.setConnection5p(last)
+            for olg, run in zip(self._newOligos, self._runs):
+                for strand in run:
+                    strand.setOligo(olg, emitSignal=False)
+            self._oldOligo.removeFromPart()
+            for olg in self._newOligos:
+                olg.addToPart(part)
+            # signal each strand once, now that the model is consistent
+            for strand in self._oldStrands:
+                strand.strandRemovedSignal.emit(strand)
+            for piece in self._pieces:
+                sS = piece.strandSet()
+                sS.strandsetStrandAddedSignal.emit(sS, piece)
+            for strand in self._keptStrands:
+                strand.strandHasNewOligoSignal.emit(strand)
+        # end def
+
+        def undo(self):
+            part = self._part
+            olg = self._oldOligo
+            for piece in self._pieces:
+                piece.strandSet()._removeFromStrandList(piece)
+            for strand in self._oldStrands:
+                sS = strand.strandSet()
+                isInSet, overlap, sSetIdx = sS._findIndexOfRangeFor(strand)
+                sS._addToStrandList(strand, sSetIdx)
+            for neighbor, strand, first in self._neighbors5p:
+                neighbor.setConnection3p(strand)
+            for neighbor, strand, last in self._neighbors3p:
+                neighbor.setConnection5p(strand)
+            for strand in self._keptStrands:
+                strand.setOligo(olg, emitSignal=False)
+            for newOlg in self._newOligos:
+                newOlg.removeFromPart()
+            olg.addToPart(part)
+            for piece in self._pieces:
+                piece.strandRemovedSignal.emit(piece)
+            for strand in self._oldStrands:
+                sS = strand.strandSet()
+                sS.strandsetStrandAddedSignal.emit(sS, strand)
+            for strand in self._keptStrands:
+                strand.strandHasNewOligoSignal.emit(strand)
+        # end def
+    # end class
+
     class RemoveOligoCommand(QUndoCommand):
         def __init__(self,oligo):
             super(Oligo.RemoveOligoCommand, self).__init__()
@@ -113,16 +113,17 @@ class HoneycombPart(Part):
     # end def
 
     def positionToCoord(self, x, y, scaleFactor=1.0):
-        radius = self._radius
-        column = int(x/(radius*root3*scaleFactor) + 0.5)
-
-        rowTemp = y/(radius*scaleFactor)
-        if (rowTemp % 3) + 0.5 > 1.0:
-            # odd parity
-            row = int((rowTemp-1)/3 + 0.5)
-        else:
-            # even parity
-            row = int(rowTemp/3 + 0.5)
+        radius = self._radius*scaleFactor
+        column = int(x/(radius*root3) + 0.5)
+        # rows alternate between even parity at 3*radius*row and odd parity
+        # one radius lower, depending on the column, so pick the nearest
+        rowTemp = int(y/(radius*3) + 0.5)
+        row, bestDy = rowTemp, None
+        for r in (rowTemp-1, rowTemp, rowTemp+1):
+            dy = abs(self.latticeCoordToPositionXY(r, column, scaleFactor)[1] - y)
+            if bestDy == None or dy < bestDy:
+                row, bestDy = r, dy
+        return row, column
     # end def
 
     ########################## Archiving / Unarchiving #########################
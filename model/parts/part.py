@@ -36,6 +36,7 @@ from model.virtualhelix import VirtualHelix
 from model.strand import Strand
 from model.oligo import Oligo
 from model.strandset import StrandSet
+from model.parts.sliceindex import SliceIndex
 from views import styles
 
 import util
@@ -94,10 +95,13 @@ class Part(QObject):
         self._highestUsedOdd = -1  # Used in _reserveHelixIDNumber
         self._highestUsedEven = -2  # same
         self._importedVHelixOrder = None
+        # Set while strands are still being loaded in the background
+        self._lazyLoader = None
         # Runtime state
         self._activeBaseIndex = self._step
         self._activeVirtualHelix = None
         self._activeVirtualHelixIdx = None
+        self._sliceIndex = SliceIndex(self)
 
     # end def
 
@@ -129,6 +133,7 @@ class Part(QObject):
     # end def
 
     def oligos(self):
+        self.materializeAll()
         return self._oligos
     # end def
 
@@ -146,6 +151,9 @@ class Part(QObject):
     # end def
 
     def undoStack(self):
+        # every edit asks for the undoStack, and edits assume the whole
+        # design is in place (oligos can span any number of helices)
+        self.materializeAll()
         return self._document.undoStack()
     # end def
 
@@ -191,13 +199,20 @@ class Part(QObject):
         return self.latticeCoordToPositionXY(self._maxRow, self._maxCol)
     # end def
 
+    def latticeDimensions(self):
+        """Returns a tuple of the number of rows and columns of the lattice."""
+        return self._maxRow, self._maxCol
+    # end def
+
     def getStapleSequences(self):
-        """getStapleSequences"""
-        s = "Start,End,Sequence,Length,Color\n"
-        for oligo in self._oligos:
-            if oligo.strand5p().strandSet().isStaple():
-                s = s + oligo.sequenceExport()
-        return s
+        """
+        Returns the csv text written by Export Staples. Rows are ordered by
+        the helix number and index of each staple's 5' end, so exporting
+        the same design twice gives the same bytes. Use
+        model.io.stapleexport.writeStapleCsv to stream it to a file.
+        """
+        from model.io.stapleexport import CSV_HEADER, iterStapleRows
+        return CSV_HEADER + ''.join(iterStapleRows(self))
 
     def getVirtualHelices(self):
         """yield an iterator to the virtualHelix references in the part"""
@@ -239,6 +254,24 @@ class Part(QObject):
                 stapLoopOlgs.append(o)
         return stapLoopOlgs
 
+    def virtualHelicesAtIdx(self, idx, strandType=StrandType.Scaffold):
+        """
+        Returns a list of the virtualHelices with a strandType strand at
+        base idx, in O(log n + k).
+        """
+        return self._sliceIndex.virtualHelicesAt(idx, strandType)
+    # end def
+
+    def virtualHelicesChangedBetween(self, fromIdx, toIdx,
+                                     strandType=StrandType.Scaffold):
+        """
+        Returns a list of (virtualHelix, hasStrandAtToIdx) for the
+        virtualHelices that have a strandType strand at only one of the
+        two indices, e.g. when the active slice moves from fromIdx to toIdx.
+        """
+        return self._sliceIndex.changedBetween(fromIdx, toIdx, strandType)
+    # end def
+
     def hasVirtualHelixAtCoord(self, coord):
         return coord in self._coordToVirtualHelix
     # end def
@@ -278,7 +311,37 @@ class Part(QObject):
             return None
     # end def
 
+    def isLoading(self):
+        """True while strands are still being installed after an open."""
+        return self._lazyLoader != None
+    # end def
+
     ### PUBLIC METHODS FOR EDITING THE MODEL ###
+    def setLazyLoader(self, loader):
+        """
+        loader installs strands and xovers after the virtualhelices have
+        been created (see legacydecoder.LegacyStrandLoader). It calls
+        setLazyLoader(None) when it is done.
+        """
+        self._lazyLoader = loader
+    # end def
+
+    def materializeVirtualHelix(self, virtualHelix):
+        """
+        Asks the loader to install the strands and xovers of virtualHelix
+        next, e.g. because it was just scrolled into view.
+        """
+        if self._lazyLoader != None:
+            self._lazyLoader.prioritize(virtualHelix)
+    # end def
+
+    def materializeAll(self):
+        """Finishes loading strands before the model is queried or edited."""
+        loader = self._lazyLoader
+        if loader != None and not loader.isBusy():
+            loader.finish()
+    # end def
+
     def autoStaple(part):
         """Autostaple does the following:
         1. Clear existing staple strands by iterating over each strand
@@ -486,6 +549,9 @@ class Part(QObject):
         self._activeVirtualHelix = None
         if useUndoStack:
             self.undoStack().beginMacro("Delete Part")
+        elif self._lazyLoader != None:
+            self._lazyLoader.cancel()  # nothing left to load into
+            self._lazyLoader = None
         # remove strands and oligos
         self.removeAllOligos(useUndoStack)
         # remove VHs
@@ -716,7 +782,7 @@ class Part(QObject):
     def getPreXoversHigh(self, strandType, neighborType, minIdx=0, maxIdx=None):
         """
         Returns all prexover positions for neighborType that are below
-        maxIdx. Used in emptyhelixitem.py.
+        maxIdx. Used in latticeitem.py.
         """
         preXO = self._scafH if strandType == StrandType.Scaffold else self._stapH
         if maxIdx == None:
@@ -728,7 +794,7 @@ class Part(QObject):
     def getPreXoversLow(self, strandType, neighborType, minIdx=0, maxIdx=None):
         """
         Returns all prexover positions for neighborType that are above
-        minIdx. Used in emptyhelixitem.py.
+        minIdx. Used in latticeitem.py.
         """
         preXO = self._scafL if strandType == StrandType.Scaffold \
                                 else self._stapL
@@ -1170,6 +1236,13 @@ class Part(QObject):
         self._importedVHelixOrder = orderedCoordList
         self.partVirtualHelicesReorderedSignal.emit(self, orderedCoordList)
 
+    def importedVHelixOrder(self):
+        """
+        The (row, col) order the helices had in the file they were read
+        from, or None. Used for encoding when there is no path view.
+        """
+        return self._importedVHelixOrder
+
     ### COMMANDS ###
     class CreateVirtualHelixCommand(QUndoCommand):
         def __init__(self, part, row, col):
@@ -0,0 +1,224 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+"""
+sliceindex.py
+
+Answers which virtual helices of a part have a strand at a base index,
+and which of them gain or lose one as the index moves, without asking
+every helix.
+"""
+
+from bisect import bisect_right
+from model.enum import StrandType
+
+
+class SliceIndex(object):
+    """
+    Owned by a Part. For each strand type the index keeps the runs of
+    bases each virtual helix covers, with touching strands merged into one
+    run, in two static structures:
+
+    - a centered interval tree, so virtualHelicesAt(idx) takes
+      O(log n + k) for n runs and k helices returned;
+    - the sorted list of run boundaries, the indices at which a helix
+      gains or loses a strand, so changedBetween(a, b) only looks at the
+      helices with a boundary between a and b.
+
+    The part's strand and helix signals mark helices dirty; the structures
+    are rebuilt the next time they are queried.
+    """
+    def __init__(self, part):
+        self._part = part
+        self._runs = ({}, {})  # per strand type: virtualHelix -> [(low, high)]
+        self._dirty = set()  # virtual helices whose runs are stale
+        self._trees = [None, None]
+        self._bounds = [None, None]  # per strand type: ([idx], [virtualHelix])
+        self._isValid = False
+        part.partStrandChangedSignal.connect(self.partStrandChangedSlot)
+        part.partVirtualHelixAddedSignal.connect(self.partVirtualHelixAddedSlot)
+        part.partActiveSliceResizeSignal.connect(self.partActiveSliceResizeSlot)
+        part.partDimensionsChangedSignal.connect(self.partDimensionsChangedSlot)
+    # end def
+
+    ### SLOTS ###
+    def partStrandChangedSlot(self, sender, virtualHelix):
+        if virtualHelix != None:
+            self._dirty.add(virtualHelix)
+            self._isValid = False
+    # end def
+
+    def partVirtualHelixAddedSlot(self, sender, virtualHelix):
+        self._dirty.add(virtualHelix)
+        self._isValid = False
+    # end def
+
+    def partActiveSliceResizeSlot(self, sender):
+        """Sent after a virtual helix is removed."""
+        self.invalidate()
+    # end def
+
+    def partDimensionsChangedSlot(self, sender):
+        """Moving the minimum base index shifts every strand."""
+        self.invalidate()
+    # end def
+
+    ### PUBLIC METHODS ###
+    def invalidate(self):
+        """Rebuilds the runs of every helix on the next query."""
+        self._runs = ({}, {})
+        self._dirty = set(self._part.getVirtualHelices())
+        self._isValid = False
+    # end def
+
+    def hasStrandAt(self, virtualHelix, idx, strandType=StrandType.Scaffold):
+        self._validate()
+        return _covers(self._runs[strandType].get(virtualHelix, ()), idx)
+    # end def
+
+    def virtualHelicesAt(self, idx, strandType=StrandType.Scaffold):
+        """Returns a list of the virtual helices with a strand at idx."""
+        self._validate()
+        ret = []
+        node = self._trees[strandType]
+        while node != None:
+            center, byLow, byHigh, left, right = node
+            if idx < center:
+                for low, high, vh in byLow:  # ascending low
+                    if low > idx:
+                        break
+                    ret.append(vh)
+                node = left
+            elif idx > center:
+                for low, high, vh in byHigh:  # descending high
+                    if high < idx:
+                        break
+                    ret.append(vh)
+                node = right
+            else:
+                ret.extend(vh for low, high, vh in byLow)
+                break
+        return ret
+    # end def
+
+    def changedBetween(self, fromIdx, toIdx, strandType=StrandType.Scaffold):
+        """
+        Returns a list of (virtualHelix, hasStrandAtToIdx) for the helices
+        that have a strand at exactly one of fromIdx and toIdx.
+        """
+        self._validate()
+        if fromIdx == toIdx:
+            return []
+        lo, hi = min(fromIdx, toIdx), max(fromIdx, toIdx)
+        positions, helices = self._bounds[strandType]
+        runs = self._runs[strandType]
+        ret = []
+        seen = set()
+        # coverage can only differ for a helix with a run boundary p,
+        # where it changes between p-1 and p, in lo+1..hi
+        for i in xrange(bisect_right(positions, lo), bisect_right(positions, hi)):
+            vh = helices[i]
+            if vh in seen:
+                continue
+            seen.add(vh)
+            vhRuns = runs[vh]
+            isActiveNow = _covers(vhRuns, toIdx)
+            if isActiveNow != _covers(vhRuns, fromIdx):
+                ret.append((vh, isActiveNow))
+        return ret
+    # end def
+
+    ### PRIVATE SUPPORT METHODS ###
+    def _validate(self):
+        if self._isValid:
+            return
+        part = self._part
+        for vh in self._dirty:
+            isInPart = part.virtualHelixAtCoord(vh.coord()) is vh
+            for strandType, strandSet in enumerate(vh.getStrandSets()):
+                if isInPart:
+                    self._runs[strandType][vh] = _mergedRuns(strandSet)
+                else:
+                    self._runs[strandType].pop(vh, None)
+        self._dirty = set()
+        for strandType in (StrandType.Scaffold, StrandType.Staple):
+            intervals = []
+            bounds = []
+            for vh, vhRuns in self._runs[strandType].iteritems():
+                for low, high in vhRuns:
+                    intervals.append((low, high, vh))
+                    # coverage changes between low-1 and low, high and high+1
+                    bounds.append((low, vh))
+                    bounds.append((high + 1, vh))
+            intervals.sort(key=lambda interval: interval[0])
+            self._trees[strandType] = _buildTree(intervals)
+            bounds.sort(key=lambda bound: bound[0])
+            self._bounds[strandType] = ([b[0] for b in bounds],
+                                        [b[1] for b in bounds])
+        self._isValid = True
+    # end def
+# end class
+
+
+def _mergedRuns(strandSet):
+    """The (low, high) runs of bases covered by strandSet, in order."""
+    runs = []
+    for strand in strandSet.generatorStrand():
+        low, high = strand.idxs()
+        if runs and low <= runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], max(high, runs[-1][1]))
+        else:
+            runs.append((low, high))
+    return runs
+# end def
+
+
+def _covers(runs, idx):
+    """True if one of the sorted, disjoint runs contains idx."""
+    i = bisect_right(runs, (idx, float('inf'))) - 1
+    return i >= 0 and runs[i][1] >= idx
+# end def
+
+
+def _buildTree(intervals):
+    """
+    Builds a centered interval tree from (low, high, value) triples sorted
+    by low. A node is (center, byLow, byHigh, left, right), where byLow and
+    byHigh hold the intervals containing center sorted by ascending low and
+    descending high.
+    """
+    if not intervals:
+        return None
+    mids = sorted((low + high)//2 for low, high, value in intervals)
+    center = mids[len(mids)//2]
+    left, here, right = [], [], []
+    for interval in intervals:
+        if interval[1] < center:
+            left.append(interval)
+        elif interval[0] > center:
+            right.append(interval)
+        else:
+            here.append(interval)
+    byHigh = sorted(here, key=lambda interval: interval[1], reverse=True)
+    return (center, here, byHigh, _buildTree(left), _buildTree(right))
+# end def
@@ -31,7 +31,8 @@ import objc, os
 from Foundation import *
 from AppKit import *
 from controllers.documentcontroller import DocumentController
-from model.io.decoder import decode
+from model.io.decoder import decodeFile
+from model.io.compression import uncompressedFilename
 from cadnano import app as sharedCadnanoObj
 
 
@@ -39,12 +40,12 @@ class CNApplicationDelegate(NSObject):
     def application_openFile_(self, app, f):
         if f == "main.py":  # ignore
             return
-        extension = os.path.splitext(f)[1].lower()
+        extension = os.path.splitext(uncompressedFilename(f))[1].lower()
         if extension not in ('.nno', '.json', '.cadnano'):
             print "Could not open file %s (bad extension %s)"%(f, extension)
             return
         dc = list(sharedCadnanoObj().documentControllers)[0]
-        decode(dc.document(), file(str(f)).read())
+        decodeFile(dc.document(), str(f))
         return None
 
     def application_openFiles_(self, app, fs):
@@ -1,6 +1,8 @@
-from autobreakconfig import AutobreakConfig
 import cadnano, util
-util.qtWrapImport('QtGui', globals(), ['QIcon', 'QPixmap', 'QAction'])
+import autobreak  # installs cadnano.app().breakStaples, with or without a gui
+if cadnano.app().isGui():
+    from autobreakconfig import AutobreakConfig
+    util.qtWrapImport('QtGui', globals(), ['QIcon', 'QPixmap', 'QAction'])
 
 class AutobreakHandler(object):
     def __init__(self, document, window):
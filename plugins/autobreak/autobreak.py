@@ -1,11 +1,14 @@
 import util, cadnano
-import heapq
+import heapq, itertools, os
 from model.strandset import StrandSet
 from model.enum import StrandType
 from model.parts.part import Part
 from model.oligo import Oligo
 from multiprocessing import Pool, cpu_count
 from operator import itemgetter
+import staplesolver
+from scorers import scorerForSettings
+from solutioncache import SolutionCache, cacheKey, userCacheDir, CACHE_FILENAME
 
 try:
     import staplegraph
@@ -13,23 +16,244 @@ try:
 except:
     nx = False
 
-token_cache = {}
+# solutions by cacheKey (or by stringifyToken for nxBreakStaple)
+token_cache = SolutionCache()
 
-def breakStaples(part, settings):
-    clearTokenCache()
+# fewer distinct token lists than this are solved without starting a pool
+MIN_POOL_JOBS = 16
+
+def breakStaples(part, settings, progress=None):
+    """
+    Breaks the selected staple oligos of part, or every staple oligo if
+    none are selected, as a single Auto-Break on the undo stack.
+
+    All oligos are tokenized first into plain lists, which are solved on a
+    process pool (settings['processes'] workers, one per core by default)
+    and only then applied to the model. progress, if given, is called as
+    progress(done, total) while solving and applying. The three phases are
+    also available separately (planBreaks, solveBreakPlan and
+    applyBreakPlan) so that solving can run off the gui thread.
+
+    settings['stapleScorer'] selects the cost of a staple, see scorers.py.
+    Solutions are remembered in token_cache. With settings['persistentCache']
+    the cache is also kept on disk in the user cache directory, so later
+    sessions start warm.
+    """
+    plan = planBreaks(part, settings)
+    solveBreakPlan(plan, progress)
+    applyBreakPlan(part, plan, progress)
+# end def
+
+class BreakPlan(object):
+    """
+    The part of an Auto-Break that does not touch the model: a snapshot of
+    each oligo's tokens and the solver jobs still to run. oligoJobs lists
+    (oligo, tokenList, key); solutions maps key to (breakItems, startToken),
+    or None if unsolvable, and pending maps key to a solver job. undoIndex
+    is the undo stack index the snapshot was taken at.
+    """
+    def __init__(self, settings, breakOligos, clearSelection, undoIndex=None):
+        self.settings = settings
+        self.breakOligos = breakOligos
+        self.clearSelection = clearSelection
+        self.undoIndex = undoIndex
+        self.oligoJobs = []
+        self.solutions = {}
+        self.pending = {}
+        self.solved = {}  # key -> new solutions, for token_cache
+    # end def
+
+    def total(self):
+        """Number of progress steps: one per solver job and per oligo."""
+        return len(self.pending) + len(self.oligoJobs)
+    # end def
+
+    def isStale(self, part):
+        """True if part was edited, undone or redone since planning."""
+        return part.undoStack().index() != self.undoIndex
+    # end def
+# end class
+
+def planBreaks(part, settings):
+    """
+    Tokenizes the oligos breakStaples would break and looks their
+    solutions up in token_cache. Reads the model but does not change it.
+    """
+    scorer = scorerForSettings(settings)
+    if settings.get('persistentCache', False):
+        usePersistentCache()
     breakOligos = part.document().selectedOligos()
+    clearSelection = bool(breakOligos)
     if not breakOligos:
         breakOligos = part.oligos()
-    else:
-        part.document().clearAllSelected()
-    for o in list(breakOligos):
+    plan = BreakPlan(settings, list(breakOligos), clearSelection,
+                     part.undoStack().index())
+    staple_limits = stapleLimits(settings)
+    for o in plan.breakOligos:
         if not o.isStaple():
             continue
-        if nx:
-            nxBreakStaple(o, settings)
+        tokenList = tokenizeOligo(o, settings)
+        if len(tokenList) == 0:
+            continue
+        bound = bindScorer(scorer, o, tokenList, settings)
+        key = cacheKey(tokenList, o.isLoop(), staple_limits,
+                       bound.cacheId() if bound else scorer.cacheId())
+        plan.oligoJobs.append((o, tokenList, key))
+        if key not in plan.solutions and key not in plan.pending:
+            solution = token_cache.get(key)
+            if solution != None:
+                plan.solutions[key] = solution
+            else:
+                plan.pending[key] = (tokenList, o.isLoop(), staple_limits,
+                                     bound)
+    return plan
+# end def
+
+def solveBreakPlan(plan, progress=None, isCancelled=None):
+    """
+    Solves the pending jobs of plan. Only plain lists are touched, so this
+    may run on any thread. Returns False, leaving plan unsolved, if
+    isCancelled() turns true first.
+    """
+    keys = plan.pending.keys()
+    results = solveTokenLists([plan.pending[k] for k in keys],
+                              plan.settings.get('processes', None),
+                              progress, plan.total(), isCancelled)
+    if results == None:
+        return False
+    for key, result in zip(keys, results):
+        if result != None:
+            plan.solutions[key] = (result[1], result[0])
+            plan.solved[key] = plan.solutions[key]
         else:
-            print "Not breaking"
-            # breakStaple(o, settings)
+            plan.solutions[key] = None
+    plan.pending = {}
+    return True
+# end def
+
+def applyBreakPlan(part, plan, progress=None):
+    """
+    Performs the breaks of a solved plan as one Auto-Break macro. Returns
+    False, changing nothing, if the plan is stale, since its oligos may
+    have been split, merged or removed since.
+    """
+    if plan.isStale(part):
+        return False
+    for key, (breakItems, startToken) in plan.solved.iteritems():
+        addToTokenCache(key, breakItems, startToken)
+    if plan.clearSelection:
+        part.document().clearAllSelected()
+    total = plan.total()
+    done = total - len(plan.oligoJobs)
+    util.beginSuperMacro(part, desc="Auto-Break")
+    for o, tokenList, key in plan.oligoJobs:
+        if plan.solutions[key] != None:
+            breakItems, startToken = plan.solutions[key]
+            applyBreakSolution(o, tokenList, breakItems, startToken,
+                               plan.settings)
+        elif o.isLoop():
+            print "unbroken Loop", o, o.length()
+        done += 1
+        if progress != None:
+            progress(done, total)
+    util.endSuperMacro(part)
+    token_cache.save()
+    return True
+# end def
+
+def usePersistentCache(filename=None):
+    """
+    Backs token_cache with filename, by default a file in the user cache
+    directory, loading the solutions saved there by earlier sessions.
+    """
+    if filename == None:
+        filename = os.path.join(userCacheDir(), CACHE_FILENAME)
+    if token_cache.filename() != filename:
+        token_cache.setFilename(filename)
+# end def
+
+def stapleLimits(settings):
+    return [settings.get('minStapleLen', 30),
+            settings.get('maxStapleLen', 40),
+            settings.get('tgtStapleLen', 35)]
+# end def
+
+def bindScorer(scorer, oligo, tokenList, settings):
+    """Returns scorer.forOligo for oligo and its tokenList."""
+    origin = loopLastToken(oligo, settings) if oligo.isLoop() else 0
+    return scorer.forOligo(oligo, tokenList, origin)
+# end def
+
+def solveTokenLists(jobs, processes=None, progress=None, total=None,
+                    isCancelled=None):
+    """
+    Returns staplesolver.solveJob of each (tokenList, isLoop,
+    staple_limits, scorer) job, in order. Enough jobs are split into chunks
+    over a pool of processes; progress(done, total) is called per solved job.
+    Returns None, stopping the pool, once isCancelled() is true.
+    """
+    if total == None:
+        total = len(jobs)
+    if processes == None:
+        processes = cpu_count()
+    if processes < 2 or len(jobs) < MIN_POOL_JOBS:
+        resultIter = itertools.imap(staplesolver.solveJob, jobs)
+        pool = None
+    else:
+        pool = Pool(processes)
+        # a few chunks per worker keeps them evenly loaded
+        chunkSize = max(1, len(jobs) // (4*processes))
+        resultIter = pool.imap(staplesolver.solveJob, jobs, chunkSize)
+    results = []
+    try:
+        for result in resultIter:
+            if isCancelled != None and isCancelled():
+                return None
+            results.append(result)
+            if progress != None:
+                progress(len(results), total)
+    finally:
+        if pool != None:
+            pool.terminate()
+            pool.join()
+    return results
+# end def
+
+def dpBreakStaple(oligo, settings):
+    """
+    Breaks oligo using staplesolver, which needs no networkx and solves
+    staple loops directly rather than one rotation at a time.
+    """
+    tokenList = tokenizeOligo(oligo, settings)
+    if len(tokenList) == 0:
+        return
+    staple_limits = stapleLimits(settings)
+    scorer = scorerForSettings(settings)
+    bound = bindScorer(scorer, oligo, tokenList, settings)
+    key = cacheKey(tokenList, oligo.isLoop(), staple_limits,
+                   bound.cacheId() if bound else scorer.cacheId())
+    solution = token_cache.get(key)
+    if solution != None:
+        breakItems, startToken = solution
+    else:
+        result = staplesolver.solveJob((tokenList, oligo.isLoop(),
+                                        staple_limits, bound))
+        if result == None:
+            if oligo.isLoop():
+                print "unbroken Loop", oligo, oligo.length()
+            return
+        startToken, breakItems = result[0], result[1]
+        addToTokenCache(key, breakItems, startToken)
+    applyBreakSolution(oligo, tokenList, breakItems, startToken, settings)
+# end def
+
+def applyBreakSolution(oligo, tokenList, breakItems, startToken, settings):
+    firstBreak = None
+    if oligo.isLoop():
+        # token 0 of a loop starts lastToken bases before the 5' end
+        lastToken = loopLastToken(oligo, settings)
+        firstBreak = (sum(tokenList[0:startToken]) - lastToken) % oligo.length()
+    performBreakLengths(oligo, breakItems, firstBreak)
 # end def
 
 def nxBreakStaple(oligo, settings):
@@ -92,7 +316,7 @@ def addToTokenCache(cacheString, breakItems, shortestScoreIdx):
 # end def
 
 def clearTokenCache():
-    token_cache = {}
+    token_cache.clear()
 # end def
 
 def stringifyToken(oligo, tokenList):
@@ -134,12 +358,17 @@ def tokenizeOligo(oligo, settings):
                 a -= 1
             # end while
             tokenList.append(minStapleLegLen)
-        else:
+        elif len(tokenList) == 0:
             tokenList.append(a)
+        else:
+            # both ends are crossovers, so no break can fall on either side
+            tokenList[-1] = tokenList[-1] + a
         # end if
     # end for
 
     if oligo.isLoop():
+        if len(tokenList) < 2:
+            return []
         loop_token = tokenList.pop(-1)
         tokenList[0] += loop_token
 
@@ -151,66 +380,56 @@ def tokenizeOligo(oligo, settings):
     return tokenList
 # end def
 
+def loopLastToken(oligo, settings):
+    """
+    Returns the length of the token tokenizeOligo folded from the 3' end of
+    a loop into its first token, i.e. how far before the 5' end of the
+    oligo's strand5p that token starts.
+    """
+    minStapleLegLen = settings.get('minStapleLegLen', 2)
+    firstStrand = oligo.strand5p()
+    strand = firstStrand.connection5p()
+    lastToken = 0
+    while True:
+        a = strand.totalLength()
+        if a > 2*minStapleLegLen-1 and not strand.hasInsertion():
+            return lastToken + minStapleLegLen
+        lastToken += a
+        if strand == firstStrand:
+            return lastToken
+        strand = strand.connection5p()
+    # end while
+# end def
+
 def nxPerformBreaks(oligo, breakItems, tokenList, startingToken, minStapleLegLen):
     """ fullBreakptSoln is in the format of an IBS (see breakStrands).
     This function performs the breaks proposed by the solution. """
-    part = oligo.part()
-    if breakItems:
-        util.beginSuperMacro(part, desc="Auto-Break")
-
-        # temp = []
-        # for s in oligo.strand5p().generator3pStrand():
-        #     temp.append(s.length())
-        # print "the segments", sum(temp), temp
-
-        # print "the sum is ", sum(breakList[1]), "==", oligo.length(), "isLoop", oligo.isLoop()
-        # print "the breakItems", breakItems
-
-        strand = oligo.strand5p()
-        if oligo.isLoop():
-            # start things off make first cut
-            length0 = sum(tokenList[0:startingToken+1])
-            strand, idx, is5to3 = getStrandAtLengthInOligo(strand, length0-minStapleLegLen)
-            sS = strand.strandSet()
-            found, sSIdx = sS.getStrandIndex(strand)
-            # found, overlap, sSIdx = sS._findIndexOfRangeFor(strand)
-            strand.split(idx, updateSequence=False)
-            strand = sS._strandList[sSIdx+1] if is5to3 else sS._strandList[sSIdx]
-
-        # now iterate through all the breaks
-        for b in breakItems[0:-1]:
-            if strand.oligo().length() > b:
-                strand, idx, is5to3 = getStrandAtLengthInOligo(strand, b)
-                sS = strand.strandSet()
-                found, sSIdx = sS.getStrandIndex(strand)
-                # found, overlap, sSIdx = sS._findIndexOfRangeFor(strand)
-                strand.split(idx, updateSequence=False)
-                strand = sS._strandList[sSIdx+1] if is5to3 else sS._strandList[sSIdx]
-            else:
-                raise Exception("Oligo length %d is shorter than break length %d" % (strand.oligo().length(), b))
-        util.endSuperMacro(part)
+    firstBreak = None
+    if oligo.isLoop():
+        firstBreak = sum(tokenList[0:startingToken+1]) - minStapleLegLen
+    performBreakLengths(oligo, breakItems, firstBreak)
 # end def
 
-def getStrandAtLengthInOligo(strandIn, length):
-    strandGen = strandIn.generator3pStrand()
-    strand = strandGen.next()
-    assert(strand == strandIn)
-    # find the starting strand
-    strandCounter = strand.totalLength()
-    while strandCounter < length:
-        try:
-            strand = strandGen.next()
-        except:
-            print "yikes: ", strand.connection3p(), strandCounter, length, strand.oligo().isLoop(), strandIn.oligo().length()
-            raise Exception
-        strandCounter += strand.totalLength()
-    # end while
-    is5to3 = strand.isDrawn5to3()
-    delta = strand.totalLength() - (strandCounter - length) - 1
-    idx5p = strand.idx5Prime()
-    # print "diff", delta, "idx5p", idx5p, "5to3", is5to3, "sCount", strandCounter, "L", length
-    outIdx = idx5p + delta if is5to3 else idx5p - delta
-    return (strand, outIdx, is5to3)
+def performBreakLengths(oligo, breakItems, firstBreak=None):
+    """
+    Splits oligo into staples of the lengths in breakItems, as one command.
+    A loop is first cut firstBreak bases after the 5' end of its strand5p.
+    """
+    if not breakItems:
+        return
+    length = oligo.length()
+    positions = []
+    pos = firstBreak if oligo.isLoop() else 0
+    if oligo.isLoop():
+        positions.append(pos)
+    for b in breakItems[0:-1]:
+        pos += b
+        positions.append(pos % length)
+    positions.sort()
+    try:
+        oligo.splitAtPositions(positions, updateSequence=False)
+    except ValueError, e:
+        print "could not break", oligo, e
 # end def
 
 # Scoring functions takes an incremental breaking solution (IBS, see below)
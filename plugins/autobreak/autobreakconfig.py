@@ -26,17 +26,57 @@
 config
 Created by Jonathan deWerd on 2012-01-19.
 """
+import sys, traceback
 import util, cadnano
 import autobreakconfig_ui
 import autobreak
-util.qtWrapImport('QtGui', globals(), ['QDialog', 'QKeySequence', 'QDialogButtonBox'])
-util.qtWrapImport('QtCore', globals(), ['Qt'])
+util.qtWrapImport('QtGui', globals(), ['QDialog', 'QKeySequence', 'QDialogButtonBox',
+                                       'QMessageBox', 'QProgressDialog'])
+util.qtWrapImport('QtCore', globals(), ['Qt', 'QThread', 'pyqtSignal'])
+
+
+class AutobreakWorker(QThread):
+    """
+    Solves an autobreak.BreakPlan off the gui thread. The plan only holds
+    token lists, so the model is never touched here; the breaks are applied
+    by whoever handles finished, back on the gui thread.
+    """
+    progressChangedSignal = pyqtSignal(int, int)  # done, total
+
+    def __init__(self, plan, parent=None):
+        QThread.__init__(self, parent)
+        self.plan = plan
+        self.solved = False
+        self.error = None  # the traceback if solving raised
+        self._cancelled = False
+
+    def cancel(self):
+        """Asks the solver to stop after the job it is working on."""
+        self._cancelled = True
+
+    def isCancelled(self):
+        return self._cancelled
+
+    def run(self):
+        try:
+            self.solved = autobreak.solveBreakPlan(self.plan,
+                                                   self.progressChangedSignal.emit,
+                                                   self.isCancelled)
+        except Exception:
+            self.error = traceback.format_exc()
+            sys.stderr.write(self.error)
+            self.solved = False
+# end class
+
 
 class AutobreakConfig(QDialog, autobreakconfig_ui.Ui_Dialog):
     def __init__(self, parent, handler):
         QDialog.__init__(self, parent, Qt.Sheet)
         self.setupUi(self)
         self.handler = handler
+        self.worker = None
+        self.progressDialog = None
+        self.part = None
         fb = self.buttonBox.button(QDialogButtonBox.Cancel)
         fb.setShortcut(QKeySequence(Qt.CTRL | Qt.Key_R ))
 
@@ -48,19 +88,62 @@ class AutobreakConfig(QDialog, autobreakconfig_ui.Ui_Dialog):
 
     def accept(self):
         part = self.handler.doc.controller().activePart()
-        if part != None:
+        if part != None and self.worker == None:
+            # no process pool: forking from a QThread inside the gui
+            # process would copy its Qt state into the workers
             settings = {\
                 'stapleScorer'    : autobreak.tgtLengthStapleScorer,\
                 'minStapleLegLen' : self.minLegLengthSpinBox.value(),\
                 'minStapleLen'    : self.minLengthSpinBox.value(),\
                 'maxStapleLen'    : self.maxLengthSpinBox.value(),\
+                'processes'       : 1,\
             }
+            plan = autobreak.planBreaks(part, settings)
+            # window modal and shown at once, so the design cannot change
+            # under the solver; applyBreakPlan still drops a stale plan
+            progress = QProgressDialog("Breaking staples...", "Cancel",
+                                       0, max(1, plan.total()),
+                                       self.handler.win)
+            progress.setWindowModality(Qt.WindowModal)
+            progress.setAutoReset(False)
+            progress.setAutoClose(False)
+            progress.setMinimumDuration(0)
+            progress.show()
+            worker = AutobreakWorker(plan, self)
+            worker.progressChangedSignal.connect(self.progressChangedSlot)
+            worker.finished.connect(self.workerFinishedSlot)
+            progress.canceled.connect(worker.cancel)
+            self.part, self.worker, self.progressDialog = part, worker, progress
+            worker.start()
+        self.close()
+
+    def progressChangedSlot(self, done, total):
+        if self.progressDialog != None:
+            self.progressDialog.setValue(done)
+
+    def workerFinishedSlot(self):
+        """
+        Applies the solved breaks on the gui thread, unless cancelled, and
+        tells the user if solving failed or the design changed meanwhile.
+        """
+        worker, progress, part = self.worker, self.progressDialog, self.part
+        self.worker = self.progressDialog = self.part = None
+        progress.close()
+        message = None
+        if worker.error != None:
+            message = "Auto-Break failed:\n\n%s" % \
+                                    worker.error.strip().splitlines()[-1]
+        elif worker.solved and not worker.isCancelled():
+            # no progress here: setValue on a modal dialog processes events,
+            # which must not happen while the model is half edited
             self.handler.win.pathGraphicsView.setViewportUpdateOn(False)
-            # print "pre verify"
-            # part.verifyOligos()
-            # print "breakStaples"
-            autobreak.breakStaples(part, settings)
-            # print "post break verify"
-            # part.verifyOligos()
+            applied = autobreak.applyBreakPlan(part, worker.plan)
             self.handler.win.pathGraphicsView.setViewportUpdateOn(True)
-        self.close()
+            if not applied:
+                message = "The design changed while Auto-Break was " \
+                          "solving, so no staples were broken. " \
+                          "Please run it again."
+        if message != None:
+            QMessageBox.warning(self.handler.win, "Auto-Break", message)
+        progress.deleteLater()
+        worker.deleteLater()
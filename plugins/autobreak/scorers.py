@@ -0,0 +1,286 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+scorers.py
+
+Staple scorers for the autobreak solver. A scorer is created once per
+autobreak run from the settings dictionary. For each oligo, forOligo
+returns the object the solver calls, which may hold per-oligo tables.
+The solver asks that object for cost(start, end), the cost of one staple
+covering bases start..end-1 counted from the start of the oligo's first
+token. Lower is better. Bound scorers are pickled to the solver's
+worker processes, so they hold only plain data.
+
+Scorers are looked up by name in the scorers dictionary, and
+registerScorer adds new ones:
+
+    class MyScorer(StapleScorer):
+        scorerId = 'mine'
+        ...
+    registerScorer(MyScorer)
+    autobreak.breakStaples(part, {'stapleScorer': 'mine'})
+"""
+
+import hashlib
+from math import log
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# name -> StapleScorer subclass
+scorers = {}
+
+
+def registerScorer(scorerClass):
+    scorers[scorerClass.scorerId] = scorerClass
+    return scorerClass
+# end def
+
+
+class StapleScorer(object):
+    """
+    Base class for scorers. Subclasses set scorerId, used both to select
+    the scorer and in solution cache keys, and override cost, which by
+    default is the distance from settings['tgtStapleLen']. Scorers that
+    depend on the oligo (e.g. its sequence) override forOligo as well.
+    """
+    scorerId = None
+
+    def __init__(self, settings):
+        self._settings = settings
+        self._tgtLen = settings.get('tgtStapleLen', 35)
+    # end def
+
+    def forOligo(self, oligo, tokenList, origin=0):
+        """
+        Returns the scorer to solve oligo with, or None to let the solver
+        use its built-in target length cost. origin is how many bases before
+        the 5' end of oligo.strand5p() token 0 begins, which is only nonzero
+        for loops. Called on the main thread, so it may read the model.
+        """
+        return self
+    # end def
+
+    def cacheId(self):
+        """Everything cached solutions depend on besides the token list."""
+        return self.scorerId
+    # end def
+
+    def cost(self, start, end):
+        """The distance of the staple's length from the target length."""
+        return abs(end - start - self._tgtLen)
+    # end def
+# end class
+
+
+class LengthScorer(StapleScorer):
+    """
+    The base class's length cost, the one used by staplegraph. The solver
+    computes it inline, which is why forOligo returns None.
+    """
+    scorerId = 'tgtLength'
+
+    def forOligo(self, oligo, tokenList, origin=0):
+        return None
+# end class
+registerScorer(LengthScorer)
+
+
+# SantaLucia (1998) unified nearest-neighbor parameters, keyed by the top
+# strand dinucleotide read 5' to 3': (dH kcal/mol, dS cal/(K mol))
+_NN = {'AA': (-7.9, -22.2), 'TT': (-7.9, -22.2),
+       'AT': (-7.2, -20.4),
+       'TA': (-7.2, -21.3),
+       'CA': (-8.5, -22.7), 'TG': (-8.5, -22.7),
+       'GT': (-8.4, -22.4), 'AC': (-8.4, -22.4),
+       'CT': (-7.8, -21.0), 'AG': (-7.8, -21.0),
+       'GA': (-8.2, -22.2), 'TC': (-8.2, -22.2),
+       'CG': (-10.6, -27.2),
+       'GC': (-9.8, -24.4),
+       'GG': (-8.0, -19.9), 'CC': (-8.0, -19.9)}
+# initiation, charged once per terminal base
+_INIT = {'A': (2.3, 4.1), 'T': (2.3, 4.1),
+         'G': (0.1, -2.8), 'C': (0.1, -2.8)}
+_R = 1.987  # cal/(K mol)
+_BASES = 'ACGT'
+
+
+class TmScorer(StapleScorer):
+    """
+    Scores a staple by how far its predicted melting temperature is from
+    settings['tgtStapleTm'] (degrees C, default 60). If
+    settings['minDomainTm'] is set, each degree by which a domain at either
+    end of the staple (from the break to the nearest crossover) falls
+    below it adds settings['domainWeight'] (default 1) to the cost.
+
+    forOligo builds cumulative nearest-neighbor dH and dS arrays over the
+    oligo's sequence, with numpy when available, so the dH and dS of any
+    window are two differences and scoring a staple is O(1) no matter its
+    length. Oligos without a complete sequence fall back to the length
+    cost.
+    """
+    scorerId = 'nnTm'
+
+    def __init__(self, settings):
+        super(TmScorer, self).__init__(settings)
+        self._tgtTm = settings.get('tgtStapleTm', 60.)
+        self._minDomainTm = settings.get('minDomainTm', None)
+        self._domainWeight = settings.get('domainWeight', 1.)
+        self._naConc = settings.get('naConc', 0.05)        # mol/L
+        self._stapleConc = settings.get('stapleConc', 1e-7)  # mol/L
+        self._sequenceHash = None
+        self._cumH = self._cumS = None
+        self._initH = self._initS = None
+        self._nextXover = self._prevXover = None
+    # end def
+
+    def forOligo(self, oligo, tokenList, origin=0):
+        seq = oligo.sequence()
+        length = oligo.length()
+        if not seq or len(seq) != length:
+            return None
+        seq = seq.upper()
+        if seq.strip(_BASES):
+            return None  # unassigned or ambiguous bases
+        # crossovers, as positions from the 5' end of strand5p
+        xovers = [0]
+        for strand in oligo.strand5p().generator3pStrand():
+            xovers.append(xovers[-1] + strand.totalLength())
+        if oligo.isLoop():
+            # count from token 0 and cover two turns, since staples may
+            # wrap past the end
+            origin %= length
+            if origin:
+                seq = seq[-origin:] + seq[:-origin]
+            xovers = sorted(set([(x + origin) % length for x in xovers]))
+            xovers = xovers + [x + length for x in xovers] + [2*length]
+            seq = seq + seq
+        bound = TmScorer(self._settings)
+        bound._sequenceHash = hashlib.sha1(seq).hexdigest()
+        bound._buildTables(seq, xovers)
+        return bound
+    # end def
+
+    def cacheId(self):
+        return "%s|%g|%s|%g|%g|%g|%s" % (self.scorerId, self._tgtTm,
+                                         self._minDomainTm, self._domainWeight,
+                                         self._naConc, self._stapleConc,
+                                         self._sequenceHash)
+    # end def
+
+    def cost(self, start, end):
+        score = abs(self.tm(start, end) - self._tgtTm)
+        if self._minDomainTm != None:
+            minTm = self._minDomainTm
+            first = min(self._nextXover[start], end)
+            # a crossover at end, e.g. the 3' end, is not inside the staple
+            last = max(self._prevXover[end-1], start)
+            shortfall = max(0., minTm - self.tm(start, first)) + \
+                        max(0., minTm - self.tm(last, end))
+            score += self._domainWeight*shortfall
+        return score
+    # end def
+
+    def tm(self, start, end):
+        """Melting temperature of bases start..end-1, in degrees C."""
+        n = end - start
+        if n < 2:
+            return -273.15
+        dH = self._cumH[end-1] - self._cumH[start] + \
+             self._initH[start] + self._initH[end-1]
+        dS = self._cumS[end-1] - self._cumS[start] + \
+             self._initS[start] + self._initS[end-1] + \
+             0.368*(n - 1)*log(self._naConc)
+        return 1000.*dH/(dS + _R*log(self._stapleConc/4.)) - 273.15
+    # end def
+
+    ### PRIVATE SUPPORT METHODS ###
+    def _buildTables(self, seq, xovers):
+        """
+        _cumH[k] is the summed stacking dH of dinucleotides 0..k-1 (base k
+        paired with base k+1), so a window's stacks are a difference of two
+        entries. _nextXover[k] is the first crossover after position k and
+        _prevXover[k] the last one at or before it.
+        """
+        n = len(seq)
+        if numpy != None:
+            codes = numpy.array([_BASES.index(b) for b in seq], dtype=numpy.int8)
+            tableH = numpy.zeros(16)
+            tableS = numpy.zeros(16)
+            for pair, (h, s) in _NN.iteritems():
+                i = 4*_BASES.index(pair[0]) + _BASES.index(pair[1])
+                tableH[i], tableS[i] = h, s
+            pairs = 4*codes[:-1] + codes[1:]
+            cumH = numpy.zeros(n)
+            cumS = numpy.zeros(n)
+            cumH[1:] = numpy.cumsum(tableH[pairs])
+            cumS[1:] = numpy.cumsum(tableS[pairs])
+            initTable = numpy.array([_INIT[b] for b in _BASES])
+            # python lists index much faster than arrays from pure python
+            self._cumH, self._cumS = cumH.tolist(), cumS.tolist()
+            self._initH = initTable[codes, 0].tolist()
+            self._initS = initTable[codes, 1].tolist()
+        else:
+            cumH, cumS = [0.]*n, [0.]*n
+            for k in xrange(1, n):
+                h, s = _NN[seq[k-1:k+1]]
+                cumH[k] = cumH[k-1] + h
+                cumS[k] = cumS[k-1] + s
+            self._cumH, self._cumS = cumH, cumS
+            self._initH = [_INIT[b][0] for b in seq]
+            self._initS = [_INIT[b][1] for b in seq]
+        nextXover, prevXover = [n]*(n+1), [0]*(n+1)
+        j = 0
+        for k in xrange(n+1):
+            while j < len(xovers) and xovers[j] <= k:
+                j += 1
+            prevXover[k] = xovers[j-1] if j > 0 else 0
+            nextXover[k] = xovers[j] if j < len(xovers) else n
+        self._nextXover, self._prevXover = nextXover, prevXover
+    # end def
+# end class
+registerScorer(TmScorer)
+
+
+def scorerForSettings(settings):
+    """
+    Returns the scorer selected by settings['stapleScorer']: a registered
+    name, a StapleScorer subclass or instance, or a legacy IBS scoring
+    function such as autobreak.tgtLengthStapleScorer, which selects the
+    length scorer.
+    """
+    choice = settings.get('stapleScorer', None)
+    if isinstance(choice, StapleScorer):
+        return choice
+    if isinstance(choice, type) and issubclass(choice, StapleScorer):
+        return choice(settings)
+    if isinstance(choice, basestring):
+        if choice not in scorers:
+            raise ValueError("Unknown staple scorer '%s', expected one of %s."
+                             % (choice, ", ".join(sorted(scorers))))
+        return scorers[choice](settings)
+    return LengthScorer(settings)
+# end def
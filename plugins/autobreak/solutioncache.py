@@ -0,0 +1,224 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+solutioncache.py
+
+Size-bounded LRU cache of autobreak solutions. Entries map a key to
+(breakItems, startToken) and are evicted least recently used first once
+their estimated size passes maxBytes.
+
+Keys made by cacheKey are a sha1 of everything a solution depends on:
+the token list, whether the oligo is a loop, the staple limits, the
+scorer and the solver version. A key can therefore be shared between
+sessions, and the cache can be backed by a json file in the user cache
+directory (see userCacheDir). Designs built from repeated tiles then
+reuse solutions found in earlier sessions.
+"""
+
+import hashlib, json, os, sys, tempfile
+from collections import OrderedDict
+
+# bump when a solver change alters what a stored key should map to
+SOLVER_VERSION = 1
+CACHE_FILENAME = "autobreak-solutions.json"
+
+# rough per-entry cost of the OrderedDict links and the value tuple
+_ENTRY_OVERHEAD = 200
+_INT_SIZE = sys.getsizeof(40)
+
+
+def cacheKey(tokenList, isLoop, staple_limits, scorerId):
+    """Returns the hex sha1 identifying a solver job."""
+    text = "%d|%s|%d|%s|%s" % (SOLVER_VERSION, scorerId, bool(isLoop),
+                               ','.join(map(str, staple_limits)),
+                               ','.join(map(str, tokenList)))
+    return hashlib.sha1(text).hexdigest()
+# end def
+
+
+def userCacheDir():
+    """The per-user cache directory for cadnano on this platform."""
+    if sys.platform == 'darwin':
+        base = os.path.expanduser("~/Library/Caches")
+    elif sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA', os.path.expanduser("~"))
+    else:
+        base = os.environ.get('XDG_CACHE_HOME', os.path.expanduser("~/.cache"))
+    return os.path.join(base, "cadnano")
+# end def
+
+
+class SolutionCache(object):
+    """
+    Dictionary-like LRU cache. Only the cache's own estimate of its
+    entries' memory (nbytes) is bounded, which is what the maxBytes limit
+    refers to.
+    """
+    def __init__(self, maxBytes=16 << 20, filename=None):
+        self._entries = OrderedDict()
+        self._maxBytes = maxBytes
+        self._nbytes = 0
+        self._filename = filename
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+    # end def
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value == None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    ### PUBLIC METHODS ###
+    def nbytes(self):
+        return self._nbytes
+
+    def maxBytes(self):
+        return self._maxBytes
+
+    def filename(self):
+        return self._filename
+
+    def get(self, key):
+        """Returns the value stored for key, or None, and counts the lookup."""
+        value = self._entries.pop(key, None)
+        if value == None:
+            self.misses += 1
+            return None
+        self._entries[key] = value  # most recently used goes last
+        self.hits += 1
+        return value
+    # end def
+
+    def put(self, key, value):
+        """Stores value, a (breakItems, startToken) tuple, under key."""
+        old = self._entries.pop(key, None)
+        if old != None:
+            self._nbytes -= self._entrySize(key, old)
+        self._entries[key] = value
+        self._nbytes += self._entrySize(key, value)
+        self._dirty = True
+        while self._nbytes > self._maxBytes and len(self._entries) > 1:
+            oldKey, oldValue = self._entries.popitem(last=False)
+            self._nbytes -= self._entrySize(oldKey, oldValue)
+    # end def
+
+    def clear(self):
+        self._entries.clear()
+        self._nbytes = 0
+        self._dirty = True
+        self.hits = self.misses = 0
+    # end def
+
+    def setFilename(self, filename):
+        """
+        Backs the cache with the json file filename (None to stop), merging
+        in the entries it already holds.
+        """
+        self._filename = filename
+        if filename != None:
+            self.load()
+    # end def
+
+    def load(self):
+        """
+        Adds the entries of the backing file that are not in memory yet.
+        A missing or unreadable file is treated as empty.
+        """
+        if self._filename == None or not os.path.isfile(self._filename):
+            return
+        try:
+            with open(self._filename) as f:
+                obj = json.load(f)
+        except (IOError, ValueError):
+            return
+        if obj.get('version', None) != SOLVER_VERSION:
+            return
+        dirty = self._dirty
+        newer = self._entries
+        self._entries, self._nbytes = OrderedDict(), 0
+        for key, breakItems, startToken in obj.get('entries', []):
+            self.put(str(key), (breakItems, startToken))
+        for key, value in newer.iteritems():
+            self.put(key, value)  # keep this session's entries most recent
+        self._dirty = dirty
+    # end def
+
+    def save(self):
+        """
+        Writes the entries, oldest first, to the backing file if anything
+        changed. The file is replaced by a rename so that readers never see
+        a partial cache. Each save writes its own temporary file, so
+        processes sharing the cache (e.g. cadnanobatch workers) can save at
+        the same time; the last rename wins.
+        """
+        if self._filename == None or not self._dirty:
+            return
+        dirname = os.path.dirname(os.path.abspath(self._filename))
+        if not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:  # another process made it first
+                if not os.path.isdir(dirname):
+                    raise
+        entries = [[key, value[0], value[1]]
+                   for key, value in self._entries.iteritems()]
+        fd, tmpName = tempfile.mkstemp(dir=dirname,
+                                 prefix=os.path.basename(self._filename) + ".",
+                                 suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': SOLVER_VERSION, 'entries': entries}, f,
+                          separators=(',', ':'))
+            if sys.platform.startswith('win'):
+                try:  # rename does not replace on windows
+                    os.remove(self._filename)
+                except OSError:
+                    pass
+            os.rename(tmpName, self._filename)
+        except:
+            if os.path.exists(tmpName):
+                os.remove(tmpName)
+            raise
+        self._dirty = False
+    # end def
+
+    ### PRIVATE SUPPORT METHODS ###
+    def _entrySize(self, key, value):
+        breakItems = value[0]
+        return sys.getsizeof(key) + sys.getsizeof(breakItems) + \
+               _INT_SIZE*len(breakItems) + _ENTRY_OVERHEAD
+    # end def
+# end class
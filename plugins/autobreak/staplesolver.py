@@ -0,0 +1,223 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+staplesolver.py
+
+Dependency-free replacement for staplegraph. Breaking a token list is a
+shortest path over token boundaries where every edge (a staple) spans at
+most a maxStapleLen window of tokens, so it is solved with a dynamic
+program over the boundaries instead of building a networkx graph:
+
+    best[j] = min(best[i] + cost(length of tokens i..j-1))
+
+A staple is accepted under exactly the rules StapleGraph.createGraph
+uses for its edges. Its cost is the StapleGraph edge weight
+abs(length - tgtStapleLen) unless a scorer (see scorers.py) is given, so
+by default solutions score the same as staplegraph.minimumPath. A linear
+token list is solved in O(n*w) for n tokens and a window of w tokens.
+
+Results use the staplegraph format [start, [lengths], score], where
+start is the index of the token the first staple begins at. Staple
+loops are solved by solveCyclic.
+"""
+
+# the DEFINE parameters address the staple_limits argument parameters
+MIN_IND = 0     # minimum length index
+MAX_IND = 1     # maximum length index
+OPT_IND = 2     # optimum length index
+
+INFINITY = float('inf')
+
+
+def minimumPath(tokenlist_and_staple_limits):
+    """Drop-in replacement for staplegraph.minimumPath."""
+    tokenList, staple_limits, idx = tokenlist_and_staple_limits
+    output = solveLinear(tokenList, staple_limits)
+    if output == None:
+        return None
+    return (output, idx)
+# end def
+
+
+def solveJob(job):
+    """
+    Solves a (tokenList, isLoop, staple_limits, scorer) job, where scorer
+    may be None for the built-in length cost. Jobs hold only plain lists
+    and picklable scorers, so they can be sent to a multiprocessing pool.
+    """
+    tokenList, isLoop, staple_limits, scorer = job
+    if isLoop:
+        return solveCyclic(tokenList, staple_limits, scorer)
+    return solveLinear(tokenList, staple_limits, scorer)
+# end def
+
+
+def solveLinear(tokenList, staple_limits, scorer=None, offset=0):
+    """
+    Returns [0, [lengths], score] for the cheapest way to cover tokenList
+    with consecutive staples, or None if no break set fits the limits.
+
+    A staple covering tokens i..j-1 is allowed when its length exceeds the
+    minimum, the tokens before its last one are shorter than the maximum
+    and it leaves at least one token for another staple. It costs
+    scorer.cost(start, end) for the bases it covers, counted from offset,
+    or abs(length - tgtStapleLen) without a scorer.
+    """
+    n = len(tokenList)
+    if n < 2:
+        return None
+    prefix = [offset]*(n+1)
+    for i in xrange(n):
+        prefix[i+1] = prefix[i] + tokenList[i]
+    found = _solveWindow(prefix, 0, n, staple_limits, scorer,
+                         [INFINITY]*(n+1), [-1]*(n+1))
+    if found == None:
+        return None
+    return [0, found[1], found[0]]
+# end def
+
+
+def solveCyclic(tokenList, staple_limits, scorer=None):
+    """
+    Returns [start, [lengths], score] for a staple loop whose tokens wrap
+    around, or None. The first staple begins at token start and the last
+    one ends where the first begins.
+
+    Whichever staple covers token 0 ends within the first maxStapleLen
+    bases, so some break always falls on one of the boundaries of that
+    window. Only those boundaries are tried as the start, each with a
+    single dynamic program over one prefix-sum array of the list laid out
+    twice, so no rotated copies are made. This finds the same optimum as
+    solving every rotation. Scorer positions run past the oligo length for
+    staples that wrap around.
+    """
+    maxLen = staple_limits[MAX_IND]
+    n = len(tokenList)
+    if n < 2:
+        return None
+    prefix = [0]*(2*n+1)
+    for i in xrange(2*n):
+        prefix[i+1] = prefix[i] + tokenList[i % n]
+    best, back = [INFINITY]*(2*n+1), [-1]*(2*n+1)  # shared by every start
+    result = None
+    for start in xrange(n):
+        # tokens 0..start-2 alone are too long for a staple over token 0
+        if start > 1 and prefix[start-1] >= maxLen:
+            break
+        found = _solveWindow(prefix, start, n, staple_limits, scorer,
+                             best, back)
+        if found != None and (result == None or found[0] < result[2]):
+            result = [start, found[1], found[0]]
+    return result
+# end def
+
+
+def _solveWindow(prefix, first, n, staple_limits, scorer, best, back):
+    """
+    The dynamic program shared by solveLinear and solveCyclic. Covers the n
+    tokens from index first, where token k begins at base prefix[k]. best
+    and back are scratch lists as long as prefix, indexed like it. Returns
+    (score, [lengths]) or None.
+    """
+    minLen, maxLen = staple_limits[MIN_IND], staple_limits[MAX_IND]
+    tgtLen = staple_limits[OPT_IND]
+    cost = scorer.cost if scorer != None else None
+    last = first + n
+    best[first] = 0
+    lo = hi = first  # staples ending at j may start at boundaries lo..hi-1
+    for j in xrange(first+1, last+1):
+        pj, pLast = prefix[j], prefix[j-1]
+        # both bounds only move forward as j does
+        while pLast - prefix[lo] >= maxLen:
+            lo += 1
+        while hi < j and pj - prefix[hi] > minLen:
+            hi += 1
+        bestJ, backJ = INFINITY, -1
+        # a staple may not cover every token; ties go to the shortest
+        for i in xrange(hi-1, (lo if j < last else max(lo, first+1)) - 1, -1):
+            if best[i] < INFINITY:
+                if cost == None:
+                    score = best[i] + abs(pj - prefix[i] - tgtLen)
+                else:
+                    score = best[i] + cost(prefix[i], pj)
+                if score < bestJ:
+                    bestJ, backJ = score, i
+        best[j], back[j] = bestJ, backJ
+    if best[last] == INFINITY:
+        return None
+    lengths = []
+    j = last
+    while j > first:
+        i = back[j]
+        lengths.append(prefix[j] - prefix[i])
+        j = i
+    lengths.reverse()
+    return (best[last], lengths)
+# end def
+
+
+def benchmark(count=200, seed=0):
+    """
+    Solves count random staple-like token lists with this module and,
+    when networkx is available, with staplegraph, and prints the times.
+    Raises AssertionError if the two ever disagree on the optimal score.
+    """
+    import random, time
+    rng = random.Random(seed)
+    limits = [30, 40, 35]
+    cases = []
+    for i in xrange(count):
+        # legs of 2 at crossovers between runs of 1-base tokens
+        tokens = [2]
+        for j in xrange(rng.randint(4, 30)):
+            tokens.extend([1]*rng.randint(3, 28))
+            tokens.append(4)
+        tokens[-1] = 2
+        cases.append((tokens, limits, 0))
+    try:
+        import staplegraph
+    except ImportError:
+        staplegraph = None
+    t0 = time.time()
+    dpResults = map(minimumPath, cases)
+    dpTime = time.time() - t0
+    solved = len([r for r in dpResults if r])
+    print "dp:       %d lists, %d solved, %.3fs" % (count, solved, dpTime)
+    if staplegraph == None:
+        print "networkx: not available"
+        return
+    t0 = time.time()
+    nxResults = map(staplegraph.minimumPath, cases)
+    nxTime = time.time() - t0
+    print "networkx: %d lists, %.3fs (%.1fx)" % (count, nxTime,
+                                                nxTime/max(dpTime, 1e-9))
+    for dpResult, nxResult in zip(dpResults, nxResults):
+        assert bool(dpResult) == bool(nxResult)
+        if dpResult:
+            assert dpResult[0][2] == nxResult[0][2]
+# end def
+
+if __name__ == '__main__':
+    benchmark()
@@ -28,11 +28,14 @@ functionaltests.py
 Created by Shawn Douglas on 2011-06-28.
 """
 
-import sys
+import sys, os, gzip, tempfile, shutil
+from math import ceil
 sys.path.insert(0, '.')
 
 import time
-from PyQt4.QtCore import Qt, QPoint
+from PyQt4.QtCore import Qt, QEvent, QPoint, QPointF, QRect, QRectF, QString
+from PyQt4.QtGui import QColor, QImage, QKeyEvent, QPainter, \
+                        QStyleOptionGraphicsItem, qAlpha
 from data.dnasequences import sequences
 from model.enum import StrandType
 from model.virtualhelix import VirtualHelix
@@ -75,12 +78,11 @@ class FunctionalTests(CadnanoGuiTestCase):
         (designname), apply scaffold sequence(s) to that design, and return
         the set of staple sequences."""
         # set up the document
-        from model.io.decoder import decode
+        from model.io.decoder import decodeFile
         
-        inputfile = "tests/functionaltestinputs/%s" % designname
+        inputfile = os.path.join("tests/functionaltestinputs", designname)
         document = self.documentController.document()
-        with file(inputfile) as f:
-            decode(document, f.read())
+        decodeFile(document, inputfile)
         self.setWidget(self.documentController.win, False, None)
         part = document.selectedPart()
         # apply one or more sequences to the design
@@ -110,6 +112,23 @@ class FunctionalTests(CadnanoGuiTestCase):
         refSet = self.getRefSequences(refname)
         self.assertEqual(testSet, refSet)
 
+    def testStapleOutput_simple42legacy_gzip(self):
+        """p7308 applied to 42-base duplex (gzipped json source)"""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            designname = os.path.join(tmpdir, "simple42legacy.json.gz")
+            with open("tests/functionaltestinputs/simple42legacy.json") as f:
+                gz = gzip.open(designname, 'wb')
+                gz.write(f.read())
+                gz.close()
+            refname = "simple42legacy.csv"
+            sequences = [("p7308", 0, 0)]
+            testSet = self.getTestSequences(designname, sequences)
+            refSet = self.getRefSequences(refname)
+            self.assertEqual(testSet, refSet)
+        finally:
+            shutil.rmtree(tmpdir)
+
     def testStapleOutput_insert_size_1(self):
         """Test sequence output with a single insert of size 1"""
         designname = "loop_size_1.json"
@@ -183,6 +202,402 @@ class FunctionalTests(CadnanoGuiTestCase):
         self.assertEqual(testSet, refSet)
 
     ####################### Standard Functional Tests ########################
+    def openDesign(self, designname):
+        """Decodes designname into the document and shows the window."""
+        from model.io.decoder import decodeFile
+        inputfile = os.path.join("tests/functionaltestinputs", designname)
+        document = self.documentController.document()
+        decodeFile(document, inputfile)
+        self.setWidget(self.documentController.win, True, None)
+        return document, document.selectedPart()
+
+    def freeLowEnd(self, part):
+        """
+        Returns a staple strand whose low end has no crossover and has
+        empty bases below it, so that the end can be dragged down.
+        """
+        for vh in part.getVirtualHelices():
+            strandSet = vh.stapleStrandSet()
+            for strand in strandSet:
+                lowIdx = strand.lowIdx()
+                if lowIdx > 3 and strand.connectionLow() == None and \
+                        not strandSet.hasStrandAt(lowIdx - 3, lowIdx - 1):
+                    return strand
+        return None
+
+    def baseCenterInView(self, strand, idx):
+        """The viewport position of base idx of strand."""
+        from views import styles
+        bw = styles.PATH_BASE_WIDTH
+        win = self.documentController.win
+        partItem = win.pathroot.partItemForPart(strand.virtualHelix().part())
+        vhi = partItem.itemForVirtualHelix(strand.virtualHelix())
+        y = 0.5*bw if vhi.isStrandTypeOnTop(strand.strandType()) else 1.5*bw
+        scenePos = vhi.mapToScene(QPointF((idx + 0.5)*bw, y))
+        return win.pathGraphicsView.mapFromScene(scenePos)
+
+    def centerOnBase(self, strand, idx):
+        """Pans the path view so that base idx of strand is centered."""
+        view = self.documentController.win.pathGraphicsView
+        center = view.mapToScene(view.viewport().rect().center())
+        target = view.mapToScene(self.baseCenterInView(strand, idx))
+        view.sceneRootItem.translate(center.x() - target.x(),
+                                     center.y() - target.y())
+        view.viewport().update()
+        self.processEvents()
+        self.processEvents()  # visibleRectChangedSignal is sent via a timer
+
+    def bandSelectLowEnd(self, strand):
+        """Band selects the low end of strand, returning the band corners."""
+        win = self.documentController.win
+        view = win.pathGraphicsView
+        lowIdx = strand.lowIdx()
+        corner = self.baseCenterInView(strand, lowIdx - 2)
+        end = self.baseCenterInView(strand, lowIdx)
+        band = QRect(corner - QPoint(2, 2), end + QPoint(2, 2))
+        win.pathroot.rubberBandSelect(view.mapToScene(band).boundingRect())
+        return corner, end
+
+    def testPathViewSmoke_Science09(self):
+        """Pan, zoom, band select, drag, undo and export a large design"""
+        document, part = self.openDesign("Science09_prot120_98_v3.json")
+        win = self.documentController.win
+        view = win.pathGraphicsView
+        viewport = view.viewport()
+        stack = document.undoStack()
+
+        # zoom out past the level of detail threshold and back
+        view.zoomOut()
+        view.resetGL()
+        self.processEvents()
+        self.assertFalse(view.shouldShowDetails())
+        view.zoomIn()
+        view.resetGL()
+        self.processEvents()
+        self.assertTrue(view.shouldShowDetails())
+
+        # pan to an endpoint, which binds a StrandItem to its strand
+        strand = self.freeLowEnd(part)
+        self.assertNotEqual(strand, None)
+        lowIdx, highIdx = strand.idxs()
+        self.centerOnBase(strand, lowIdx)
+        pool = win.pathroot.partItemForPart(part).strandItemPool()
+        self.assertNotEqual(pool.strandItem(strand), None)
+
+        # band select just that endpoint, in empty space
+        corner, end = self.bandSelectLowEnd(strand)
+        self.assertTrue(document.isModelStrandSelected(strand))
+        self.assertEqual(tuple(document.getSelectedStrandValue(strand)),
+                         (True, False))
+
+        # drag the endpoint down two bases and undo
+        index = stack.index()
+        self.mousePress(viewport, self.LEFT, end, self.LEFT)
+        self.mouseMove(viewport, end)
+        self.mouseMove(viewport, corner)
+        self.mouseRelease(viewport, self.LEFT, corner, self.NOBUTTON)
+        self.assertEqual(strand.idxs(), (lowIdx - 2, highIdx))
+        self.assertNotEqual(stack.index(), index)
+        stack.undo()
+        self.assertEqual(strand.idxs(), (lowIdx, highIdx))
+
+        # the export draws every strand, not only those near the window
+        numStrands = freeEnds = 0
+        for vh in part.getVirtualHelices():
+            for strandSet in vh.getStrandSets():
+                for s in strandSet:
+                    numStrands += 1
+                    freeEnds += (s.connectionLow() == None) + \
+                                (s.connectionHigh() == None)
+        tmpdir = tempfile.mkdtemp()
+        try:
+            fname = os.path.join(tmpdir, "smoke.svg")
+            self.documentController.saveSVGDialogCallback(QString(fname))
+            with open(fname) as f:
+                svg = f.read()
+            self.assertTrue(svg.count("<path") >= freeEnds)
+        finally:
+            shutil.rmtree(tmpdir)
+        # and the items bound for it are released again
+        self.assertTrue(pool.itemCount() < numStrands)
+
+    def testSelectionDragAndDelete(self):
+        """A dragged selection is committed on release, then deleted"""
+        document, part = self.openDesign("Science09_prot120_98_v3.json")
+        win = self.documentController.win
+        viewport = win.pathGraphicsView.viewport()
+        group = win.pathroot.strandItemSelectionGroup()
+        strand = self.freeLowEnd(part)
+        strandSet = strand.strandSet()
+        lowIdx, highIdx = strand.idxs()
+        self.centerOnBase(strand, lowIdx)
+        corner, end = self.bandSelectLowEnd(strand)
+
+        deltas = []
+        resizeSelection = document.resizeSelection
+        def recordResize(delta, useUndoStack=True):
+            deltas.append(delta)
+            return resizeSelection(delta, useUndoStack)
+        document.resizeSelection = recordResize
+
+        # the press on a selected end goes to the group, which shows its box
+        self.mousePress(viewport, self.LEFT, end, self.LEFT)
+        self.assertTrue(group.selectionbox.isVisible())
+        self.mouseMove(viewport, end)
+        self.mouseMove(viewport, corner)
+        # only the box moves until the release
+        self.assertEqual(deltas, [])
+        self.assertEqual(strand.idxs(), (lowIdx, highIdx))
+        # the view hands the release to the group through its press list
+        self.mouseRelease(viewport, self.LEFT, corner, self.NOBUTTON)
+        self.assertEqual(deltas, [-2])
+        self.assertFalse(group.selectionbox.isVisible())
+        self.assertEqual(strand.idxs(), (lowIdx - 2, highIdx))
+
+        # Delete removes the strand whose end is selected
+        self.bandSelectLowEnd(strand)
+        self.assertTrue(document.isModelStrandSelected(strand))
+        event = QKeyEvent(QEvent.KeyPress, Qt.Key_Delete, Qt.NoModifier)
+        win.pathscene.sendEvent(group, event)
+        self.assertFalse(strand in list(strandSet))
+        document.undoStack().undo()
+        self.assertTrue(strand in list(strandSet))
+        self.assertEqual(strand.idxs(), (lowIdx - 2, highIdx))
+
+    def testZoomedOutBandSelection(self):
+        """A band drawn while zoomed out gets a box that follows zooming in"""
+        document, part = self.openDesign("Science09_prot120_98_v3.json")
+        win = self.documentController.win
+        partItem = win.pathroot.partItemForPart(part)
+        group = win.pathroot.strandItemSelectionGroup()
+        box = group.selectionbox
+        strand = self.freeLowEnd(part)
+        self.centerOnBase(strand, strand.lowIdx())
+        self.setZoomedOut(True)
+        self.assertEqual(partItem.strandItemPool().itemCount(), 0)
+        self.bandSelectLowEnd(strand)
+        self.assertTrue(document.getSelectedStrandValue(strand)[0])
+        # no StrandItem was bound, yet the box covers the selected ends
+        self.assertEqual(group.members(), [])
+        endsRect = box.mapRectFromItem(partItem, partItem.selectedEndsRect())
+        self.assertFalse(endsRect.isNull())
+        self.assertTrue(box.path().boundingRect().contains(endsRect))
+        self.assertTrue(group.boundingRect().isValid())
+        # zooming in binds items to the selected strands and resizes the box
+        self.setZoomedOut(False)
+        self.centerOnBase(strand, strand.lowIdx())
+        self.assertNotEqual(group.members(), [])
+        boxRect = box.path().boundingRect().adjusted(-.5, -.5, .5, .5)
+        for item in group.members():
+            self.assertTrue(boxRect.contains(
+                                box.mapRectFromScene(item.sceneBoundingRect())))
+        self.assertTrue(document.getSelectedStrandValue(strand)[0])
+
+    def setZoomedOut(self, zoomedOut):
+        """Zooms the path view out past its level of detail threshold, or in."""
+        view = self.documentController.win.pathGraphicsView
+        if zoomedOut:
+            view.zoomOut()
+        else:
+            view.zoomIn()
+        view.resetGL()
+        self.processEvents()
+        self.assertEqual(view.shouldShowDetails(), not zoomedOut)
+
+    def renderItem(self, item, rect, scale, widget):
+        """Paints rect of item, in item coordinates, at scale into an image."""
+        image = QImage(int(ceil(rect.width()*scale)),
+                       int(ceil(rect.height()*scale)),
+                       QImage.Format_ARGB32_Premultiplied)
+        image.fill(0)
+        painter = QPainter(image)
+        painter.scale(scale, scale)
+        painter.translate(-rect.left(), -rect.top())
+        option = QStyleOptionGraphicsItem()
+        option.exposedRect = rect
+        item.paint(painter, option, widget)
+        painter.end()
+        return image
+
+    def renderGrid(self, gridItem, rect, scale, widget):
+        """
+        Paints rect of gridItem at scale into an image and returns the
+        cumulative ink (alpha) of its columns, left to right.
+        """
+        image = self.renderItem(gridItem, rect, scale, widget)
+        ink, total = [], 0
+        for x in range(image.width()):
+            total += sum(qAlpha(image.pixel(x, y))
+                         for y in range(image.height()))
+            ink.append(total)
+        return ink
+
+    def testGridTilesMatchVectors(self):
+        """The tiled grid draws the lines gridPath does, up to the ends"""
+        from views import styles
+        from views.pathview.griditem import GridItem
+        bw = styles.PATH_BASE_WIDTH
+        document, part = self.openDesign("Science09_prot120_98_v3.json")
+        win = self.documentController.win
+        view = win.pathGraphicsView
+        partItem = win.pathroot.partItemForPart(part)
+        gridItem = [item for item in partItem.proxy().childItems() \
+                                        if isinstance(item, GridItem)][0]
+        gridRect = gridItem.boundingRect()
+        # both ends, where the first and last tiles are clipped
+        rects = [QRectF(-3*bw, gridRect.top(), 80*bw, 2*bw),
+                 QRectF(gridRect.right() - 70*bw, gridRect.top(), 80*bw, 2*bw)]
+        for zoomedOut, scales in ((True, (0.1,)), (False, (0.5, 1., 2.))):
+            if zoomedOut:
+                view.zoomOut()
+            else:
+                view.zoomIn()
+            view.resetGL()
+            self.processEvents()
+            self.assertEqual(view.shouldShowDetails(), not zoomedOut)
+            for scale in scales:
+                for rect in rects:
+                    tiled = self.renderGrid(gridItem, rect, scale,
+                                            view.viewport())
+                    vectors = self.renderGrid(gridItem, rect, scale, None)
+                    total = vectors[-1]
+                    self.assertTrue(total > 0)
+                    # a missing or shifted line at the ends, or a tile
+                    # placed off by part of a substep, moves the
+                    # cumulative ink by much more than resampling does
+                    worst = max(abs(t - v) for t, v in zip(tiled, vectors))
+                    self.assertTrue(worst <= 0.05*total,
+                                    "scale %s, rect %s: %s of %s" % \
+                                    (scale, rect.left(), worst, total))
+
+    def testZoomedOutStrips(self):
+        """Zoomed out helices draw their strands in their oligos' colors"""
+        from views import styles
+        bw = styles.PATH_BASE_WIDTH
+        document, part = self.openDesign("Science09_prot120_98_v3.json")
+        win = self.documentController.win
+        viewport = win.pathGraphicsView.viewport()
+        partItem = win.pathroot.partItemForPart(part)
+        self.setZoomedOut(True)
+        self.assertEqual(partItem.strandItemPool().itemCount(), 0)
+        strand = [s for vh in part.getVirtualHelices()
+                    for s in vh.stapleStrandSet()
+                    if s.highIdx() - s.lowIdx() >= 6][0]
+        strandSet = strand.strandSet()
+        oligo = strand.oligo()
+        vhi = partItem.itemForVirtualHelix(strand.virtualHelix())
+        # a base of the strand away from the helix's crossover bars
+        xoverIdxs = set(s.idx3Prime()
+                        for ss in strand.virtualHelix().getStrandSets()
+                        for s in ss if s.connection3p() != None)
+        idx = [i for i in range(strand.lowIdx() + 1, strand.highIdx())
+                 if i not in xoverIdxs][0]
+        y = 0.5*bw if vhi.isStrandTypeOnTop(strand.strandType()) else 1.5*bw
+        rect = QRectF(idx*bw, 0, bw, 2*bw)
+
+        def pixelAtBase():
+            image = self.renderItem(vhi, rect, 1., viewport)
+            return image.pixel(int(bw/2), int(y))
+
+        self.assertEqual(QColor(pixelAtBase()).name(),
+                         QColor(oligo.color()).name())
+        # recoloring the oligo emits no strand change, but the strip follows
+        oligo.applyColor('#123456')
+        self.processEvents()
+        self.assertEqual(QColor(pixelAtBase()).name(), '#123456')
+        document.undoStack().undo()
+        self.processEvents()
+        self.assertEqual(QColor(pixelAtBase()).name(),
+                         QColor(oligo.color()).name())
+        # and a removed strand leaves its bases empty
+        strandSet.removeStrand(strand)
+        self.processEvents()
+        self.assertEqual(qAlpha(pixelAtBase()), 0)
+        document.undoStack().undo()
+        self.processEvents()
+        self.assertEqual(QColor(pixelAtBase()).name(),
+                         QColor(strand.oligo().color()).name())
+        self.assertEqual(partItem.strandItemPool().itemCount(), 0)
+
+    def testPreXoverItemsReused(self):
+        """Hidden prexovers are reused, look like new ones, and are capped"""
+        from views.pathview import partitem
+        from views.pathview.prexoveritem import PreXoverItem
+        document, part = self.openDesign("Science09_prot120_98_v3.json")
+        partItem = self.documentController.win.pathroot.partItemForPart(part)
+        vhis = partItem.virtualHelixItems()
+        partItem.setPreXoverItemsVisible(vhis[0])
+        numShown = len(partItem._preXoverItems)
+        self.assertTrue(numShown > 0)
+        partItem.setPreXoverItemsVisible(None)
+        self.assertEqual(partItem._preXoverItems, {})
+        free = partItem._freePreXoverItems
+        self.assertEqual(len(free),
+                         min(numShown, partitem._maxFreePreXoverItems))
+        self.assertFalse(any(pxi.isVisible() for pxi in free))
+        for vhi in vhis[1:6]:
+            before = set(free) | set(partItem._preXoverItems.values())
+            partItem.setPreXoverItemsVisible(vhi)
+            items = partItem._preXoverItems
+            self.assertTrue(any(pxi in before for pxi in items.values()))
+            for key, pxi in items.iteritems():
+                self.assertTrue(pxi.isVisible())
+                fresh = PreXoverItem(*key)
+                try:
+                    self.assertEqual(pxi.parentItem(), fresh.parentItem())
+                    self.assertEqual(pxi.pos(), fresh.pos())
+                    self.assertEqual(pxi.path(), fresh.path())
+                    self.assertEqual(pxi.pen().color(), fresh.pen().color())
+                    self.assertEqual(pxi._label.text(), fresh._label.text())
+                    self.assertEqual(pxi._label.pos(), fresh._label.pos())
+                finally:
+                    fresh.remove()
+        # items beyond the cap are removed rather than kept
+        shown = partItem._preXoverItems.values()
+        self.assertTrue(len(shown) > 3)
+        for pxi in free:
+            pxi.remove()
+        del free[:]
+        maxFree = partitem._maxFreePreXoverItems
+        partitem._maxFreePreXoverItems = 3
+        try:
+            partItem.setPreXoverItemsVisible(None)
+        finally:
+            partitem._maxFreePreXoverItems = maxFree
+        self.assertEqual(len(free), 3)
+        self.assertEqual(len([pxi for pxi in shown if pxi.scene() != None]), 3)
+
+    def testSliceViewMissDeselects(self):
+        """A press between lattice positions clears the selection"""
+        document, part = self.openDesign("Science09_prot120_98_v3.json")
+        win = self.documentController.win
+        strand = self.freeLowEnd(part)
+        document.addStrandsToSelection({strand: (True, True)})
+        self.assertTrue(document.isModelStrandSelected(strand))
+        partItem = [item for item in win.sliceroot.childItems() \
+                                            if hasattr(item, 'latticeItem')][0]
+        latticeItem = partItem.latticeItem()
+        numHelices = len(part.getVirtualHelices())
+        # find a point of the part that misses every lattice circle
+        rect = partItem.boundingRect()
+        miss = None
+        y = rect.top() + 1
+        while miss == None and y < rect.bottom():
+            x = rect.left() + 1
+            while miss == None and x < rect.right():
+                pos = QPointF(x, y)
+                if latticeItem.coordAtPos(latticeItem.mapFromItem(partItem,
+                                                                  pos)) == None:
+                    miss = pos
+                x += 1
+            y += 1
+        self.assertNotEqual(miss, None)
+        view = win.sliceGraphicsView
+        viewPos = view.mapFromScene(partItem.mapToScene(miss))
+        self.click(view.viewport(), self.LEFT, viewPos)
+        self.assertFalse(document.isModelStrandSelected(strand))
+        self.assertEqual(len(part.getVirtualHelices()), numHelices)
+
     # def testActiveSliceHandleAltShiftClick(self):
     #     """Alt+Shift+Click on ActiveSliceHandle extends scaffold strands."""
     #     # Create a new Honeycomb part
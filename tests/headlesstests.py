@@ -0,0 +1,940 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+headlesstests.py
+
+Tests of the model, codecs and view geometry that need no gui. They run
+on the Dummy Qt framework, so PyQt4 does not have to be installed.
+
+Run these tests by calling "python -m tests.headlesstests" from cadnano2
+root directory.
+"""
+
+import sys, os, shutil, tempfile, unittest
+sys.path.insert(0, '.')
+
+import util
+util.qtFrameworkList = ['Dummy']  # no event loop, so never load a real Qt
+import cadnano
+from model.document import Document
+from model.io.decoder import decodeFile
+from model.io.legacyencoder import legacy_dict_from_doc
+
+inputDir = os.path.join("tests", "functionaltestinputs")
+
+
+def loadDesign(designname):
+    """Returns (document, part) for a design in functionaltestinputs."""
+    document = Document()
+    decodeFile(document, os.path.join(inputDir, designname))
+    return document, document.selectedPart()
+# end def
+
+
+def autobreakModule(name):
+    """Returns a module of the autobreak plugin, loading the plugins."""
+    cadnano.initAppWithoutGui()
+    return sys.modules['autobreak.' + name]
+# end def
+
+
+def helicesByCoord(obj):
+    """The vstrands of a legacy dict, keyed by (row, col)."""
+    return dict(((h['row'], h['col']), h) for h in obj['vstrands'])
+# end def
+
+
+class CompressionTests(unittest.TestCase):
+    """Designs round trip through every compressed format."""
+    def setUp(self):
+        cadnano.initAppWithoutGui()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def save(self, document, filename):
+        from model.io.compression import openDesignFile
+        from model.io.encoder import encode
+        part = document.selectedPart()
+        order = sorted(vh.coord() for vh in part.getVirtualHelices())
+        with openDesignFile(filename, 'w') as f:
+            encode(document, order, f)
+        return order
+
+    def testRoundTrip(self):
+        """Plain, gzip, bz2 and zlib saves decode into the same design"""
+        import bz2, gzip, zlib
+        from StringIO import StringIO
+        from model.io.compression import detectCompression, GZIP, BZIP2, ZLIB
+        # a plain legacy file still decodes, and is the reference
+        document, part = loadDesign("Nature09_squarenut.json")
+        plainName = os.path.join(self.tmpdir, "squarenut.json")
+        order = self.save(document, plainName)
+        with open(plainName, 'rb') as f:
+            plain = f.read()
+        reference = legacy_dict_from_doc(document, plainName, order)
+        self.assertTrue(reference['vstrands'])
+        gunzip = lambda data: gzip.GzipFile(fileobj=StringIO(data)).read()
+        formats = [("", None, lambda data: data),
+                   (".gz", GZIP, gunzip),
+                   (".bz2", BZIP2, bz2.decompress),
+                   (".zz", ZLIB, zlib.decompress)]
+        for suffix, compression, decompress in formats:
+            filename = plainName + suffix
+            self.save(document, filename)
+            with open(filename, 'rb') as f:
+                data = f.read()
+            self.assertEqual(detectCompression(data[:6]), compression)
+            if compression != None:
+                self.assertTrue(len(data) < len(plain)/2)
+            # decompressing by hand gives exactly the plain save
+            self.assertEqual(decompress(data), plain)
+            decoded = Document()
+            decodeFile(decoded, filename)
+            self.assertEqual(legacy_dict_from_doc(decoded, plainName, order),
+                             reference, "%s differs after decoding" % suffix)
+# end class
+
+
+class JournalTests(unittest.TestCase):
+    """Edits are journaled and replayed into an identical design."""
+    def setUp(self):
+        cadnano.initAppWithoutGui()
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "Nature09_squarenut.json")
+        shutil.copy(os.path.join(inputDir, "Nature09_squarenut.json"),
+                    self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def assertRecovers(self, document, journal):
+        """The recovered design encodes exactly like the live one."""
+        from model.io.journal import recoverDocument
+        journal.close()
+        part = document.selectedPart()
+        order = [vh.coord() for vh in part.getVirtualHelices()]
+        recovered = Document()
+        self.assertTrue(recoverDocument(recovered, self.filename))
+        live = helicesByCoord(legacy_dict_from_doc(document, self.filename,
+                                                   order))
+        replayed = helicesByCoord(legacy_dict_from_doc(recovered,
+                                                       self.filename, order))
+        self.assertEqual(sorted(live), sorted(replayed))
+        for coord in live:
+            self.assertEqual(live[coord], replayed[coord],
+                             "helix %s differs after recovery" % (coord,))
+
+    def testRecoverEdits(self):
+        """Resize, remove, undo, colour, insert, split and xover edits"""
+        from model.io.journal import EditJournal
+        document = Document()
+        decodeFile(document, self.filename)
+        part = document.selectedPart()
+        journal = EditJournal(document, self.filename)
+        journal.reset()
+        vhs = sorted(part.getVirtualHelices(), key=lambda vh: vh.number())
+        strand = list(vhs[0].stapleStrandSet())[1]
+        strand.resize((strand.lowIdx() + 1, strand.highIdx()))
+        strandSet = vhs[1].stapleStrandSet()
+        strandSet.removeStrand(list(strandSet)[2])
+        document.undoStack().undo()
+        strandSet.removeStrand(list(strandSet)[3])
+        list(vhs[2].stapleStrandSet())[3].oligo().applyColor('#123456')
+        strand = list(vhs[3].scaffoldStrandSet())[0]
+        strand.addInsertion(strand.lowIdx() + 5, 2)
+        strandSet = vhs[4].stapleStrandSet()
+        strand = list(strandSet)[1]
+        strandSet.splitStrand(strand, strand.lowIdx() + 8)
+        # an oligo split away from its 5' end changes other helices
+        oligos = [o for o in part.oligos() if o.isStaple() and \
+                                              not o.isLoop() and \
+                                              o.length() > 40]
+        oligo = max(oligos, key=lambda o: (o.length(),
+                                           o.strand5p().virtualHelix().number(),
+                                           o.strand5p().idx5Prime()))
+        for position in range(15, oligo.length() - 5):
+            try:
+                oligo.splitAtPositions([position])
+                break
+            except ValueError:
+                pass
+        self.assertRecovers(document, journal)
+        journal.detach()
+
+    def testRecoverAfterUndoingEverything(self):
+        """Undoing every edit recovers the design as saved"""
+        from model.io.journal import EditJournal
+        document = Document()
+        decodeFile(document, self.filename)
+        part = document.selectedPart()
+        journal = EditJournal(document, self.filename)
+        journal.reset()
+        for vh in sorted(part.getVirtualHelices(),
+                         key=lambda vh: vh.number())[:4]:
+            strandSet = vh.stapleStrandSet()
+            strandSet.removeStrand(list(strandSet)[0])
+        while document.undoStack().canUndo():
+            document.undoStack().undo()
+        self.assertRecovers(document, journal)
+        journal.detach()
+# end class
+
+
+
+class SplitAtPositionsTests(unittest.TestCase):
+    """Oligo.splitAtPositions cuts many breaks as one undoable command."""
+    def setUp(self):
+        cadnano.initAppWithoutGui()
+        self.filename = os.path.join(inputDir, "Nature09_squarenut.json")
+        self.document = Document()
+        decodeFile(self.document, self.filename)
+        self.part = self.document.selectedPart()
+        oligos = [o for o in self.part.oligos() if o.isStaple() and \
+                                                   not o.isLoop()]
+        self.oligo = max(oligos, key=lambda o: o.length())
+
+    def encode(self):
+        order = [vh.coord() for vh in self.part.getVirtualHelices()]
+        return legacy_dict_from_doc(self.document, self.filename, order)
+
+    def canSplitAt(self, position):
+        from model.oligo import Oligo
+        try:
+            Oligo.SplitAtPositionsCommand(self.oligo, [position])
+        except ValueError:
+            return False
+        return True
+
+    def splitPositions(self, count, spacing):
+        """count valid positions at least spacing bases apart"""
+        positions = []
+        for p in range(spacing, self.oligo.length() - spacing):
+            if positions and p - positions[-1] < spacing:
+                continue
+            if self.canSplitAt(p):
+                positions.append(p)
+            if len(positions) == count:
+                break
+        self.assertEqual(len(positions), count)
+        return positions
+
+    def testSplitUndoRedo(self):
+        """Pieces have the lengths between breaks and undo restores all"""
+        length = self.oligo.length()
+        positions = self.splitPositions(3, 10)
+        before = self.encode()
+        oldOligos = set(self.part.oligos())
+        self.oligo.splitAtPositions(positions)
+        newOligos = set(self.part.oligos()) - oldOligos
+        self.assertFalse(self.oligo in self.part.oligos())
+        self.assertEqual(len(self.part.oligos()), len(oldOligos) + 3)
+        bounds = [0] + positions + [length]
+        expected = [hi - lo for lo, hi in zip(bounds, bounds[1:])]
+        self.assertEqual(sorted(o.length() for o in newOligos),
+                         sorted(expected))
+        for olg in newOligos:  # lengths agree with the strands
+            self.assertFalse(olg.isLoop())
+            self.assertEqual(olg.length(),
+                             sum(s.totalLength() for s in
+                                 olg.strand5p().generator3pStrand()))
+        after = self.encode()
+        self.assertNotEqual(before, after)
+        stack = self.document.undoStack()
+        stack.undo()
+        self.assertEqual(self.encode(), before)
+        self.assertTrue(self.oligo in self.part.oligos())
+        self.assertEqual(set(self.part.oligos()), oldOligos)
+        stack.redo()
+        self.assertEqual(self.encode(), after)
+        self.assertEqual(set(self.part.oligos()) - oldOligos, newOligos)
+
+    def testInvalidPositions(self):
+        """Bad positions raise ValueError and change nothing"""
+        length = self.oligo.length()
+        p, q = self.splitPositions(2, 10)
+        self.assertNotEqual(self.oligo.strand5p().connection3p(), None)
+        crossover = self.oligo.strand5p().totalLength()
+        before = self.encode()
+        count = self.document.undoStack().count()
+        for positions in ([0], [length], [-3], [p, length + 5],
+                          [q, p], [p, p], [p, q, q], [crossover]):
+            self.assertRaises(ValueError,
+                              self.oligo.splitAtPositions, positions)
+        self.assertEqual(self.document.undoStack().count(), count)
+        self.assertEqual(self.encode(), before)
+        self.assertEqual(self.oligo.length(), length)
+# end class
+
+
+class SliceIndexTests(unittest.TestCase):
+    """The part's slice index agrees with scanning every strand set."""
+    def setUp(self):
+        import random
+        cadnano.initAppWithoutGui()
+        self.document, self.part = loadDesign("Nature09_monolith.json")
+        self.rng = random.Random(45)
+
+    def coverage(self, strandType, maxIdx):
+        """idx -> the set of helices with a strand at idx, by scanning"""
+        covered = dict((idx, set()) for idx in range(-2, maxIdx + 3))
+        for vh in self.part.getVirtualHelices():
+            for strand in vh.getStrandSets()[strandType]:
+                for idx in range(strand.lowIdx(), strand.highIdx() + 1):
+                    covered[idx].add(vh)
+        return covered
+
+    def assertMatchesScan(self):
+        """Every index and slider step, and random jumps"""
+        from model.enum import StrandType
+        part = self.part
+        maxIdx = part.maxBaseIdx()
+        for strandType in (StrandType.Scaffold, StrandType.Staple):
+            covered = self.coverage(strandType, maxIdx)
+            pairs = [(idx - 1, idx) for idx in range(-1, maxIdx + 3)]
+            pairs += [(idx, idx - 1) for idx in range(-1, maxIdx + 3)]
+            pairs += [(self.rng.randint(-2, maxIdx + 2),
+                       self.rng.randint(-2, maxIdx + 2)) for n in range(100)]
+            for idx in covered:
+                found = part.virtualHelicesAtIdx(idx, strandType)
+                self.assertEqual(len(found), len(set(found)))
+                self.assertEqual(set(found), covered[idx])
+            for a, b in pairs:
+                expected = set([(vh, False) for vh in covered[a] - covered[b]] +
+                               [(vh, True) for vh in covered[b] - covered[a]])
+                found = part.virtualHelicesChangedBetween(a, b, strandType)
+                self.assertEqual(len(found), len(set(found)))
+                self.assertEqual(set(found), expected)
+
+    def testMatchesScan(self):
+        """Lookups at random indices, before and after edits"""
+        self.assertMatchesScan()
+        vhs = sorted(self.part.getVirtualHelices(), key=lambda vh: vh.number())
+        strand = list(vhs[0].scaffoldStrandSet())[0]
+        low, high = strand.idxs()
+        strand.resize((low + 5, high))
+        self.assertMatchesScan()
+        for vh in vhs[1:4]:
+            strandSet = vh.scaffoldStrandSet()
+            strandSet.removeStrand(list(strandSet)[0])
+            strandSet = vh.stapleStrandSet()
+            strandSet.removeStrand(list(strandSet)[-1])
+        self.assertMatchesScan()
+        vhs[5].remove()
+        self.assertMatchesScan()
+        stack = self.document.undoStack()
+        while stack.canUndo():
+            stack.undo()
+        self.assertMatchesScan()
+# end class
+
+
+class LatticeTests(unittest.TestCase):
+    """positionToCoord inverts latticeCoordToPositionXY on both lattices."""
+    def setUp(self):
+        cadnano.initAppWithoutGui()
+
+    def assertRoundTrips(self, part):
+        import random
+        rng = random.Random(44)
+        jitter = 0.3*part.radius()
+        for scaleFactor in (1.0, 0.5, 10.):
+            for row in range(30):
+                for col in range(30):
+                    x, y = part.latticeCoordToPositionXY(row, col, scaleFactor)
+                    self.assertEqual(part.positionToCoord(x, y, scaleFactor),
+                                     (row, col))
+                    # clicks anywhere near the helix center land on it
+                    dx = rng.uniform(-jitter, jitter)*scaleFactor
+                    dy = rng.uniform(-jitter, jitter)*scaleFactor
+                    self.assertEqual(part.positionToCoord(x + dx, y + dy,
+                                                          scaleFactor),
+                                     (row, col))
+
+    def testHoneycomb(self):
+        self.assertRoundTrips(Document().addHoneycombPart())
+
+    def testSquare(self):
+        self.assertRoundTrips(Document().addSquarePart())
+# end class
+
+
+class LazyLoadTests(unittest.TestCase):
+    def setUp(self):
+        cadnano.initAppWithoutGui()
+
+    def testPrioritizeQueuesOnce(self):
+        """Repainting a helix while loading queues it only once more"""
+        import json
+        from model.io.legacydecoder import LegacyStrandLoader
+        document, part = loadDesign("Nature09_monolith.json")
+        with open(os.path.join(inputDir, "Nature09_monolith.json")) as f:
+            obj = json.load(f)
+        vhNumToCoord = dict((h['num'], (h['row'], h['col']))
+                            for h in obj['vstrands'])
+        loader = LegacyStrandLoader(part, obj, vhNumToCoord, self.fail)
+        queued = len(loader._queue)
+        vh = part.getVirtualHelices()[-1]
+        for i in range(10):
+            loader.prioritize(vh)
+        self.assertEqual(len(loader._queue), queued + 1)
+        self.assertEqual(loader._queue[0], vh.number())
+# end class
+
+class BandSelectionTests(unittest.TestCase):
+    """The model lookup selects what intersecting the items selected."""
+    filterDicts = [("endpoint", "scaffold", "staple", "xover"),  # default
+                   ("strand", "staple"),
+                   ("endpoint", "staple"),
+                   ("xover", "scaffold")]
+
+    def setUp(self):
+        cadnano.initAppWithoutGui()
+
+    def referenceSelection(self, helices, rect, filterDict, bw):
+        """
+        Tests every base each strand, end cap and crossover end is drawn
+        on against rect, as the scene did for the items.
+        """
+        left, top, right, bottom = rect
+        values = {}
+
+        def add(strand, low, high):
+            old = values.get(strand, (False, False))
+            values[strand] = (low or old[0], high or old[1])
+
+        for vh, x, y in helices:
+            for strandSet in vh.getStrandSets():
+                if strandSet.strandFilter() not in filterDict:
+                    continue
+                # scaffold is drawn 5' to 3' on top of even helices
+                rowTop = y if strandSet.isDrawn5to3() else y + bw
+                if rowTop > bottom or rowTop + bw < top:
+                    continue
+                hits = lambda idx: x + idx*bw <= right and \
+                                   x + (idx + 1)*bw > left
+                for strand in strandSet:
+                    sLow, sHigh = strand.idxs()
+                    if not any(hits(i) for i in range(sLow, sHigh + 1)):
+                        continue
+                    if "strand" in filterDict:
+                        add(strand, True, True)
+                    elif "endpoint" in filterDict:
+                        low = hits(sLow) and strand.connectionLow() == None
+                        high = hits(sHigh) and strand.connectionHigh() == None
+                        if low or high:
+                            add(strand, low, high)
+                    if "xover" not in filterDict:
+                        continue
+                    strand3p = strand.connection3p()
+                    if strand3p != None and hits(strand.idx3Prime()):
+                        is5to3 = strand.isDrawn5to3()
+                        add(strand, not is5to3, is5to3)
+                        add(strand3p, strand3p.isDrawn5to3(),
+                                      not strand3p.isDrawn5to3())
+                    strand5p = strand.connection5p()
+                    if strand5p != None and hits(strand.idx5Prime()):
+                        is5to3 = strand.isDrawn5to3()
+                        add(strand, is5to3, not is5to3)
+                        add(strand5p, not strand5p.isDrawn5to3(),
+                                      strand5p.isDrawn5to3())
+        return values
+
+    def testMatchesItemIntersection(self):
+        """Strand, endpoint and xover filters on random bands"""
+        import random
+        from views import styles
+        from views.pathview.bandselection import strandSelectionInRect
+        bw = styles.PATH_BASE_WIDTH
+        document, part = loadDesign("Nature09_monolith.json")
+        vhs = sorted(part.getVirtualHelices(), key=lambda vh: vh.number())
+        helices = [(vh, 10., 3.5*bw*i) for i, vh in enumerate(vhs)]
+        width = (part.maxBaseIdx() + 1)*bw
+        height = 3.5*bw*len(vhs)
+        rng = random.Random(46)
+        selected = 0
+        for n in range(40):
+            left = rng.uniform(-bw, width)
+            top = rng.uniform(-bw, height)
+            rect = (left, top, left + rng.uniform(0.1, width/4),
+                               top + rng.uniform(0.1, height/4))
+            for filterDict in self.filterDicts:
+                filterDict = dict.fromkeys(filterDict, True)
+                values = strandSelectionInRect(helices, rect, filterDict,
+                                               part.maxBaseIdx(), bw)
+                reference = self.referenceSelection(helices, rect,
+                                                    filterDict, bw)
+                self.assertEqual(values, reference)
+                selected += len(values)
+        self.assertTrue(selected > 100)
+
+    def referenceEndsRect(self, origins, strandValues, bw):
+        """The union of the bases of every selected end"""
+        rect = None
+        for strand, (low, high) in strandValues.iteritems():
+            x, y = origins[strand.virtualHelix()]
+            rowTop = y if strand.isDrawn5to3() else y + bw
+            for idx, isSelected in zip(strand.idxs(), (low, high)):
+                if not isSelected:
+                    continue
+                cell = (x + idx*bw, rowTop, x + (idx + 1)*bw, rowTop + bw)
+                if rect == None:
+                    rect = cell
+                else:
+                    rect = (min(rect[0], cell[0]), min(rect[1], cell[1]),
+                            max(rect[2], cell[2]), max(rect[3], cell[3]))
+        return rect
+
+    def testZoomedOutSelectionBox(self):
+        """The box around a band selection needs no StrandItems"""
+        import random
+        from views import styles
+        from views.pathview.bandselection import selectedEndsRect, \
+                                                 strandSelectionInRect
+        bw = styles.PATH_BASE_WIDTH
+        document, part = loadDesign("Nature09_monolith.json")
+        vhs = sorted(part.getVirtualHelices(), key=lambda vh: vh.number())
+        helices = [(vh, 10., 3.5*bw*i) for i, vh in enumerate(vhs)]
+        origins = dict((vh, (x, y)) for vh, x, y in helices)
+        width = (part.maxBaseIdx() + 1)*bw
+        height = 3.5*bw*len(vhs)
+        filterDict = dict.fromkeys(self.filterDicts[0], True)
+        rng = random.Random(146)
+        self.assertEqual(selectedEndsRect(helices, document.selectionDict(),
+                                          bw), None)
+        allValues = {}
+        for n in range(20):
+            left = rng.uniform(-bw, width)
+            top = rng.uniform(-bw, height)
+            rect = (left, top, left + rng.uniform(bw, width/3),
+                               top + rng.uniform(bw, height/3))
+            # what PathRootItem.rubberBandSelect does with Shift held,
+            # where no strand has an item to add to the selection group
+            values = strandSelectionInRect(helices, rect, filterDict,
+                                           part.maxBaseIdx(), bw)
+            for strand, (low, high) in values.items():
+                oldLow, oldHigh = allValues.get(strand, (False, False))
+                values[strand] = allValues[strand] = (low or oldLow,
+                                                      high or oldHigh)
+            document.addStrandsToSelection(values)
+            self.assertEqual(selectedEndsRect(helices,
+                                              document.selectionDict(), bw),
+                             self.referenceEndsRect(origins, allValues, bw))
+        self.assertTrue(len(allValues) > 20)
+        # helices of another part are left out
+        some = helices[:len(helices)//2]
+        someVhs = set(vh for vh, x, y in some)
+        inSome = dict((strand, value) for strand, value in allValues.items()
+                      if strand.virtualHelix() in someVhs)
+        self.assertTrue(0 < len(inSome) < len(allValues))
+        self.assertEqual(selectedEndsRect(some, document.selectionDict(), bw),
+                         self.referenceEndsRect(origins, inSome, bw))
+        document.removeStrandsFromSelection(allValues)
+        self.assertEqual(selectedEndsRect(helices, document.selectionDict(),
+                                          bw), None)
+# end class
+
+
+class UpdateSchedulerTests(unittest.TestCase):
+    """Refreshes are coalesced until control returns to the event loop."""
+    class Item(object):
+        def __init__(self, scheduler=None):
+            self.calls = []
+            self.scheduler = scheduler
+        def applyScheduledUpdates(self, reasons):
+            self.calls.append(set(reasons))
+            if self.scheduler != None:  # reschedules another item
+                self.scheduler.schedule(self.other, 'color')
+                self.scheduler = None
+
+    def setUp(self):
+        from dummyqt.QtCore import QTimer
+        from views.updatescheduler import UpdateScheduler
+        self.timer = QTimer
+        del QTimer.pending[:]
+        self.scheduler = UpdateScheduler()
+
+    def testCoalesce(self):
+        """An item scheduled many times is applied once with every reason"""
+        a, b = self.Item(), self.Item()
+        for reason in ('appearance', 'resize', 'appearance', 'sequence'):
+            self.scheduler.schedule(a, reason)
+        self.scheduler.schedule(b, 'color')
+        self.assertEqual(len(self.timer.pending), 1)
+        self.assertTrue(self.scheduler.isDirty(a))
+        self.assertEqual(a.calls, [])
+        self.timer.runPending()
+        self.assertEqual(a.calls, [set(['appearance', 'resize', 'sequence'])])
+        self.assertEqual(b.calls, [set(['color'])])
+        self.assertFalse(self.scheduler.isDirty(a))
+        self.assertEqual(self.scheduler.avoided(), 3)
+
+    def testScheduleWhileFlushing(self):
+        """Items scheduled by a refresh are applied in the same pass"""
+        a = self.Item(self.scheduler)
+        a.other = b = self.Item()
+        self.scheduler.schedule(a, 'appearance')
+        self.timer.runPending()
+        self.assertEqual(b.calls, [set(['color'])])
+        self.assertEqual(self.timer.pending, [])
+        # a later schedule starts a new timer
+        self.scheduler.schedule(b, 'sequence')
+        self.assertEqual(len(self.timer.pending), 1)
+        self.scheduler.flush()
+        self.assertEqual(b.calls[-1], set(['sequence']))
+# end class
+
+
+class StapleSolverTests(unittest.TestCase):
+    """The autobreak dynamic program finds the exhaustive optimum."""
+    limits = [6, 14, 10]  # min, max, target staple length
+
+    class PositionScorer(object):
+        """
+        Length cost plus a penalty that depends on where staples start.
+        Like scorers of loops, it repeats every period bases.
+        """
+        def __init__(self, period):
+            self.period = period
+        def cost(self, start, end):
+            return abs(end - start - 10) + ((start % self.period)*7 % 5)*0.5
+
+    def setUp(self):
+        import random
+        self.ss = autobreakModule('staplesolver')
+        self.rng = random.Random(31)
+
+    def randomTokens(self):
+        return [self.rng.choice((1, 1, 1, 2, 4))
+                for i in range(self.rng.randint(2, 12))]
+
+    def prefixSums(self, tokens, offset=0):
+        """Token starts over the list laid out twice, from offset"""
+        prefix = [offset]
+        for i in range(2*len(tokens)):
+            prefix.append(prefix[-1] + tokens[i % len(tokens)])
+        return prefix
+
+    def staplesCost(self, tokens, breaks, scorer, offset=0):
+        """
+        The cost of the staples between consecutive token boundaries in
+        breaks, or None if one breaks the limits. Staples are allowed on
+        the rules staplegraph.createGraph uses for its edges.
+        """
+        prefix = self.prefixSums(tokens, offset)
+        minLen, maxLen, tgtLen = self.limits
+        total = 0
+        for i, j in zip(breaks, breaks[1:]):
+            if not (prefix[j] - prefix[i] > minLen and \
+                    prefix[j-1] - prefix[i] < maxLen and \
+                    j - i < len(tokens)):
+                return None
+            if scorer == None:
+                total += abs(prefix[j] - prefix[i] - tgtLen)
+            else:
+                total += scorer.cost(prefix[i], prefix[j])
+        return total
+
+    def bruteForce(self, tokens, isLoop, scorer, offset=0):
+        """The lowest cost of every break set, or None"""
+        n = len(tokens)
+        best = None
+        for mask in xrange(1, 2**n):
+            breaks = [k for k in range(n) if mask & (1 << k)]
+            if isLoop:
+                if len(breaks) < 2:
+                    continue
+                breaks.append(breaks[0] + n)
+            elif breaks[0] == 0:
+                continue
+            else:
+                breaks = [0] + breaks + [n]
+            score = self.staplesCost(tokens, breaks, scorer, offset)
+            if score != None and (best == None or score < best):
+                best = score
+        return best
+
+    def assertSolution(self, tokens, result, expected, scorer, offset=0):
+        """result is a valid break set of the tokens costing expected"""
+        if expected == None:
+            self.assertEqual(result, None)
+            return
+        start, lengths, score = result
+        self.assertEqual(score, expected)
+        self.assertEqual(sum(lengths), sum(tokens))
+        prefix = self.prefixSums(tokens)
+        breaks = [start]
+        for length in lengths:
+            end = prefix[breaks[-1]] + length
+            self.assertTrue(end in prefix)
+            breaks.append(prefix.index(end))
+        self.assertEqual(self.staplesCost(tokens, breaks, scorer, offset),
+                         expected)
+
+    def testLinearMatchesBruteForce(self):
+        """solveLinear on random token lists, with and without a scorer"""
+        solved = 0
+        for n in range(300):
+            tokens = self.randomTokens()
+            scorer = self.rng.choice((None, self.PositionScorer(1000)))
+            offset = self.rng.randint(0, 9)
+            expected = self.bruteForce(tokens, False, scorer, offset)
+            result = self.ss.solveLinear(tokens, self.limits, scorer, offset)
+            self.assertSolution(tokens, result, expected, scorer, offset)
+            solved += expected != None
+        self.assertTrue(50 < solved < 250)
+
+    def testCyclicMatchesBruteForce(self):
+        """solveCyclic on random loops, with and without a scorer"""
+        solved = 0
+        for n in range(300):
+            tokens = self.randomTokens()
+            scorer = self.rng.choice((None,
+                                      self.PositionScorer(sum(tokens))))
+            expected = self.bruteForce(tokens, True, scorer)
+            result = self.ss.solveCyclic(tokens, self.limits, scorer)
+            self.assertSolution(tokens, result, expected, scorer)
+            solved += expected != None
+        self.assertTrue(50 < solved < 250)
+
+    def testCyclicRotations(self):
+        """A loop costs the same whichever token it is started from"""
+        class SquaredScorer(object):
+            def cost(self, start, end):
+                return (end - start - 10)**2
+        solved = 0
+        for n in range(120):
+            tokens = [self.rng.choice((1, 1, 1, 2, 4, 6, 9))
+                      for i in range(self.rng.randint(2, 40))]
+            # a target near the maximum favours breaks late in the loop
+            self.limits = self.rng.choice(([6, 14, 10], [6, 14, 13]))
+            for scorer in (None, SquaredScorer()):
+                expected = self.ss.solveCyclic(tokens, self.limits, scorer)
+                if len(tokens) <= 12:
+                    self.assertSolution(tokens, expected,
+                                        self.bruteForce(tokens, True, scorer),
+                                        scorer)
+                for r in range(1, len(tokens)):
+                    rotated = tokens[r:] + tokens[:r]
+                    result = self.ss.solveCyclic(rotated, self.limits, scorer)
+                    if expected == None:
+                        self.assertEqual(result, None)
+                    else:
+                        self.assertSolution(rotated, result, expected[2],
+                                            scorer)
+                solved += expected != None
+        self.assertTrue(solved > 100)
+# end class
+
+
+class TmScorerTests(unittest.TestCase):
+    """The nearest-neighbor Tm scorer matches hand-computed duplexes."""
+    # sequence, summed dH (kcal/mol) and dS (cal/(K mol)) of its stacks
+    # and terminal initiations, Tm at 50 mM Na+ and 100 nM staple
+    duplexes = [("CGTTGA", -41.2, -115.4, -8.5273002),
+                ("GCATCGATTACGGCTA", -124.2, -337.9, 45.9516522),
+                ("ATTAGCCGTAATCGATGCAAGTCC", -188.1, -510.9, 56.2506636)]
+
+    class Strand(object):
+        def __init__(self, length):
+            self.length = length
+        def totalLength(self):
+            return self.length
+
+    class Oligo(object):
+        """The parts of an oligo the scorer reads"""
+        def __init__(self, sequence, strandLengths, isLoop=False):
+            self._sequence = sequence
+            self._strands = [TmScorerTests.Strand(length)
+                             for length in strandLengths]
+            self._isLoop = isLoop
+        def sequence(self):
+            return self._sequence
+        def length(self):
+            return len(self._sequence)
+        def isLoop(self):
+            return self._isLoop
+        def strand5p(self):
+            return self
+        def generator3pStrand(self):
+            return iter(self._strands)
+
+    def setUp(self):
+        import random
+        self.scorers = autobreakModule('scorers')
+        self.rng = random.Random(35)
+
+    def bind(self, sequence, strandLengths=None, settings={}):
+        if strandLengths == None:
+            strandLengths = [len(sequence)]
+        oligo = self.Oligo(sequence, strandLengths)
+        return self.scorers.TmScorer(settings).forOligo(oligo, [])
+
+    def testKnownDuplexes(self):
+        """Tm of whole oligos and of windows inside a longer one"""
+        from math import log
+        for sequence, dH, dS, tm in self.duplexes:
+            n = len(sequence)
+            dS += 0.368*(n - 1)*log(0.05)  # salt correction
+            self.assertAlmostEqual(1000.*dH/(dS + 1.987*log(1e-7/4)) - 273.15,
+                                   tm, 6)
+            scorer = self.bind(sequence)
+            self.assertAlmostEqual(scorer.tm(0, n), tm, 6)
+            self.assertAlmostEqual(scorer.cost(0, n), abs(tm - 60.), 6)
+            # the same duplex as a window of a longer oligo
+            scorer = self.bind("TTGCA" + sequence + "GGATC")
+            self.assertAlmostEqual(scorer.tm(5, 5 + n), tm, 6)
+        warm = self.bind(self.duplexes[2][0], settings={'tgtStapleTm': 50.})
+        self.assertAlmostEqual(warm.cost(0, 24), 56.2506636 - 50., 6)
+        self.assertEqual(self.bind("ACGTN"), None)  # unassigned bases
+
+    def testDomainShortfall(self):
+        """Domains colder than minDomainTm add to the cost"""
+        sequence = self.duplexes[1][0] + self.duplexes[2][0]  # 16 + 24
+        settings = {'minDomainTm': 50., 'domainWeight': 2.}
+        scorer = self.bind(sequence, [16, 24], settings)
+        tm = lambda seq: self.bind(seq).tm(0, len(seq))
+        whole = tm(sequence)
+        self.assertAlmostEqual(scorer.cost(0, 40), abs(whole - 60.) +
+                               2.*(50. - 45.9516522), 6)
+        # a staple within one strand is a single domain at both ends
+        inner = self.duplexes[2][0][2:20]
+        self.assertAlmostEqual(scorer.cost(18, 36), abs(tm(inner) - 60.) +
+                               2.*2*(50. - tm(inner)), 6)
+
+    def testNumpyMatchesPurePython(self):
+        """Both ways of building the tables give the same costs"""
+        if self.scorers.numpy == None:
+            self.skipTest("numpy is not installed")
+        sequence = "".join(self.rng.choice("ACGT") for i in range(300))
+        strandLengths = [20, 41, 7, 100, 32, 100]
+        settings = {'minDomainTm': 45.}
+        fast = self.bind(sequence, strandLengths, settings)
+        numpy, self.scorers.numpy = self.scorers.numpy, None
+        try:
+            slow = self.bind(sequence, strandLengths, settings)
+        finally:
+            self.scorers.numpy = numpy
+        for name in ('_cumH', '_cumS', '_initH', '_initS'):
+            a, b = getattr(fast, name), getattr(slow, name)
+            self.assertEqual(len(a), len(b))
+            for x, y in zip(a, b):
+                self.assertAlmostEqual(x, y, 9)
+        self.assertEqual(fast._nextXover, slow._nextXover)
+        self.assertEqual(fast._prevXover, slow._prevXover)
+        self.assertEqual(fast.cacheId(), slow.cacheId())
+        for n in range(500):
+            start = self.rng.randint(0, 290)
+            end = self.rng.randint(start + 2, min(300, start + 60))
+            self.assertAlmostEqual(fast.cost(start, end),
+                                   slow.cost(start, end), 9)
+# end class
+
+
+class SolutionCacheTests(unittest.TestCase):
+    """The autobreak solution cache stays within its byte budget."""
+    def setUp(self):
+        self.sc = autobreakModule('solutioncache')
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "cache",
+                                     self.sc.CACHE_FILENAME)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def entry(self, i):
+        return (self.sc.cacheKey([i, i + 1], False, [18, 60, 45], 'tm'),
+                ([i, 2*i, 3*i], i))
+
+    def testEvictsLeastRecentlyUsed(self):
+        """Lookups refresh entries; the oldest go once maxBytes is passed"""
+        cache = self.sc.SolutionCache()
+        entries = [self.entry(i) for i in range(10)]
+        sizes = [cache._entrySize(key, value) for key, value in entries]
+        cache = self.sc.SolutionCache(maxBytes=sum(sizes[:4]))
+        for key, value in entries[:4]:
+            cache.put(key, value)
+        self.assertEqual(len(cache), 4)
+        self.assertEqual(cache.nbytes(), sum(sizes[:4]))
+        self.assertEqual(cache.get(entries[0][0]), entries[0][1])
+        cache.put(*entries[4])  # evicts entries[1], now the oldest
+        self.assertFalse(entries[1][0] in cache)
+        for key, value in [entries[i] for i in (0, 2, 3, 4)]:
+            self.assertEqual(cache[key], value)
+        self.assertEqual(cache.nbytes(), sum(sizes[i] for i in (0, 2, 3, 4)))
+        self.assertEqual(cache.get(entries[1][0]), None)
+        self.assertEqual((cache.hits, cache.misses), (5, 1))
+        # replacing an entry recounts its size
+        key = entries[0][0]
+        cache.put(key, ([], 0))
+        self.assertEqual(cache.nbytes(),
+                         sum(sizes[i] for i in (2, 3, 4)) + \
+                         cache._entrySize(key, ([], 0)))
+        cache.clear()
+        self.assertEqual((len(cache), cache.nbytes()), (0, 0))
+
+    def testSaveAndLoad(self):
+        """Entries survive a round trip in least recently used order"""
+        cache = self.sc.SolutionCache(filename=self.filename)
+        entries = [self.entry(i) for i in range(6)]
+        for key, value in entries:
+            cache.put(key, value)
+        cache.get(entries[0][0])
+        # another process's unfinished save must be left alone
+        os.makedirs(os.path.dirname(self.filename))
+        other = self.filename + ".tmp"
+        with open(other, 'w') as f:
+            f.write("partial")
+        cache.save()
+        with open(other) as f:
+            self.assertEqual(f.read(), "partial")
+        os.remove(other)
+        self.assertEqual(os.listdir(os.path.dirname(self.filename)),
+                         [self.sc.CACHE_FILENAME])
+        loaded = self.sc.SolutionCache()
+        loaded.put(*self.entry(99))  # this session's entries stay newest
+        loaded.setFilename(self.filename)
+        self.assertEqual(len(loaded), 7)
+        self.assertEqual(loaded.nbytes(),
+                         sum(loaded._entrySize(key, value)
+                             for key, value in loaded._entries.iteritems()))
+        order = [key for key, value in entries[1:] + entries[:1]]
+        self.assertEqual(list(loaded._entries),
+                         order + [self.entry(99)[0]])
+        for key, value in entries:
+            self.assertEqual(loaded.get(key), value)
+        # a smaller cache keeps the most recently used entries of the file
+        small = self.sc.SolutionCache(maxBytes=cache.nbytes()//2,
+                                      filename=self.filename)
+        small.load()
+        self.assertTrue(0 < len(small) < 6)
+        self.assertTrue(entries[0][0] in small)
+        self.assertFalse(entries[1][0] in small)
+# end class
+
+if __name__ == '__main__':
+    print "Running Headless Tests"
+    unittest.main()
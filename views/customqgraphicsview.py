@@ -41,8 +41,10 @@ from views import styles
 
 import util
 # import Qt stuff into the module namespace with PySide, PyQt4 independence
-util.qtWrapImport('QtCore', globals(), ['Qt', 'QTimer', 'pyqtSignal', 'QTimeLine'])
-util.qtWrapImport('QtGui', globals(),  ['QGraphicsView', 'QGraphicsScene', 'qApp', 'QPen','QPaintEngine'])
+util.qtWrapImport('QtCore', globals(), ['Qt', 'QTimer', 'pyqtSignal', 'QTimeLine',\
+                                        'QRect', 'QRectF'])
+util.qtWrapImport('QtGui', globals(),  ['QGraphicsView', 'QGraphicsScene', 'qApp', 'QPen','QPaintEngine',\
+                                        'QRubberBand'])
 
 # for OpenGL mode
 try:
@@ -90,6 +92,11 @@ class CustomQGraphicsView(QGraphicsView):
         self.setStyleSheet("QGraphicsView { background-color: rgb(96.5%, 96.5%, 96.5%); }")
         self._noDrag = QGraphicsView.RubberBandDrag
         self._yesDrag = QGraphicsView.ScrollHandDrag
+        self._isSelectionActive = True
+        # set by setRubberBandSelector
+        self._rubberBandSelector = None
+        self._rubberBand = None
+        self._rubberBandOrigin = None  # viewport pos while banding
         
         # reset things that are state dependent
         self.clearGraphicsView()
@@ -105,6 +112,8 @@ class CustomQGraphicsView(QGraphicsView):
         self._showDetails = True
         self._last_scale_factor = 0.0
         self.sceneRootItem = None  # the item to transform
+        self._visibleRect = None  # in sceneRootItem coordinates
+        self._visibleRectPending = False
         # Keyboard panning
         self._key_pan_delta_x = styles.PATH_BASE_WIDTH * 21
         self._key_pan_delta_y = styles.PATH_HELIX_HEIGHT + styles.PATH_HELIX_PADDING/2
@@ -126,6 +135,7 @@ class CustomQGraphicsView(QGraphicsView):
     # end def
 
     levelOfDetailChangedSignal = pyqtSignal(bool)
+    visibleRectChangedSignal = pyqtSignal(QRectF)  # visible scene rect
 
     def __repr__(self):
         clsName = self.__class__.__name__
@@ -147,7 +157,8 @@ class CustomQGraphicsView(QGraphicsView):
         if self._selectionLock:
             self._selectionLock.clearSelection(False)
         self.clearSelectionLockAndCallbacks()
-        if isActive:
+        self._isSelectionActive = isActive
+        if isActive and self._rubberBandSelector == None:
             self._noDrag = QGraphicsView.RubberBandDrag
         else:
             self._noDrag = QGraphicsView.NoDrag
@@ -155,6 +166,21 @@ class CustomQGraphicsView(QGraphicsView):
             self.setDragMode(self._noDrag)
     # end def
 
+    def setRubberBandSelector(self, selector):
+        """
+        Replaces QGraphicsView's rubber band selection, which intersects
+        the band with every item in the scene, with a band drawn by the
+        view. On release the band is passed in scene coordinates to
+        selector.rubberBandSelect(sceneRect, extend), which decides what it
+        covers.
+        """
+        self._rubberBandSelector = selector
+        if self._noDrag == QGraphicsView.RubberBandDrag:
+            self._noDrag = QGraphicsView.NoDrag
+            if self.dragMode() != self._yesDrag:
+                self.setDragMode(self._noDrag)
+    # end def
+
     def clearGraphicsView(self):
         # Event handling
         self._hasFocus = False
@@ -376,6 +402,9 @@ class CustomQGraphicsView(QGraphicsView):
                 self._y0 = yf
             elif self._dollyZoomEnable == True:
                 self.dollyZoom(event)
+        elif self._rubberBandOrigin != None:
+            rect = QRect(self._rubberBandOrigin, event.pos()).normalized()
+            self._rubberBand.setGeometry(rect)
         # adding this allows events to be passed to items underneath
         QGraphicsView.mouseMoveEvent(self, event)
     # end def
@@ -398,6 +427,11 @@ class CustomQGraphicsView(QGraphicsView):
                 QGraphicsView.mousePressEvent(self, event)
         else:
             QGraphicsView.mousePressEvent(self, event)
+            # start a band if no item took the press
+            if self._rubberBandSelector != None and self._isSelectionActive\
+                    and event.button() == Qt.LeftButton\
+                    and not event.isAccepted():
+                self._startRubberBand(event.pos())
     #end def
 
     def mouseReleaseEvent(self, event):
@@ -413,6 +447,8 @@ class CustomQGraphicsView(QGraphicsView):
                 return QGraphicsView.mouseReleaseEvent(self, event)
         # end if
         else:
+            if self._rubberBandOrigin != None:
+                self._endRubberBand(event.modifiers())
             if len(self._pressList):  # Notify any pressed items to release
                 event_pos = event.pos()
                 for item in self._pressList:
@@ -430,6 +466,29 @@ class CustomQGraphicsView(QGraphicsView):
 
     #end def
 
+    def _startRubberBand(self, pos):
+        if self._rubberBand == None:
+            self._rubberBand = QRubberBand(QRubberBand.Rectangle, self.viewport())
+        self._rubberBandOrigin = pos
+        self._rubberBand.setGeometry(QRect(pos, pos))
+        self._rubberBand.show()
+    # end def
+
+    def _endRubberBand(self, modifiers):
+        """
+        Selects what the band covers. Like a click, the band replaces the
+        selection unless the Meta modifier is held.
+        """
+        band = self._rubberBand
+        band.hide()
+        self._rubberBandOrigin = None
+        rect = band.geometry()
+        if rect.width() > 1 or rect.height() > 1:  # not just a click
+            sceneRect = self.mapToScene(rect).boundingRect()
+            extend = bool(modifiers & Qt.MetaModifier)
+            self._rubberBandSelector.rubberBandSelect(sceneRect, extend)
+    # end def
+
     def _panEnable(self):
         """Enable ScrollHandDrag Mode in QGraphicsView (displays a hand
         pointer)"""
@@ -538,8 +597,39 @@ class CustomQGraphicsView(QGraphicsView):
         self.resetGL()
     # end def
 
+    def visibleSceneRect(self):
+        return self.mapToScene(self.viewport().rect()).boundingRect()
+    # end def
+
     def paintEvent(self, event):
         if self.toolbar:
             self.toolbar.setPos(self.mapToScene(0, 0))
+        self._checkVisibleRect()
         QGraphicsView.paintEvent(self, event)
+    # end def
+
+    def _checkVisibleRect(self):
+        """
+        Schedules visibleRectChangedSignal if a pan, zoom or resize moved
+        the viewport since the last paint. Panning translates sceneRootItem
+        rather than scrolling the view, so the rect is compared in its
+        coordinates. The signal is sent from the event loop instead of from
+        within paintEvent, since receivers may add and remove items.
+        """
+        root = self.sceneRootItem
+        if root == None:
+            return
+        rect = root.mapRectFromScene(self.visibleSceneRect())
+        if self._visibleRect != None and rect == self._visibleRect:
+            return
+        self._visibleRect = rect
+        if not self._visibleRectPending:
+            self._visibleRectPending = True
+            QTimer.singleShot(0, self._emitVisibleRect)
+    # end def
+
+    def _emitVisibleRect(self):
+        self._visibleRectPending = False
+        self.visibleRectChangedSignal.emit(self.visibleSceneRect())
+    # end def
 #end class
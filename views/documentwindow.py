@@ -83,6 +83,7 @@ class DocumentWindow(QMainWindow, ui_mainwindow.Ui_MainWindow):
         assert self.pathroot.scene() == self.pathscene
         self.pathGraphicsView.setScene(self.pathscene)
         self.pathGraphicsView.sceneRootItem = self.pathroot
+        self.pathGraphicsView.setRubberBandSelector(self.pathroot)
         self.pathGraphicsView.setScaleFitFactor(0.9)
         self.pathGraphicsView.setName("PathView")
         self.pathColorPanel = ColorPanel()
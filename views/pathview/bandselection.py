@@ -0,0 +1,142 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+bandselection.py
+
+Finds what a rubber band selects in the path view, and where the box
+around a strand selection goes, from the model alone, so strands without
+a StrandItem are handled as well. Nothing here needs Qt: helices are
+given as (virtualHelix, x, y), the upper left corner of base 0 of each,
+and rects as (left, top, right, bottom), all in the same coordinates,
+e.g. those of the PartItem.
+"""
+
+from math import floor
+from model.enum import StrandType
+
+
+def isStrandTypeOnTop(virtualHelix, strandType):
+    """True if strands of strandType are drawn in the upper row."""
+    isEvenParity = virtualHelix.isEvenParity()
+    return isEvenParity and strandType == StrandType.Scaffold or \
+           not isEvenParity and strandType == StrandType.Staple
+# end def
+
+
+def strandSelectionInRect(helices, rect, filterDict, maxIdx, baseWidth):
+    """
+    Returns {strand: (lowSelected, highSelected)} for the strands, ends
+    and crossovers inside rect that pass the selection filters in
+    filterDict. A strand, end or crossover is inside when a base it is
+    drawn on overlaps rect.
+    """
+    left, top, right, bottom = rect
+    bw = baseWidth
+    selectEnds = "endpoint" in filterDict
+    selectStrands = "strand" in filterDict
+    selectXovers = "xover" in filterDict
+    values = {}
+
+    def add(strand, low, high):
+        old = values.get(strand)
+        if old != None:
+            low, high = low or old[0], high or old[1]
+        values[strand] = (low, high)
+    # end def
+
+    for vh, x, y in helices:
+        if y + 2*bw < top or y > bottom:
+            continue
+        lowIdx = max(0, int(floor((left - x)/bw)))
+        highIdx = min(maxIdx, int(floor((right - x)/bw)))
+        if lowIdx > highIdx:
+            continue
+        for strandSet in vh.getStrandSets():
+            if strandSet.strandFilter() not in filterDict:
+                continue
+            rowTop = y if isStrandTypeOnTop(vh, strandSet.strandType()) \
+                       else y + bw
+            if rowTop + bw < top or rowTop > bottom:
+                continue
+            for strand in strandSet.getOverlappingStrands(lowIdx, highIdx):
+                sLow, sHigh = strand.idxs()
+                if selectStrands:
+                    add(strand, True, True)
+                elif selectEnds:
+                    low = lowIdx <= sLow and strand.connectionLow() == None
+                    high = sHigh <= highIdx and strand.connectionHigh() == None
+                    if low or high:
+                        add(strand, low, high)
+                if selectXovers:
+                    strand3p = strand.connection3p()
+                    if strand3p != None and \
+                                    lowIdx <= strand.idx3Prime() <= highIdx:
+                        is5to3 = strand.isDrawn5to3()
+                        add(strand, not is5to3, is5to3)
+                        is5to3 = strand3p.isDrawn5to3()
+                        add(strand3p, is5to3, not is5to3)
+                    strand5p = strand.connection5p()
+                    if strand5p != None and \
+                                    lowIdx <= strand.idx5Prime() <= highIdx:
+                        is5to3 = strand.isDrawn5to3()
+                        add(strand, is5to3, not is5to3)
+                        is5to3 = strand5p.isDrawn5to3()
+                        add(strand5p, not is5to3, is5to3)
+    return values
+# end def
+
+
+def selectedEndsRect(helices, selectionDict, baseWidth):
+    """
+    Returns (left, top, right, bottom) around the bases of every selected
+    strand end on helices, or None if none is selected. selectionDict is
+    the document's {strandSet: {strand: (lowSelected, highSelected)}}, so
+    the rect does not depend on which strands have a StrandItem.
+    """
+    bw = baseWidth
+    left = top = right = bottom = None
+    for vh, x, y in helices:
+        for strandSet in vh.getStrandSets():
+            selected = selectionDict.get(strandSet)
+            if not selected:
+                continue
+            rowTop = y if isStrandTypeOnTop(vh, strandSet.strandType()) \
+                       else y + bw
+            for strand, (low, high) in selected.iteritems():
+                idxs = [idx for idx, isSelected in zip(strand.idxs(),
+                                                       (low, high))
+                        if isSelected]
+                if not idxs:
+                    continue
+                lo, hi = x + idxs[0]*bw, x + (idxs[-1] + 1)*bw
+                if left == None:
+                    left, top, right, bottom = lo, rowTop, hi, rowTop + bw
+                else:
+                    left, right = min(left, lo), max(right, hi)
+                    top, bottom = min(top, rowTop), max(bottom, rowTop + bw)
+    if left == None:
+        return None
+    return (left, top, right, bottom)
+# end def
@@ -0,0 +1,165 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+"""
+graphicscache.py
+
+Shared pens, brushes, label metrics and text paths for the path view
+items. Many items draw with the same oligo colors and labels, so each is
+created once and handed to every item that needs it. Qt's pens, brushes
+and painter paths are implicitly shared, so setting one on many items
+copies no data, and an item that changes its copy does not affect the
+others.
+
+Each kind of object lives in its own GraphicsCache, a size-bounded LRU
+map that counts hits, misses and evictions (see stats).
+"""
+
+from collections import OrderedDict
+from views import styles
+import util
+
+# import Qt stuff into the module namespace with PySide, PyQt4 independence
+util.qtWrapImport('QtCore', globals(), ['Qt'])
+util.qtWrapImport('QtGui', globals(), ['QBrush', 'QColor', 'QFontMetrics',
+                                       'QPen'])
+
+
+class GraphicsCache(object):
+    """
+    Maps keys to objects made by a factory, keeping the maxEntries most
+    recently used.
+    """
+    def __init__(self, name, maxEntries):
+        self._name = name
+        self._entries = OrderedDict()
+        self._maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    # end def
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def name(self):
+        return self._name
+
+    def get(self, key, factory):
+        """Returns the entry for key, calling factory() to make it if absent."""
+        entries = self._entries
+        if key in entries:
+            value = entries.pop(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            value = factory()
+            if len(entries) >= self._maxEntries:
+                entries.popitem(last=False)
+                self.evictions += 1
+        entries[key] = value  # most recently used goes last
+        return value
+    # end def
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+    # end def
+
+    def stats(self):
+        return {'name': self._name, 'size': len(self._entries),
+                'maxEntries': self._maxEntries, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+    # end def
+# end class
+
+
+_pens = GraphicsCache('pens', 512)
+_brushes = GraphicsCache('brushes', 512)
+_labelRects = GraphicsCache('labelRects', 1024)
+_textPaths = GraphicsCache('textPaths', 4096)
+_caches = (_pens, _brushes, _labelRects, _textPaths)
+
+_labelMetrics = QFontMetrics(styles.XOVER_LABEL_FONT)
+
+
+def pen(color, width, capStyle=Qt.SquareCap):
+    """A QPen of QColor color."""
+    def create():
+        p = QPen(color, width)
+        p.setCapStyle(capStyle)
+        return p
+    return _pens.get((color.rgba(), width, int(capStyle)), create)
+# end def
+
+
+def strandPen(color, highlight=False):
+    """
+    The pen strands and crossovers are drawn with: flat capped, and wider
+    and half transparent for highlighted oligos.
+    """
+    if highlight:
+        color = QColor(color)
+        color.setAlpha(128)
+        width = styles.PATH_STRAND_HIGHLIGHT_STROKE_WIDTH
+    else:
+        width = styles.PATH_STRAND_STROKE_WIDTH
+    return pen(color, width, Qt.FlatCap)
+# end def
+
+
+def brush(color):
+    """A solid QBrush of QColor color."""
+    return _brushes.get(color.rgba(), lambda: QBrush(color))
+# end def
+
+
+def labelRect(text):
+    """The tight bounding rect of text in the crossover label font."""
+    return _labelRects.get(text, lambda: _labelMetrics.tightBoundingRect(text))
+# end def
+
+
+def textPath(key, build):
+    """
+    A QPainterPath of laid out text, such as a sequence drawn along an
+    insertion, made by build() the first time key is seen. key must
+    capture everything the path depends on.
+    """
+    return _textPaths.get(key, build)
+# end def
+
+
+def stats():
+    """Returns a list with the counters of each cache."""
+    return [cache.stats() for cache in _caches]
+# end def
+
+
+def clear():
+    for cache in _caches:
+        cache.clear()
+# end def
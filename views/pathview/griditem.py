@@ -0,0 +1,204 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+"""
+griditem.py
+
+Draws the minor grid lines of every helix in the path view from a single
+item, so that VirtualHelixItems only keep their outline and resizing the
+part rebuilds no per-base geometry.
+"""
+
+from bisect import bisect_left, bisect_right
+from math import ceil, floor
+from graphicscache import GraphicsCache
+from views import styles
+import util
+
+# import Qt stuff into the module namespace with PySide, PyQt4 independence
+util.qtWrapImport('QtCore', globals(), ['QRectF', 'Qt'])
+util.qtWrapImport('QtGui', globals(), ['QGraphicsItem', 'QPainter',
+                                       'QPainterPath', 'QPen', 'QPixmap'])
+
+_bw = styles.PATH_BASE_WIDTH
+
+
+def _gridPen(cosmetic):
+    pen = QPen(styles.minorgridstroke, styles.MINOR_GRID_STROKE_WIDTH)
+    pen.setCosmetic(cosmetic)
+    return pen
+# end def
+
+# keyed by whether the view shows details; zoomed out, the lines scale with
+# the view rather than staying one pixel wide
+_gridPens = {True: _gridPen(True), False: _gridPen(False)}
+# tiles are made about this many pixels wide; at zoom levels where a single
+# substep is wider than twice that, the visible lines are drawn directly
+_tileWidth = 512
+_tiles = GraphicsCache('gridTiles', 16)
+
+
+def gridPath(lowIdx, highIdx, subStepSize):
+    """
+    Returns a QPainterPath with the grid lines of bases lowIdx up to, but
+    not including, highIdx of a helix: a thin line at each base and a
+    thicker one every subStepSize bases.
+    """
+    bw2 = 2 * _bw
+    path = QPainterPath()
+    for i in xrange(lowIdx, highIdx):
+        x = round(_bw * i) + .5
+        if i % subStepSize == 0:
+            path.moveTo(x-.5, 0)
+            path.lineTo(x-.5, bw2)
+            path.lineTo(x-.25, bw2)
+            path.lineTo(x-.25, 0)
+            path.lineTo(x, 0)
+            path.lineTo(x, bw2)
+            path.lineTo(x+.25, bw2)
+            path.lineTo(x+.25, 0)
+            path.lineTo(x+.5, 0)
+            path.lineTo(x+.5, bw2)
+        else:
+            path.moveTo(x, 0)
+            path.lineTo(x, bw2)
+    return path
+# end def
+
+
+class GridItem(QGraphicsItem):
+    """
+    Owned by a PartItem and placed behind its VirtualHelixItems. The grid
+    repeats every subStepSize bases, so for each zoom level one pixmap
+    covering a whole number of substeps is rendered and drawn across the
+    visible bases of each visible helix. Tiles start half a base before a
+    substep so that no grid line straddles two of them.
+    """
+    def __init__(self, partItem):
+        super(GridItem, self).__init__(partItem.proxy())
+        self._partItem = partItem
+        self._rect = QRectF()
+        self._rows = []  # the y of each helix, ascending
+        self._length = 0  # bases per helix
+        self._subStepSize = 1
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setZValue(styles.ZPATHHELIXGROUP)
+    # end def
+
+    ### PUBLIC METHODS ###
+    def setGeometry(self, rows, length, subStepSize):
+        """
+        Draws the grid for helices placed at the y positions in rows, each
+        length bases long.
+        """
+        self.prepareGeometryChange()
+        self._rows = rows = sorted(rows)
+        self._length = length
+        self._subStepSize = subStepSize
+        if rows and length > 0:
+            self._rect = QRectF(0, rows[0], length*_bw,
+                                rows[-1] - rows[0] + 2*_bw)
+        else:
+            self._rect = QRectF()
+        self.update()
+    # end def
+
+    def boundingRect(self):
+        return self._rect
+    # end def
+
+    def paint(self, painter, option, widget=None):
+        rows = self._rows
+        if not rows or self._length == 0:
+            return
+        pen = _gridPens[self.scene().views()[0].shouldShowDetails()]
+        rect = option.exposedRect
+        if rect.isEmpty():
+            rect = self._rect
+        # the last grid line would fall on the right border of the helix
+        gridRight = (self._length - .5)*_bw
+        left, right = max(0., rect.left()), min(gridRight, rect.right())
+        if left >= right:
+            return
+        rows = rows[bisect_left(rows, rect.top() - 2*_bw):\
+                    bisect_right(rows, rect.bottom())]
+        scale = painter.worldTransform().m11()
+        subStepSize = self._subStepSize
+        if widget == None or scale <= 0 or \
+                            subStepSize*_bw*scale > 2*_tileWidth:
+            # exporting, or zoomed in so far that few lines are visible
+            lowIdx = int(floor(left / _bw))
+            highIdx = min(self._length, int(ceil(right / _bw)) + 1)
+            path = gridPath(lowIdx, highIdx, subStepSize)
+            painter.setPen(pen)
+            painter.setBrush(Qt.NoBrush)
+            for y in rows:
+                painter.drawPath(path.translated(0, y))
+            return
+        tileBases, pixmap = self._tile(scale, painter, pen)
+        tileW = tileBases*_bw
+        pw, ph = pixmap.width(), pixmap.height()
+        firstTile = int(floor((left + _bw/2.)/tileW))
+        lastTile = int(floor((right + _bw/2.)/tileW))
+        for t in xrange(firstTile, lastTile+1):
+            x0 = t*tileW - _bw/2.
+            x1 = min(x0 + tileW, gridRight)
+            sx = 0
+            if x0 < 0:
+                sx, x0 = -x0*pw/tileW, 0.
+            source = QRectF(sx, 0, (x1 - x0)*pw/tileW, ph)
+            for y in rows:
+                painter.drawPixmap(QRectF(x0, y, x1 - x0, 2*_bw), pixmap,
+                                   source)
+    # end def
+
+    ### PRIVATE SUPPORT METHODS ###
+    def _tile(self, scale, painter, pen):
+        """
+        Returns (tileBases, pixmap) for the grid of tileBases bases drawn
+        with pen at the device scale of painter.
+        """
+        subStepSize = self._subStepSize
+        tileBases = subStepSize*max(1, int(_tileWidth/(subStepSize*_bw*scale)))
+        antialias = painter.testRenderHint(QPainter.Antialiasing)
+
+        def render():
+            w = int(ceil(tileBases*_bw*scale))
+            h = int(ceil(2*_bw*scale))
+            pixmap = QPixmap(w, h)
+            pixmap.fill(Qt.transparent)
+            p = QPainter(pixmap)
+            p.setRenderHint(QPainter.Antialiasing, antialias)
+            p.scale(float(w)/(tileBases*_bw), h/(2.*_bw))
+            p.translate(_bw/2., 0)
+            p.setPen(pen)
+            p.drawPath(gridPath(0, tileBases, subStepSize))
+            p.end()
+            return pixmap
+        # end def
+        key = (round(scale, 4), tileBases, subStepSize, antialias,
+               pen.isCosmetic())
+        return tileBases, _tiles.get(key, render)
+    # end def
+# end class
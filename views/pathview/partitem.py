@@ -28,9 +28,12 @@
 from collections import defaultdict
 from math import ceil
 from activesliceitem import ActiveSliceItem
+import bandselection
 from controllers.itemcontrollers.partitemcontroller import PartItemController
+from griditem import GridItem
 from prexoveritem import PreXoverItem
 from strand.xoveritem import XoverNode3
+from strandpool import StrandItemPool
 from ui.mainwindow.svgbutton import SVGButton
 from views import styles
 from virtualhelixitem import VirtualHelixItem
@@ -46,6 +49,9 @@ util.qtWrapImport('QtGui', globals(), ['QBrush', 'QGraphicsPathItem', 'QGraphics
 _baseWidth = _bw = styles.PATH_BASE_WIDTH
 _defaultRect = QRectF(0, 0, _baseWidth, _baseWidth)
 _modPen = QPen(styles.bluestroke)
+# hidden PreXoverItems kept around for reuse; the rest are deleted, since a
+# hidden item stays parented to the helix it was last shown on
+_maxFreePreXoverItems = 256
 
 class ProxyParentItem(QGraphicsRectItem):
     """an invisible container that allows one to play with Z-ordering"""
@@ -64,7 +70,8 @@ class PartItem(QGraphicsRectItem):
         self._activeSliceItem = ActiveSliceItem(self, mP.activeBaseIndex())
         self._activeVirtualHelixItem = None
         self._controller = PartItemController(self, mP)
-        self._preXoverItems = []  # crossover-related
+        self._preXoverItems = {}  # crossover-related
+        self._freePreXoverItems = []  # hidden, for reuse
         self._virtualHelixHash = {}
         self._virtualHelixItemList = []
         self._vHRect = QRectF()
@@ -73,6 +80,8 @@ class PartItem(QGraphicsRectItem):
         self._initResizeButtons()
         self._proxyParent = ProxyParentItem(self)
         self._proxyParent.setFlag(QGraphicsItem.ItemHasNoContents)
+        self._gridItem = GridItem(self)
+        self._strandItemPool = StrandItemPool(self, viewroot)
     # end def
     
     def proxy(self):
@@ -126,6 +135,7 @@ class PartItem(QGraphicsRectItem):
             vhiHRect = vhi.handle().boundingRect()
             self._vHRect.setLeft(vhiHRect.left())
             self._vHRect.setRight(vhiRect.right())
+        self._updateGrid()
         self.scene().views()[0].zoomToFit()
         self._activeSliceItem.resetBounds()
         self._updateBoundingRect()
@@ -134,6 +144,8 @@ class PartItem(QGraphicsRectItem):
     def partRemovedSlot(self, sender):
         """docstring for partRemovedSlot"""
         self._activeSliceItem.removed()
+        self._strandItemPool.destroy()
+        self._strandItemPool = None
         self.parentItem().removePartItem(self)
         scene = self.scene()
         scene.removeItem(self)
@@ -200,6 +212,12 @@ class PartItem(QGraphicsRectItem):
         self._setVirtualHelixItemList(newList)
     # end def
 
+    def partStrandChangedSlot(self, sender, virtualHelix):
+        vhi = self._virtualHelixHash.get(virtualHelix.coord())
+        if vhi != None:
+            vhi.invalidateStrip()
+    # end def
+
     def updatePreXoverItemsSlot(self, sender, virtualHelix):
         part = self.part()
         if virtualHelix == None:
@@ -242,6 +260,14 @@ class PartItem(QGraphicsRectItem):
         return self._virtualHelixHash[virtualHelix.coord()]
     # end def
 
+    def virtualHelixItems(self):
+        return self._virtualHelixItemList
+    # end def
+
+    def strandItemPool(self):
+        return self._strandItemPool
+    # end def
+
     def virtualHelixBoundingRect(self):
         return self._vHRect
     # end def
@@ -251,6 +277,15 @@ class PartItem(QGraphicsRectItem):
     # end def
 
     ### PRIVATE METHODS ###
+    def _helixOrigins(self):
+        """(virtualHelix, x, y) of base 0 of each helix, in part coordinates"""
+        helices = []
+        for vhi in self._virtualHelixItemList:
+            pos = vhi.mapToItem(self, 0, 0)
+            helices.append((vhi.virtualHelix(), pos.x(), pos.y()))
+        return helices
+    # end def
+
     def _addBasesClicked(self):
         part = self._modelPart
         step = part.stepSize()
@@ -344,10 +379,18 @@ class PartItem(QGraphicsRectItem):
         # end for
         self._vHRect = QRectF(leftmostExtent, -40, -leftmostExtent + rightmostExtent, y + 40)
         self._virtualHelixItemList = newList
+        self._updateGrid()
+        self._strandItemPool.scheduleRefresh()  # helices may have moved
         if zoomToFit:
             self.scene().views()[0].zoomToFit()
     # end def
 
+    def _updateGrid(self):
+        part = self._modelPart
+        self._gridItem.setGeometry([vhi.y() for vhi in self._virtualHelixItemList],
+                                   part.maxBaseIdx() + 1, part.subStepSize())
+    # end def
+
     def _updateBoundingRect(self):
         """
         Updates the bounding rect to the size of the childrenBoundingRect,
@@ -375,6 +418,17 @@ class PartItem(QGraphicsRectItem):
             rmButton.hide()
     # end def
 
+    def _acquirePreXoverItem(self, fromVHI, toVHI, index, strandType, isLowIdx):
+        free = self._freePreXoverItems
+        while free:
+            pxi = free.pop()
+            if pxi.scene() != None:
+                pxi.setPreXover(fromVHI, toVHI, index, strandType, isLowIdx)
+                return pxi
+            pxi.remove()  # went with a removed helix
+        return PreXoverItem(fromVHI, toVHI, index, strandType, isLowIdx)
+    # end def
+
     ### PUBLIC METHODS ###
     def setModifyState(self, bool):
         """Hides the modRect when modify state disabled."""
@@ -424,6 +478,33 @@ class PartItem(QGraphicsRectItem):
         self._setVirtualHelixItemList(newList, zoomToFit=False)
     # end def
 
+    def strandSelectionInRect(self, rect, filterDict):
+        """
+        Returns {strand: (lowSelected, highSelected)} for the strands, ends
+        and crossovers inside rect, in part coordinates, that pass the
+        selection filters in filterDict. Only the model is queried, so
+        strands without a StrandItem are found as well.
+        """
+        return bandselection.strandSelectionInRect(self._helixOrigins(),
+                    (rect.left(), rect.top(), rect.right(), rect.bottom()),
+                    filterDict, self._part.maxBaseIdx(), _bw)
+    # end def
+
+    def selectedEndsRect(self):
+        """
+        Returns the rect, in part coordinates, around the strand ends of
+        this part selected in the document, or an empty QRectF. Strands
+        without a StrandItem, e.g. when zoomed out, are included.
+        """
+        rect = bandselection.selectedEndsRect(self._helixOrigins(),
+                                              self.document().selectionDict(),
+                                              _bw)
+        if rect == None:
+            return QRectF()
+        left, top, right, bottom = rect
+        return QRectF(left, top, right - left, bottom - top)
+    # end def
+
     def setActiveVirtualHelixItem(self, newActiveVHI):
         if newActiveVHI != self._activeVirtualHelixItem:
             self._activeVirtualHelixItem = newActiveVHI
@@ -432,40 +513,46 @@ class PartItem(QGraphicsRectItem):
 
     def setPreXoverItemsVisible(self, virtualHelixItem):
         """
-        self._preXoverItems list references prexovers parented to other
-        PathHelices such that only the activeHelix maintains the list of
-        visible prexovers
+        Shows the prexovers between virtualHelixItem and its neighbors, or
+        none if it is None. self._preXoverItems maps (fromVirtualHelixItem,
+        toVirtualHelixItem, index, strandType, isLowIdx) to the displayed
+        PreXoverItem, which is parented to fromVirtualHelixItem such that
+        only the activeHelix maintains the list of visible prexovers.
+
+        Only the difference from the displayed set is applied: items that
+        are no longer needed are hidden and kept for reuse, and items that
+        stay have their style refreshed, since the strands may have changed.
         """
         vhi = virtualHelixItem
-
-        if vhi == None:
-            if self._preXoverItems:
-                # clear all PreXoverItems
-                map(PreXoverItem.remove, self._preXoverItems)
-                self._preXoverItems = []
-            return
-
-        vh = vhi.virtualHelix()
-        partItem = self
-        part = self.part()
-        idx = part.activeVirtualHelixIdx()
-
-        # clear all PreXoverItems
-        map(PreXoverItem.remove, self._preXoverItems)
-        self._preXoverItems = []
-
-        potentialXovers = part.potentialCrossoverList(vh, idx)
-        for neighbor, index, strandType, isLowIdx in potentialXovers:
-            # create one half
-            neighborVHI = self.itemForVirtualHelix(neighbor)
-            pxi = PreXoverItem(vhi, neighborVHI, index, strandType, isLowIdx)
-            # add to list
-            self._preXoverItems.append(pxi)
-            # create the complement
-            pxi = PreXoverItem(neighborVHI, vhi, index, strandType, isLowIdx)
-            # add to list
-            self._preXoverItems.append(pxi)
-        # end for
+        wanted = set()
+        if vhi != None:
+            part = self.part()
+            vh = vhi.virtualHelix()
+            idx = part.activeVirtualHelixIdx()
+            potentialXovers = part.potentialCrossoverList(vh, idx)
+            for neighbor, index, strandType, isLowIdx in potentialXovers:
+                neighborVHI = self.itemForVirtualHelix(neighbor)
+                # one half, and the complement
+                wanted.add((vhi, neighborVHI, index, strandType, isLowIdx))
+                wanted.add((neighborVHI, vhi, index, strandType, isLowIdx))
+            # end for
+
+        items = self._preXoverItems
+        for key in items.keys():
+            if key not in wanted:
+                pxi = items.pop(key)
+                if pxi.scene() != None and \
+                        len(self._freePreXoverItems) < _maxFreePreXoverItems:
+                    pxi.hide()
+                    self._freePreXoverItems.append(pxi)
+                else:  # its helix was removed, or enough are kept
+                    pxi.remove()
+        for key in wanted:
+            pxi = items.get(key)
+            if pxi != None:
+                pxi.updateStyle()
+            else:
+                items[key] = self._acquirePreXoverItem(*key)
     # end def
 
     def updatePreXoverItems(self):
@@ -28,6 +28,7 @@ from partitem import PartItem
 from pathselection import SelectionItemGroup
 from pathselection import VirtualHelixHandleSelectionBox
 from pathselection import EndpointHandleSelectionBox
+from views.updatescheduler import UpdateScheduler
 import util
 util.qtWrapImport('QtCore', globals(), ['pyqtSignal', 'QObject'])
 util.qtWrapImport('QtGui', globals(), ['QGraphicsRectItem'])
@@ -53,6 +54,7 @@ class PathRootItem(QGraphicsRectItem):
         self._modelPart = None
         self._partItemForPart = {}  # Maps Part -> PartItem
         self._selectionFilterDict = {}
+        self._updateScheduler = UpdateScheduler()
         self._initSelections()
     # end def
 
@@ -62,6 +64,9 @@ class PathRootItem(QGraphicsRectItem):
     def partItems(self):
         return self._partItemForPart.values()
 
+    def updateScheduler(self):
+        return self._updateScheduler
+
     def partItemForPart(self, part):
         return self._partItemForPart[part]
     
@@ -198,6 +203,37 @@ class PathRootItem(QGraphicsRectItem):
         self.scene().views()[0].setSelectionLock(locker)
     # end def
 
+    def rubberBandSelect(self, sceneRect, extend=False):
+        """
+        Called by the view when a rubber band is released. Strands, their
+        ends and xovers are looked up in the model by each PartItem rather
+        than by intersecting the band with every item in the scene. The
+        previous strand selection is replaced unless extend is True.
+        """
+        filterDict = self._selectionFilterDict
+        if not extend:
+            self._strandItemSelectionGroup.clearSelection(False)
+        for partItem in self._partItemForPart.itervalues():
+            rect = partItem.mapRectFromScene(sceneRect)
+            if "virtualHelix" in filterDict:
+                # handles are few and always instantiated
+                for vhi in partItem.virtualHelixItems():
+                    handle = vhi.handle()
+                    if handle.sceneBoundingRect().intersects(sceneRect):
+                        handle.setSelected(True)
+            strandValues = partItem.strandSelectionInRect(rect, filterDict)
+            if extend:  # keep the ends that are already selected
+                doc = self._document
+                for strand, (low, high) in strandValues.items():
+                    if doc.isModelStrandSelected(strand):
+                        oldLow, oldHigh = doc.getSelectedStrandValue(strand)
+                        strandValues[strand] = (low or oldLow, high or oldHigh)
+            if strandValues:
+                pool = partItem.strandItemPool()
+                self._strandItemSelectionGroup.selectStrands(strandValues,
+                                                             pool.strandItem)
+    # end def
+
     def clearStrandSelections(self):
         self._strandItemSelectionGroup.clearSelection(False)
     # end def
@@ -44,12 +44,15 @@ util.qtWrapImport('QtGui', globals(), ['QPen', 'QBrush', 'QColor', 'qApp',\
 class SelectionItemGroup(QGraphicsItemGroup):
     """
     SelectionItemGroup
+
+    Tracks the selected items without reparenting them, so selecting
+    thousands of items costs no transform or scene index updates. Members
+    forward their mouse events to the group, and a drag only moves the
+    selectionbox until it is committed on release.
     """
     def __init__(self, boxtype, constraint='y', parent=None):
         super(SelectionItemGroup, self).__init__(parent)
         self._viewroot = parent
-        self.setFiltersChildEvents(True)
-        self.setHandlesChildEvents(True)
         self.setFlag(QGraphicsItem.ItemIsSelectable)
         self.setFlag(QGraphicsItem.ItemIsFocusable)  # for keyPressEvents
         self.setFlag(QGraphicsItem.ItemHasNoContents)
@@ -73,6 +76,9 @@ class SelectionItemGroup(QGraphicsItemGroup):
         self._addedToPressList = False
 
         self._pendingToAddDict = {}
+        self._members = set()  # selected items, left in their parents
+        # strands selected in bulk by selectStrands
+        self._modelStrands = set()
 
         if constraint == 'y':
             self.getR = self.selectionbox.getY
@@ -108,6 +114,39 @@ class SelectionItemGroup(QGraphicsItemGroup):
             del self._pendingToAddDict[item]
     # end def
 
+    def addToGroup(self, item):
+        """
+        Adds item to the selection. Unlike QGraphicsItemGroup.addToGroup
+        the item keeps its parent and position.
+        """
+        self._members.add(item)
+        if self._addedToPressList == False:
+            self.setFocus()  # this is to get delete keyPressEvents
+            self.setParentItem(self.selectionbox.boxParent())
+            self._addedToPressList = True
+            self.scene().views()[0].addToPressList(self)
+    # end def
+
+    def removeFromGroup(self, item):
+        self._members.discard(item)
+    # end def
+
+    def isMember(self, item):
+        return item in self._members
+    # end def
+
+    def members(self):
+        return list(self._members)
+    # end def
+
+    def membersBoundingRect(self):
+        """The union of the members' bounding rects, in group coordinates."""
+        rect = QRectF()
+        for item in self._members:
+            rect = rect.united(self.mapRectFromScene(item.sceneBoundingRect()))
+        return rect
+    # end def
+
     def setNormalSelect(self, boolVal):
         self._normalSelect = boolVal
     # end def
@@ -133,6 +172,36 @@ class SelectionItemGroup(QGraphicsItemGroup):
             doc.updateSelection()
     # end def
 
+    def selectStrands(self, strandValues, strandItemForStrand):
+        """
+        Adds strandValues, a dict of strand: (lowSelected, highSelected),
+        to the document selection at once and restyles only the
+        StrandItems that strandItemForStrand(strand) returns. Strands with
+        no item yet are styled when the StrandItemPool binds one to them.
+        """
+        doc = self.document()
+        doc.addStrandsToSelection(strandValues)
+        self._modelStrands.update(strandValues)
+        self.setSelectionLock(self)
+        self.setSelected(True)  # so that clicking away clears it all
+        self.setFocus()  # this is to get delete keyPressEvents
+        for strand in strandValues:
+            strandItem = strandItemForStrand(strand)
+            if strandItem != None:
+                strandItem.selectIfRequired(doc,
+                                            doc.getSelectedStrandValue(strand))
+        if not self._addedToPressList:
+            self._addedToPressList = True
+            self.scene().views()[0].addToPressList(self)
+        self.selectionbox.refreshPath()
+    # end def
+
+    def refreshSelectionBox(self):
+        """Resizes the selectionbox to the selection unless it is dragged."""
+        if not self._dragEnable:
+            self.selectionbox.refreshPath()
+    # end def
+
     def resetSelection(self):
         self._pendingToAddDict = {}
         self._addedToPressList = False
@@ -260,14 +329,6 @@ class SelectionItemGroup(QGraphicsItemGroup):
                 return False
             else:
                 return True
-        elif change == QGraphicsItem.ItemChildAddedChange:
-            if self._addedToPressList == False:
-                # print "kid added"
-                self.setFocus()  # this is to get delete keyPressEvents
-                self.setParentItem(self.selectionbox.boxParent())
-                self._addedToPressList = True
-                self.scene().views()[0].addToPressList(self)
-            return
         return QGraphicsItemGroup.itemChange(self, change, value)
     # end def
 
@@ -277,7 +338,6 @@ class SelectionItemGroup(QGraphicsItemGroup):
         restore it's original parent
         """
         doc = self.document()
-        tPos = child.scenePos()
         self.removeFromGroup(child)
         child.modelDeselect(doc)
     # end def
@@ -285,10 +345,13 @@ class SelectionItemGroup(QGraphicsItemGroup):
     def removeSelectedItems(self):
         """docstring for removeSelectedItems"""
         doc = self.document()
-        for item in self.childItems():
-            self.removeFromGroup(item)
+        members, self._members = self._members, set()
+        for item in members:
             item.modelDeselect(doc)
         # end for
+        if self._modelStrands:
+            doc.removeStrandsFromSelection(self._modelStrands)
+            self._modelStrands = set()
         doc.updateSelection()
     # end def
 
@@ -344,8 +407,7 @@ class VirtualHelixHandleSelectionBox(QGraphicsPathItem):
 
     def painterPath(self):
         iG = self._itemGroup
-        # the childrenBoundingRect is necessary to get this to work
-        rect = self.mapRectFromItem(iG, iG.childrenBoundingRect())
+        rect = self.mapRectFromItem(iG, iG.membersBoundingRect())
         radius = self._radius
 
         path = QPainterPath()
@@ -371,7 +433,7 @@ class VirtualHelixHandleSelectionBox(QGraphicsPathItem):
         else:  # moved up, delta is negative
             indexDelta = int((delta + midHeight) / helixHeight)
         # sort on y to determine the extremes of the selection group
-        items = sorted(self._itemGroup.childItems(), key=lambda vhhi: vhhi.y())
+        items = sorted(self._itemGroup.members(), key=lambda vhhi: vhhi.y())
         partItem = items[0].partItem()
         partItem.reorderHelices(items[0].number(),\
                                 items[-1].number(),\
@@ -380,7 +442,7 @@ class VirtualHelixHandleSelectionBox(QGraphicsPathItem):
     # end def
 
     def boxParent(self):
-        temp = self._itemGroup.childItems()[0].partItem()
+        temp = self._itemGroup.members()[0].partItem()
         self.setParentItem(temp)
         return temp
     # end def
@@ -390,7 +452,7 @@ class VirtualHelixHandleSelectionBox(QGraphicsPathItem):
         Delete selection operates outside of the documents a virtual helices
         are not actually selected in the model
         """
-        vHelices = [vhh.virtualHelix() for vhh in self._itemGroup.childItems()]
+        vHelices = [vhh.virtualHelix() for vhh in self._itemGroup.members()]
         uS = self._itemGroup.document().undoStack()
         uS.beginMacro("delete Virtual Helices")
         for vh in vHelices:
@@ -437,9 +499,9 @@ class EndpointHandleSelectionBox(QGraphicsPathItem):
     # end def
 
     def translateX(self, delta):
-        children = self._itemGroup.childItems()
-        if children:
-            pI = children[0].partItem()
+        members = self._itemGroup.members()
+        if members:
+            pI = members[0].partItem()
             str = "+%d" % delta if delta >= 0 else "%d" % delta
             pI.updateStatusBar(str)
         self.setX(self._baseWidth * delta)
@@ -469,8 +531,13 @@ class EndpointHandleSelectionBox(QGraphicsPathItem):
     def painterPath(self):
         bw = self._baseWidth
         iG = self._itemGroup
-        # the childrenBoundingRect is necessary to get this to work
-        rectIG = iG.childrenBoundingRect()
+        rectIG = iG.membersBoundingRect()
+        # selected strands without a StrandItem, e.g. when zoomed out, have
+        # no members, so the box is sized from the model selection as well
+        for partItem in iG._viewroot.partItems():
+            partRect = partItem.selectedEndsRect()
+            if not partRect.isNull():
+                rectIG = rectIG.united(iG.mapRectFromItem(partItem, partRect))
         rect = self.mapRectFromItem(iG, rectIG)
         if rect.width() < bw:
             rect.adjust(-bw / 4, 0, bw / 2, 0)
@@ -496,7 +563,7 @@ class EndpointHandleSelectionBox(QGraphicsPathItem):
         self._itemGroup.document().deleteSelection()
 
     def boxParent(self):
-        temp = self._itemGroup.childItems()[0].partItem()
+        temp = self._itemGroup.members()[0].partItem()
         self.setParentItem(temp)
         return temp
     # end def
@@ -27,6 +27,7 @@
 
 import util
 from views import styles
+import views.pathview.graphicscache as graphicscache
 
 from model.enum import StrandType
 
@@ -34,7 +35,7 @@ from model.enum import StrandType
 util.qtWrapImport('QtCore', globals(), ['QPointF', 'QRectF', 'Qt'])
 util.qtWrapImport('QtGui', globals(), [ 'QBrush', 'QFont', 'QGraphicsPathItem', \
                                         'QGraphicsSimpleTextItem', \
-                                        'QFontMetrics', 'QPainterPath', \
+                                        'QPainterPath', \
                                         'QPolygonF', 'QGraphicsRectItem',\
                                         'QPen', 'QUndoCommand'])
 
@@ -59,6 +60,9 @@ _ppathRD = QPainterPath()
 _hashMarkGen(_ppathRD, _ppRect.topRight(), _pathUCenter, _pathCenter)
 _ppathLD = QPainterPath()
 _hashMarkGen(_ppathLD, _ppRect.topLeft(), _pathUCenter, _pathCenter)
+# (isLowIdx, isOnTop) -> shared path; the strand type only changes the pen
+_pathLUT = {(False, False): _ppathRD, (False, True): _ppathRU,
+            (True, False): _ppathLD, (True, True): _ppathLU}
 
 _scafpen = QPen(styles.pxi_scaf_stroke, styles.PATH_STRAND_STROKE_WIDTH)
 _scafpen.setCapStyle(Qt.FlatCap)  # or Qt.RoundCap
@@ -74,20 +78,38 @@ _enabbrush = QBrush(Qt.SolidPattern)  # Also for the helix number label
 _baseWidth = styles.PATH_BASE_WIDTH
 _rect = QRectF(0, 0, styles.PATH_BASE_WIDTH, 1.2*styles.PATH_BASE_WIDTH)
 _toHelixNumFont = styles.XOVER_LABEL_FONT
-# precalculate the height of a number font.  Assumes a fixed font
-# and that only numbers will be used for labels
-_fm = QFontMetrics(_toHelixNumFont)
 
 class PreXoverItem(QGraphicsPathItem):
     def __init__(self,  fromVirtualHelixItem, toVirtualHelixItem, index, strandType, isLowIdx):
         super(PreXoverItem, self).__init__(fromVirtualHelixItem)
+        self._sharedPath = None
+        self._label = QGraphicsSimpleTextItem(self)
+        self._label.setFont(_toHelixNumFont)
+
+        # create a bounding rect item to process click events
+        # over a wide area
+        self._clickArea = cA = QGraphicsRectItem(_rect, self)
+        cA.mousePressEvent = self.mousePress
+        cA.setPen(QPen(Qt.NoPen))
+
+        self.setPreXover(fromVirtualHelixItem, toVirtualHelixItem, index,
+                         strandType, isLowIdx)
+    # end def
+
+    def setPreXover(self, fromVirtualHelixItem, toVirtualHelixItem, index, strandType, isLowIdx):
+        """
+        Places the item at index on fromVirtualHelixItem, labeled with the
+        number of toVirtualHelixItem. Called on construction, and by the
+        PartItem to reuse a hidden item instead of creating a new one.
+        """
+        if self.parentItem() != fromVirtualHelixItem:
+            self.setParentItem(fromVirtualHelixItem)
         self._fromVHItem = fromVirtualHelixItem
         self._toVHItem = toVirtualHelixItem
         self._idx = index
         self._strandType = strandType
         # translate from Low to Left for the Path View
         self._isLowIndex = isLowIdx
-        self._isActive = False
         self._pen = _scafpen if strandType == StrandType.Scaffold else _stappen
         isOnTop = fromVirtualHelixItem.isStrandTypeOnTop(strandType)
 
@@ -97,7 +119,7 @@ class PreXoverItem(QGraphicsPathItem):
         self.setPos(x, y)
 
         num = toVirtualHelixItem.number()
-        tBR = _fm.tightBoundingRect(str(num))
+        tBR = graphicscache.labelRect(str(num))
         halfLabelH = tBR.height()/2.0
         halfLabelW = tBR.width()/2.0
 
@@ -109,21 +131,14 @@ class PreXoverItem(QGraphicsPathItem):
             labelY = -0.25*halfLabelH - .5
         else:
             labelY = 2*halfLabelH + .5
-
-        self._label = QGraphicsSimpleTextItem(self)
         self._label.setPos(labelX, labelY)
 
-        # create a bounding rect item to process click events
-        # over a wide area
-        self._clickArea = cA = QGraphicsRectItem(_rect, self)
-        cA.mousePressEvent = self.mousePress
         yoffset = 0.2*bw if isOnTop else -0.4*bw
-        cA.setPos(0, yoffset)
-        cA.setPen(QPen(Qt.NoPen))
+        self._clickArea.setPos(0, yoffset)
 
         self.updateStyle()
-        self._updateLabel()
         self.setPainterPath()
+        self.show()
     # end def
 
     ### DRAWING METHODS ###
@@ -144,11 +159,12 @@ class PreXoverItem(QGraphicsPathItem):
         Sets the PainterPath according to the index (low = Left, high = Right)
         and strand position (top = Up, bottom = Down).
         """
-        pathLUT = (_ppathRD, _ppathRU, _ppathLD, _ppathLU)  # Lookup table
         vhi = self._fromVHItem
         st = self._strandType
-        path = pathLUT[2*int(self._isLowIndex) + int(vhi.isStrandTypeOnTop(st))]
-        self.setPath(path)
+        path = _pathLUT[(bool(self._isLowIndex), bool(vhi.isStrandTypeOnTop(st)))]
+        if path is not self._sharedPath:
+            self._sharedPath = path
+            self.setPath(path)
     # end def
 
     def updateStyle(self):
@@ -160,18 +176,19 @@ class PreXoverItem(QGraphicsPathItem):
         toVH = self._toVHItem.virtualHelix()
         part = self._fromVHItem.part()
         pen = _disabpen
+        self._isActive = False
         self._labelBrush = _disabbrush
         if part.possibleXoverAt(fromVH, toVH, self._strandType, self._idx):
             pen = self._pen
             self._isActive = True
             self._labelBrush = _enabbrush
         self.setPen(pen)
+        self._updateLabel()
     # end def
 
     def _updateLabel(self):
         lbl = self._label
         lbl.setBrush(self._labelBrush)
-        lbl.setFont(_toHelixNumFont)
         lbl.setText( str(self._toVHItem.number() ) )
     # end def
 
@@ -30,6 +30,7 @@ import util
 
 from views import styles
 from model.enum import StrandType
+import views.pathview.graphicscache as graphicscache
 
 import util
 # import Qt stuff into the module namespace with PySide, PyQt4 independence
@@ -49,6 +50,7 @@ _defaultRect = QRectF(0, 0, _bw, _bw)
 _bpen = QPen(styles.bluestroke, styles.INSERTWIDTH)
 _rpen = QPen(styles.redstroke, styles.SKIPWIDTH)
 _noPen = QPen(Qt.NoPen)
+_seqBrush = QBrush(Qt.black)
 
 def _insertGen(path, start, c1, p1, c2):
     path.moveTo(start)
@@ -258,7 +260,8 @@ class InsertionItem(QGraphicsPathItem):
             self.show()
         isOnTop = self._isOnTop
         if self._insertion.length() > 0:
-            self.setPen(QPen(QColor(strand.oligo().color()), styles.INSERTWIDTH))
+            self.setPen(graphicscache.pen(QColor(strand.oligo().color()),
+                                          styles.INSERTWIDTH))
             self.setBrush(QBrush(Qt.NoBrush))
             self.setPath(_insertPath.getInsert(isOnTop))
         else:  # insertionSize < 0 (a skip)
@@ -295,35 +298,41 @@ class InsertionItem(QGraphicsPathItem):
             if lenBT > 20:
                 baseText = baseText[:17] + '...'
                 lenBT = len(baseText)
-            fractionArclenPerChar = (1.0-2.0*_fractionInsertToPad)/(lenBT+1)
-            seqItem.setPen(QPen(Qt.NoPen))
-            seqItem.setBrush(QBrush(Qt.black))
-            
-            seqPath = QPainterPath()
+            seqItem.setPen(_noPen)
+            seqItem.setBrush(_seqBrush)
             loopPath = self.path()
-            for i in range(lenBT):
-                frac = _fractionInsertToPad + (i+1)*fractionArclenPerChar
-                pt = loopPath.pointAtPercent(frac)
-                tangAng = loopPath.angleAtPercent(frac)
-
-                tempPath = QPainterPath()
-                # 1. draw the text
-                tempPath.addText(0,0, font, baseText[i if isOnTop else -i-1])
-                # 2. center it at the zero point different for top and bottom
-                # strands
-                if not isOnTop:
-                    tempPath.translate(0, -seqFontH - insertW)
-                    
-                tempPath.translate(QPointF(-seqFontCharW/2.,
-                                          -2 if isOnTop else seqFontH))
-                mat = QMatrix()
-                # 3. rotate it
-                mat.rotate(-tangAng + angleOffset)
-                rotatedPath = mat.map(tempPath)
-                # 4. translate the rotate object to it's position on the part
-                rotatedPath.translate(pt)
-                seqPath.addPath(rotatedPath)
-            # end for
+
+            def buildSeqPath():
+                fractionArclenPerChar = (1.0-2.0*_fractionInsertToPad)/(lenBT+1)
+                seqPath = QPainterPath()
+                for i in range(lenBT):
+                    frac = _fractionInsertToPad + (i+1)*fractionArclenPerChar
+                    pt = loopPath.pointAtPercent(frac)
+                    tangAng = loopPath.angleAtPercent(frac)
+
+                    tempPath = QPainterPath()
+                    # 1. draw the text
+                    tempPath.addText(0,0, font, baseText[i if isOnTop else -i-1])
+                    # 2. center it at the zero point different for top and bottom
+                    # strands
+                    if not isOnTop:
+                        tempPath.translate(0, -seqFontH - insertW)
+
+                    tempPath.translate(QPointF(-seqFontCharW/2.,
+                                              -2 if isOnTop else seqFontH))
+                    mat = QMatrix()
+                    # 3. rotate it
+                    mat.rotate(-tangAng + angleOffset)
+                    rotatedPath = mat.map(tempPath)
+                    # 4. translate the rotate object to it's position on the part
+                    rotatedPath.translate(pt)
+                    seqPath.addPath(rotatedPath)
+                # end for
+                return seqPath
+            # end def
+            # the loop's shape only depends on isOnTop and insert vs skip
+            key = ('insertion', baseText, isOnTop, self._insertion.length() > 0)
+            seqPath = graphicscache.textPath(key, buildSeqPath)
             seqItem.setPath(seqPath)
         # end if
     # end def
@@ -149,28 +149,15 @@ class EndpointItem(QGraphicsPathItem):
     ### PUBLIC METHODS FOR DRAWING / LAYOUT ###
     def updatePosIfNecessary(self, idx):
         """Update position if necessary and return True if updated."""
-        group = self.group()
-        self.tempReparent()
         x = int(idx * _baseWidth)
         if x != self.x():
             self.setPos(x, self.y())
-            if group:
-                group.addToGroup(self)
             return True
         else:
-            if group:
-                group.addToGroup(self)
             return False
     
     def safeSetPos(self, x, y):
-        """
-        Required to ensure proper reparenting if selected
-        """
-        group = self.group()
-        self.tempReparent()
         self.setPos(x,y)
-        if group:
-            group.addToGroup(self)
     # end def
 
     def resetEndPoint(self, isDrawn5to3):
@@ -208,6 +195,9 @@ class EndpointItem(QGraphicsPathItem):
         Parses a mousePressEvent, calling the approproate tool method as
         necessary. Stores _moveIdx for future comparison.
         """
+        selectionGroup = self._strandItem.viewroot().strandItemSelectionGroup()
+        if selectionGroup.isMember(self):
+            return selectionGroup.mousePressEvent(event)
         self.scene().views()[0].addToPressList(self)
         self._strandItem.virtualHelixItem().setActive(self.idx())
         self._moveIdx = self.idx()
@@ -240,6 +230,9 @@ class EndpointItem(QGraphicsPathItem):
         Parses a mouseMoveEvent, calling the approproate tool method as
         necessary. Updates _moveIdx if it changed.
         """
+        selectionGroup = self._strandItem.viewroot().strandItemSelectionGroup()
+        if selectionGroup.isMember(self):
+            return selectionGroup.mouseMoveEvent(event)
         toolMethodName = str(self._activeTool()) + "MouseMove"
         if hasattr(self, toolMethodName):  # if the tool method exists
             idx = int(floor((self.x() + event.pos().x()) / _baseWidth))
@@ -415,7 +408,7 @@ class EndpointItem(QGraphicsPathItem):
             mStrand.resize(newIdxs)
         elif modifiers & Qt.ShiftModifier:
             self.setSelected(False)
-            self.restoreParent()
+            self.clearSelectedState()
             mStrand.merge(self.idx())
     # end def
 
@@ -425,26 +418,16 @@ class EndpointItem(QGraphicsPathItem):
         mStrand.addInsertion(idx, -1)
     # end def
 
-    def restoreParent(self, pos=None):
+    def clearSelectedState(self):
         """
-        Required to restore parenting and positioning in the partItem
+        Takes the item out of the selection group and draws it unselected.
         """
-        # map the position
-        # print "restoring parent ep"
-        self.tempReparent(pos)
+        selectionGroup = self._strandItem.viewroot().strandItemSelectionGroup()
+        selectionGroup.removeFromGroup(self)
         self.setSelectedColor(False)
         self.setSelected(False)
     # end def
 
-    def tempReparent(self, pos=None):
-        vhItem = self._strandItem.virtualHelixItem()
-        if pos == None:
-            pos = self.scenePos()
-        self.setParentItem(vhItem)
-        tempP = vhItem.mapFromScene(pos)
-        self.setPos(tempP)
-    # end def
-
     def setSelectedColor(self, value):
         if value == True:
             color = styles.selected_color
@@ -479,7 +462,7 @@ class EndpointItem(QGraphicsPathItem):
                     # if self.group() != selectionGroup \
                     #                   and sI.strandFilter() in currentFilterDict:
                     if sI.strandFilter() in currentFilterDict:
-                        if self.group() != selectionGroup or not self.isSelected():
+                        if not selectionGroup.isMember(self) or not self.isSelected():
                             selectionGroup.pendToAdd(self)
                             selectionGroup.setSelectionLock(selectionGroup)
                             self.setSelectedColor(True)
@@ -495,7 +478,6 @@ class EndpointItem(QGraphicsPathItem):
                     # Check if strand is being added to the selection group still
                     if not selectionGroup.isPending(self._strandItem):
                         selectionGroup.pendToRemove(self)
-                        self.tempReparent()
                         self.setSelectedColor(False)
                         return False
                     else:   # don't deselect, because the strand is still selected
@@ -529,7 +511,7 @@ class EndpointItem(QGraphicsPathItem):
             document.removeStrandFromSelection(strand)
         elif outValue[0] or outValue[1]:
             document.addStrandToSelection(strand, outValue)
-        self.restoreParent()
+        self.clearSelectedState()
     # end def
 
     def modelSelect(self, document):
@@ -34,6 +34,7 @@ from xoveritem import XoverItem
 from decorators.insertionitem import InsertionItem
 
 import views.pathview.pathselection as pathselection
+import views.pathview.graphicscache as graphicscache
 
 import util
 # import Qt stuff into the module namespace with PySide, PyQt4 independence
@@ -47,6 +48,7 @@ util.qtWrapImport('QtGui', globals(), ['QBrush', 'QColor', 'QFont', \
 _baseWidth = styles.PATH_BASE_WIDTH
 _defaultRect = QRectF(0,0, _baseWidth, _baseWidth)
 _noPen = QPen(Qt.NoPen)
+_seqBrush = QBrush(Qt.black)
 
 
 class StrandItem(QGraphicsLineItem):
@@ -75,7 +77,10 @@ class StrandItem(QGraphicsLineItem):
         self._isDrawn5to3 = isDrawn5to3
         # self._isOnTop = virtualHelixItem.isStrandOnTop(modelStrand)
         # label
-        self._seqLabel = QGraphicsSimpleTextItem(self)
+        self._seqLabel = seqLbl = QGraphicsSimpleTextItem(self)
+        # leave the Pen as None for unless required
+        seqLbl.setBrush(_seqBrush)
+        seqLbl.setFont(styles.SEQUENCEFONT)
         
         self.refreshInsertionItems(modelStrand)
         self._updateSequenceText()
@@ -83,6 +88,7 @@ class StrandItem(QGraphicsLineItem):
         # create a larger click area rect to capture mouse events
         self._clickArea = cA = QGraphicsRectItem(_defaultRect, self)
         cA.mousePressEvent = self.mousePressEvent
+        cA.mouseMoveEvent = self.mouseMoveEvent
         cA.setPen(_noPen)
         self.setAcceptHoverEvents(True)
         cA.setAcceptHoverEvents(True)
@@ -105,20 +111,7 @@ class StrandItem(QGraphicsLineItem):
     ### SLOTS ###
     def strandResizedSlot(self, strand, indices):
         """docstring for strandResizedSlot"""
-        lowMoved = self._lowCap.updatePosIfNecessary(self.idxs()[0])
-        highMoved = self._highCap.updatePosIfNecessary(self.idxs()[1])
-        group = self.group()
-        self.tempReparent()  
-        if lowMoved:
-            self.updateLine(self._lowCap)
-        if highMoved:
-            self.updateLine(self._highCap)
-        if strand.connection3p():
-            self._xover3pEnd.update(strand)
-        self.refreshInsertionItems(strand)
-        self._updateSequenceText()
-        if group:
-            group.addToGroup(self)
+        self._viewroot.updateScheduler().schedule(self, 'resize')
     # end def
 
     def sequenceAddedSlot(self, oligo):
@@ -133,9 +126,18 @@ class StrandItem(QGraphicsLineItem):
 
     def strandRemovedSlot(self, strand):
         # self._modelStrand = None
+        self.partItem().strandItemPool().strandItemRemoved(strand)
         self._controller.disconnectSignals()
         self._controller = None
+        self.remove()
+    # end def
+
+    def remove(self):
+        """Removes the item and its children from the scene."""
         scene = self.scene()
+        selectionGroup = self._viewroot.strandItemSelectionGroup()
+        for item in (self, self._lowCap, self._highCap):
+            selectionGroup.removeFromGroup(item)
         scene.removeItem(self._clickArea)
         scene.removeItem(self._highCap)
         scene.removeItem(self._lowCap)
@@ -158,32 +160,26 @@ class StrandItem(QGraphicsLineItem):
         """
         Slot for just updating connectivity and color, and endpoint showing
         """
-        self._updateAppearance(strand)
+        self._viewroot.updateScheduler().schedule(self, 'appearance')
+        # a new xover may lead here from a strand that has no item yet
+        self.partItem().strandItemPool().scheduleRefresh()
     # end def
 
     def oligoAppearanceChangedSlot(self, oligo):
-        strand = self._modelStrand
-        self._updateColor(strand)
-        if strand.connection3p():
-            self._xover3pEnd._updateColor(strand)
-        for insertion in self.insertionItems().itervalues():
-            insertion.updateItem()
+        self._viewroot.updateScheduler().schedule(self, 'color')
     # end def
 
     def oligoSequenceAddedSlot(self, oligo):
-        self._updateSequenceText()
+        self._viewroot.updateScheduler().schedule(self, 'sequence')
     # end def
 
     def oligoSequenceClearedSlot(self, oligo):
-        self._updateSequenceText()
+        self._viewroot.updateScheduler().schedule(self, 'sequence')
     # end def
 
     def strandHasNewOligoSlot(self, strand):
-        strand = self._modelStrand
         self._controller.reconnectOligoSignals()
-        self._updateColor(strand)
-        if strand.connection3p():
-            self._xover3pEnd._updateColor(strand)
+        self._viewroot.updateScheduler().schedule(self, 'color')
     # end def
 
     def strandInsertionAddedSlot(self, strand, insertion):
@@ -260,6 +256,40 @@ class StrandItem(QGraphicsLineItem):
         return self._virtualHelixItem.window()
 
     ### PUBLIC METHODS FOR DRAWING / LAYOUT ###
+    def applyScheduledUpdates(self, reasons):
+        """
+        Called once per event loop turn by the view root's UpdateScheduler
+        with the reasons recorded by the slots above.
+        """
+        strand = self._modelStrand
+        if strand == None:  # removed, or released to the StrandItemPool
+            return
+        if 'resize' in reasons:
+            self._updatePosition(strand)
+        if 'appearance' in reasons:
+            self._updateAppearance(strand)
+        if 'color' in reasons:
+            self._updateColor(strand)
+            if strand.connection3p():
+                self._xover3pEnd._updateColor(strand)
+            for insertion in self.insertionItems().itervalues():
+                insertion.updateItem()
+        if 'sequence' in reasons or 'resize' in reasons:
+            self._updateSequenceText()
+    # end def
+
+    def _updatePosition(self, strand):
+        """Moves the caps, line, xover and insertions to the strand's idxs."""
+        lowIdx, highIdx = strand.idxs()
+        if self._lowCap.updatePosIfNecessary(lowIdx):
+            self.updateLine(self._lowCap)
+        if self._highCap.updatePosIfNecessary(highIdx):
+            self.updateLine(self._highCap)
+        if strand.connection3p():
+            self._xover3pEnd.update(strand)
+        self.refreshInsertionItems(strand)
+    # end def
+
     def refreshInsertionItems(self, strand):
         iItems = self.insertionItems()
         iModel = strand.insertionsOnStrand()
@@ -285,6 +315,55 @@ class StrandItem(QGraphicsLineItem):
         # end for
     # end def
 
+    def rebind(self, modelStrand, virtualHelixItem):
+        """
+        Makes a StrandItem that StrandItemPool released draw modelStrand on
+        virtualHelixItem, reusing its caps, label and xover.
+        """
+        self._modelStrand = modelStrand
+        self._strandFilter = modelStrand.strandFilter()
+        self._xover3pEnd.setVirtualHelixItem(virtualHelixItem)
+        self.resetStrandItem(virtualHelixItem,
+                             modelStrand.strandSet().isDrawn5to3())
+        self._controller = StrandItemController(self, modelStrand)
+        self.refreshInsertionItems(modelStrand)
+        self._updateSequenceText()
+        self._updateColor(modelStrand)
+        self._updateAppearance(modelStrand)
+        self.show()
+    # end def
+
+    def release(self):
+        """
+        Disconnects from the model and hides the item until StrandItemPool
+        rebinds it. Released items are parented to the part's proxy so that
+        removing their old VirtualHelixItem does not take them along.
+        """
+        self._controller.disconnectSignals()
+        self._controller = None
+        self.hide()
+        self.setParentItem(self.partItem().proxy())
+        for cap in (self._lowCap, self._highCap, self._dualCap):
+            cap.hide()
+            cap.setParentItem(self)
+        for insertionItem in self._insertionItems.itervalues():
+            insertionItem.remove()
+        self._insertionItems = {}
+        self._xover3pEnd.release()
+        self._seqLabel.hide()
+        self._seqLabel.setRotation(0)
+        self._modelStrand = None
+    # end def
+
+    def isPinned(self):
+        """True if the item or one of its parts is selected."""
+        selectionGroup = self._viewroot.strandItemSelectionGroup()
+        for item in (self, self._lowCap, self._highCap, self._xover3pEnd):
+            if item.isSelected() or selectionGroup.isMember(item):
+                return True
+        return False
+    # end def
+
     def resetStrandItem(self, virtualHelixItem, isDrawn5to3):
         self.setParentItem(virtualHelixItem)
         self._virtualHelixItem = virtualHelixItem
@@ -347,8 +426,8 @@ class StrandItem(QGraphicsLineItem):
         lx = lUpperLeftX + bw  # draw from right edge of base
         lowCap.safeSetPos(lUpperLeftX, lUpperLeftY)
         if strand.connectionLow() != None:  # has low xover
-            # if we are hiding it, we might as well make sure it is reparented to the StrandItem
-            lowCap.restoreParent()
+            # if we are hiding it, we might as well make sure it is deselected
+            lowCap.clearSelectedState()
             lowCap.hide()
         else:  # has low cap
             if not lowCap.isVisible():
@@ -357,8 +436,8 @@ class StrandItem(QGraphicsLineItem):
         hx = hUpperLeftX  # draw to edge of base
         highCap.safeSetPos(hUpperLeftX, hUpperLeftY)
         if strand.connectionHigh() != None:  # has high xover
-            # if we are hiding it, we might as well make sure it is reparented to the StrandItem
-            highCap.restoreParent()
+            # if we are hiding it, we might as well make sure it is deselected
+            highCap.clearSelectedState()
             highCap.hide()
         else:  # has high cap
             if not highCap.isVisible():
@@ -381,7 +460,7 @@ class StrandItem(QGraphicsLineItem):
             xo.update(strand)
             xo.showIt()
         else:
-            xo.restoreParent()
+            xo.clearSelectedState()
             xo.hideIt()
 
         # 3. Refresh insertionItems if necessary drawing
@@ -406,15 +485,9 @@ class StrandItem(QGraphicsLineItem):
         
         """
         oligo = self._modelStrand.oligo()
-        penWidth = styles.PATH_STRAND_STROKE_WIDTH
-        if oligo.shouldHighlight():
-            color.setAlpha(128)
-            penWidth = styles.PATH_STRAND_HIGHLIGHT_STROKE_WIDTH
-        pen = QPen(color, penWidth)
-        # pen.setCosmetic(True)
-        brush = QBrush(color)
-        pen.setCapStyle(Qt.FlatCap)
+        pen = graphicscache.strandPen(color, oligo.shouldHighlight())
         self.setPen(pen)
+        brush = graphicscache.brush(pen.color())  # translucent if highlighted
         self._lowCap.updateHighlight(brush)
         self._highCap.updateHighlight(brush)
         self._dualCap.updateHighlight(brush)
@@ -453,10 +526,6 @@ class StrandItem(QGraphicsLineItem):
             
         seqTxt = ''.join(seqList)
         
-        # seqLbl.setPen(QPen( Qt.NoPen))    # leave the Pen as None for unless required
-        seqLbl.setBrush(QBrush(Qt.black))
-        seqLbl.setFont(styles.SEQUENCEFONT)
-
         # this will always draw from the 5 Prime end!
         seqX = 2*textXCenteringOffset + bw*strand.idx5Prime()
         seqY = styles.SEQUENCETEXTYCENTERINGOFFSET
@@ -473,7 +542,8 @@ class StrandItem(QGraphicsLineItem):
             # seqTxt = seqTxt[::-1]
         # end if
         seqLbl.setPos(seqX,seqY)
-        seqLbl.setText(seqTxt)
+        if seqLbl.text() != seqTxt:  # avoid laying out the text again
+            seqLbl.setText(seqTxt)
         seqLbl.show()
     # end def
 
@@ -483,6 +553,9 @@ class StrandItem(QGraphicsLineItem):
         Parses a mousePressEvent to extract strandSet and base index,
         forwarding them to approproate tool method as necessary.
         """
+        selectionGroup = self._viewroot.strandItemSelectionGroup()
+        if selectionGroup.isMember(self):
+            return selectionGroup.mousePressEvent(event)
         activeToolStr = str(self._activeTool())
         self.scene().views()[0].addToPressList(self)
         idx = int(floor((event.pos().x()) / _baseWidth))
@@ -499,6 +572,9 @@ class StrandItem(QGraphicsLineItem):
         Parses a mouseMoveEvent to extract strandSet and base index,
         forwarding them to approproate tool method as necessary.
         """
+        selectionGroup = self._viewroot.strandItemSelectionGroup()
+        if selectionGroup.isMember(self):
+            return selectionGroup.mouseMoveEvent(event)
         toolMethodName = str(self._activeTool()) + "MouseMove"
         if hasattr(self, toolMethodName):
             idx = int(floor((event.pos().x()) / _baseWidth))
@@ -676,25 +752,14 @@ class StrandItem(QGraphicsLineItem):
                 self.partItem().updateStatusBar(msg)
     # end def
     
-    def restoreParent(self, pos=None):
+    def clearSelectedState(self):
         """
-        Required to restore parenting and positioning in the partItem
+        Takes the item out of the selection group and draws it unselected.
         """
-        # map the position
-        # print "restoring parent si"
-        self.tempReparent(pos)
+        self._viewroot.strandItemSelectionGroup().removeFromGroup(self)
         self.setSelectedColor(False)
         self.setSelected(False)
     # end def
-    
-    def tempReparent(self, pos=None):
-        vhItem = self.virtualHelixItem()
-        if pos == None:
-            pos = self.scenePos()
-        self.setParentItem(vhItem)
-        tempP = vhItem.mapFromScene(pos)
-        self.setPos(tempP)
-    # end def
 
     def setSelectedColor(self, value):
         if value == True:
@@ -723,7 +788,7 @@ class StrandItem(QGraphicsLineItem):
                 isNormalSelect = selectionGroup.isNormalSelect()
                 if value == True and (self._filterName in currentFilterDict or not isNormalSelect):
                     if self._strandFilter in currentFilterDict:
-                        if self.group() != selectionGroup:
+                        if not selectionGroup.isMember(self):
                             self.setSelectedColor(True)
                             # This should always be the case, but...
                             if isNormalSelect:
@@ -786,7 +851,8 @@ class StrandItem(QGraphicsLineItem):
                 test5p = idxH if strand5p.isDrawn5to3() else idxL
                 if test3p and test5p:
                     xoi = self._xover3pEnd
-                    if not xoi.isSelected() or not xoi.group():
+                    if not xoi.isSelected() or \
+                                    not selectionGroup.isMember(xoi):
                         selectionGroup.setNormalSelect(False)
                         selectionGroup.addToGroup(xoi)
                         xoi.modelSelect(document)
@@ -798,24 +864,25 @@ class StrandItem(QGraphicsLineItem):
         
         lowCap = self._lowCap
         if idxL == True:
-            if not lowCap.isSelected() or not lowCap.group():
+            if not lowCap.isSelected() or not selectionGroup.isMember(lowCap):
                 selectionGroup.addToGroup(lowCap)
                 lowCap.modelSelect(document)
         else:
-            if lowCap.isSelected() or lowCap.group():
-                lowCap.restoreParent()
+            if lowCap.isSelected() or selectionGroup.isMember(lowCap):
+                lowCap.clearSelectedState()
         highCap = self._highCap
         if idxH == True:
-            if not highCap.isSelected() or not highCap.group():
+            if not highCap.isSelected() or \
+                                    not selectionGroup.isMember(highCap):
                 selectionGroup.addToGroup(highCap)
                 highCap.modelSelect(document)
         else:
-            if highCap.isSelected() or highCap.group():
-                highCap.restoreParent()
+            if highCap.isSelected() or selectionGroup.isMember(highCap):
+                highCap.clearSelectedState()
         
         # now check the strand itself
         if idxL == True and idxH == True:
-            if not self.isSelected() or not self.group():
+            if not self.isSelected() or not selectionGroup.isMember(self):
                 selectionGroup.setNormalSelect(False)
                 selectionGroup.addToGroup(self)
                 self.modelSelect(document)
@@ -825,7 +892,7 @@ class StrandItem(QGraphicsLineItem):
     # end def
 
     def modelDeselect(self, document):
-        self.restoreParent()
+        self.clearSelectedState()
         self._lowCap.modelDeselect(document)
         self._highCap.modelDeselect(document)
     # end def
@@ -28,6 +28,7 @@ Created by Nick on 2011-05-25.
 from exceptions import AttributeError, NotImplementedError
 import time
 from views import styles
+import views.pathview.graphicscache as graphicscache
 
 import util, time
 
@@ -36,13 +37,10 @@ util.qtWrapImport('QtCore', globals(), ['QPointF', 'QRectF', 'Qt', 'QEvent'])
 util.qtWrapImport('QtGui', globals(), ['QBrush', 'QFont', 'QGraphicsItem',\
                                 'QGraphicsSimpleTextItem', 'QPen',\
                                 'QPolygonF', 'QPainterPath', 'QGraphicsRectItem', \
-                                'QColor', 'QFontMetrics', 'QGraphicsPathItem'])
+                                'QColor', 'QGraphicsPathItem'])
 
 _baseWidth = styles.PATH_BASE_WIDTH
 _toHelixNumFont = styles.XOVER_LABEL_FONT
-# precalculate the height of a number font.  Assumes a fixed font
-# and that only numbers will be used for labels
-_fm = QFontMetrics(_toHelixNumFont)
 _enabbrush = QBrush(Qt.SolidPattern)  # Also for the helix number label
 _nobrush = QBrush(Qt.NoBrush)
 # _rect = QRectF(0, 0, baseWidth, baseWidth)
@@ -179,7 +177,7 @@ class XoverNode3(QGraphicsRectItem):
             if lbl == None:
                 bw = _baseWidth
                 num = self._partnerVirtualHelix.number()
-                tBR = _fm.tightBoundingRect(str(num))
+                tBR = graphicscache.labelRect(str(num))
                 halfLabelH = tBR.height()/2.0
                 halfLabelW = tBR.width()/2.0
                 # determine x and y positions
@@ -283,6 +281,8 @@ class XoverItem(QGraphicsPathItem):
 
     def remove(self):
         scene = self.scene()
+        selectionGroup = self._strandItem.viewroot().strandItemSelectionGroup()
+        selectionGroup.removeFromGroup(self)
         if self._node3:
             self._node3.remove()
             self._node5.remove()
@@ -294,6 +294,26 @@ class XoverItem(QGraphicsPathItem):
         scene.removeItem(self)
     # end def
 
+    def release(self):
+        """
+        Hides the xover and removes its nodes, for a StrandItem released
+        back to the StrandItemPool.
+        """
+        self.clearSelectedState()
+        self.hide()
+        if self._node3:
+            self._node3.remove()
+            self._node3 = None
+        if self._node5:
+            self._node5.remove()
+            self._node5 = None
+        self._strand5p = None
+    # end def
+
+    def setVirtualHelixItem(self, virtualHelixItem):
+        self._virtualHelixItem = virtualHelixItem
+    # end def
+
     ### PUBLIC SUPPORT METHODS ###
     def hideIt(self):
         self.hide()
@@ -373,9 +393,6 @@ class XoverItem(QGraphicsPathItem):
         are potentially None and represent the base at floatPos.
 
         """
-        group = self.group()
-        self.tempReparent()
-        
         node3 = self._node3
         node5 = self._node5
 
@@ -448,10 +465,6 @@ class XoverItem(QGraphicsPathItem):
         self.setPath(painterpath)
         node3.updatePositionAndAppearance()
         node5.updatePositionAndAppearance()
-        
-        if group:
-            group.addToGroup(self)
-            
         self._updateColor(strand5p)
     # end def
     
@@ -465,14 +478,7 @@ class XoverItem(QGraphicsPathItem):
         oligo = strand.oligo()
         color = self.pen().color() if self.isSelected() else QColor(oligo.color())
         # print "update xover color", color.value(), self.isSelected(), self.group(), self.parentItem()
-        penWidth = styles.PATH_STRAND_STROKE_WIDTH
-        if oligo.shouldHighlight():
-            penWidth = styles.PATH_STRAND_HIGHLIGHT_STROKE_WIDTH
-            color.setAlpha(128)
-        pen = QPen(color, penWidth)
-        # pen.setCosmetic(True)
-        pen.setCapStyle(Qt.FlatCap)
-        self.setPen(pen)
+        self.setPen(graphicscache.strandPen(color, oligo.shouldHighlight()))
     # end def
 
     ### EVENT HANDERS ###
@@ -480,6 +486,9 @@ class XoverItem(QGraphicsPathItem):
         """
         Special case for xovers and select tool, for now
         """
+        selectionGroup = self._strandItem.viewroot().strandItemSelectionGroup()
+        if selectionGroup.isMember(self):
+            return selectionGroup.mousePressEvent(event)
         if str(self.activeTool()) == "selectTool":
             event.setAccepted(False)
             sI = self._strandItem
@@ -500,6 +509,13 @@ class XoverItem(QGraphicsPathItem):
             event.setAccepted(False)
     # end def 
     
+    def mouseMoveEvent(self, event):
+        selectionGroup = self._strandItem.viewroot().strandItemSelectionGroup()
+        if selectionGroup.isMember(self):
+            return selectionGroup.mouseMoveEvent(event)
+        QGraphicsPathItem.mouseMoveEvent(self, event)
+    # end def
+
     def eraseToolMousePress(self):
         """Erase the strand."""
         self._strandItem.eraseToolMousePress(None, None)
@@ -523,25 +539,16 @@ class XoverItem(QGraphicsPathItem):
         self._virtualHelixItem.part().removeXover(strand5p, strand3p)
     # end def
 
-    def restoreParent(self, pos=None):
+    def clearSelectedState(self):
         """
-        Required to restore parenting and positioning in the partItem
+        Takes the item out of the selection group and draws it unselected.
         """
-        # map the position
-        self.tempReparent(pos)
+        selectionGroup = self._strandItem.viewroot().strandItemSelectionGroup()
+        selectionGroup.removeFromGroup(self)
         self.setSelectedColor(False)
         self.setSelected(False)
     # end def
 
-    def tempReparent(self, pos=None):
-        partItem = self.partItem()
-        if pos == None:
-            pos = self.scenePos()
-        self.setParentItem(partItem)
-        tempP = partItem.mapFromScene(pos)
-        self.setPos(tempP)
-    # end def
-
     def setSelectedColor(self, value):
         if value == True:
             color = styles.selected_color
@@ -569,7 +576,7 @@ class XoverItem(QGraphicsPathItem):
                 if value == True and (self._filterName in currentFilterDict or not selectionGroup.isNormalSelect()):
                     if sI.strandFilter() in currentFilterDict:
                         # print "might add a xoi"
-                        if self.group() != selectionGroup and selectionGroup.isNormalSelect():
+                        if not selectionGroup.isMember(self) and selectionGroup.isNormalSelect():
                             # print "adding an xoi"
                             selectionGroup.pendToAdd(self)
                             selectionGroup.setSelectionLock(selectionGroup)
@@ -587,7 +594,6 @@ class XoverItem(QGraphicsPathItem):
                     # Check if the strand is being added to the selection group still
                     if not selectionGroup.isPending(self._strandItem):
                         selectionGroup.pendToRemove(self)
-                        self.tempReparent()
                         self.setSelectedColor(False)
                         return False
                     else:   # don't deselect it, because the strand is selected still
@@ -631,7 +637,7 @@ class XoverItem(QGraphicsPathItem):
             document.removeStrandFromSelection(strand3p)
         elif test3p:
             document.addStrandToSelection(strand3p, (lowVal3p, highVal3p))
-        self.restoreParent()
+        self.clearSelectedState()
     # end def
 
     def modelSelect(self, document):
@@ -0,0 +1,245 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+"""
+strandpool.py
+
+Instantiates path view StrandItems (with their EndpointItems, XoverItem
+and InsertionItems) only for the strands near the visible part of the
+view, so the item count follows the size of the screen rather than the
+size of the design.
+"""
+
+from math import ceil, floor
+from strand.stranditem import StrandItem
+from views import styles
+import util
+
+# import Qt stuff into the module namespace with PySide, PyQt4 independence
+util.qtWrapImport('QtCore', globals(), ['QTimer'])
+
+_baseWidth = styles.PATH_BASE_WIDTH
+# released StrandItems kept around for reuse; the rest are deleted
+_maxFreeItems = 512
+
+
+class StrandItemPool(object):
+    """
+    Owned by a PartItem. Tracks the visible rect of the path view through
+    CustomQGraphicsView.visibleRectChangedSignal and keeps a StrandItem
+    bound to every strand that overlaps the visible base range of its
+    helix, widened by half a screen on each side so that short pans do
+    not reveal empty helices. A strand whose crossover lands on such a
+    strand is kept as well, since the 5' StrandItem draws the crossover.
+    When the view is zoomed out past its level of detail threshold no
+    strand is shown this way; VirtualHelixItems draw a strip instead.
+
+    Strands that leave the window have their StrandItem released to a
+    free list and later rebound to strands that enter it. Items that are
+    selected, or part of a selection, are never released.
+    """
+    def __init__(self, partItem, viewroot):
+        self._partItem = partItem
+        self._viewroot = viewroot
+        self._items = {}  # model Strand -> bound StrandItem
+        self._freeItems = []
+        self._sceneRect = None  # visible rect, unknown until the first paint
+        self._ranges = {}  # VirtualHelixItem -> (lowIdx, highIdx) to show
+        self._refreshPending = False
+        self._view = view = viewroot.scene().views()[0]
+        self._showDetails = view.shouldShowDetails()
+        view.visibleRectChangedSignal.connect(self.visibleRectChangedSlot)
+        view.levelOfDetailChangedSignal.connect(self.levelOfDetailChangedSlot)
+    # end def
+
+    ### SLOTS ###
+    def levelOfDetailChangedSlot(self, boolval):
+        if boolval != self._showDetails:
+            self._showDetails = boolval
+            self.refresh()
+    # end def
+
+    def visibleRectChangedSlot(self, sceneRect):
+        self._sceneRect = sceneRect
+        self.refresh()
+    # end def
+
+    ### PUBLIC METHODS ###
+    def strandItem(self, strand):
+        """Returns the StrandItem drawing strand, or None."""
+        return self._items.get(strand)
+    # end def
+
+    def itemCount(self):
+        return len(self._items)
+    # end def
+
+    def strandAdded(self, strand):
+        """Called by VirtualHelixItem.strandAddedSlot for each new strand."""
+        if self._isWanted(strand):
+            self._acquire(strand)
+        else:
+            # its crossovers may not be installed yet, so look again once
+            # the current edit is done
+            self.scheduleRefresh()
+    # end def
+
+    def strandItemRemoved(self, strand):
+        """Called by a StrandItem whose strand left the model."""
+        self._items.pop(strand, None)
+    # end def
+
+    def scheduleRefresh(self):
+        """Refreshes once control returns to the event loop."""
+        if not self._refreshPending:
+            self._refreshPending = True
+            QTimer.singleShot(0, self.refresh)
+    # end def
+
+    def refresh(self):
+        """
+        Binds StrandItems to the strands in the window and releases the
+        rest.
+        """
+        self._refreshPending = False
+        if self._partItem == None or self._sceneRect == None:
+            return
+        self._updateRanges()
+        wanted = set()
+        for vhi, (lowIdx, highIdx) in self._ranges.iteritems():
+            for strandSet in vhi.virtualHelix().getStrandSets():
+                for strand in strandSet.getOverlappingStrands(lowIdx, highIdx):
+                    wanted.add(strand)
+                    strand5p = strand.connection5p()
+                    if strand5p != None:
+                        wanted.add(strand5p)
+        for strand, item in self._items.items():
+            if strand not in wanted and not item.isPinned():
+                self._release(strand)
+        boundSelected = False
+        for strand in wanted:
+            if strand not in self._items:
+                boundSelected |= self._acquire(strand)
+        if boundSelected:  # e.g. zooming in on a zoomed out selection
+            self._viewroot.strandItemSelectionGroup().refreshSelectionBox()
+    # end def
+
+    def bindAll(self):
+        """
+        Binds a StrandItem to every strand of the part, so that walking the
+        items, e.g. to export an SVG, draws the whole design. The next
+        refresh releases the items outside the window again.
+        """
+        if self._partItem == None:
+            return
+        self._partItem.part().materializeAll()
+        for vhi in self._partItem.virtualHelixItems():
+            for strandSet in vhi.virtualHelix().getStrandSets():
+                for strand in list(strandSet):
+                    if strand not in self._items:
+                        self._acquire(strand)
+    # end def
+
+    def destroy(self):
+        """Called when the PartItem is removed."""
+        view = self._view
+        view.visibleRectChangedSignal.disconnect(self.visibleRectChangedSlot)
+        view.levelOfDetailChangedSignal.disconnect(self.levelOfDetailChangedSlot)
+        for item in self._freeItems:
+            item.remove()
+        self._freeItems = []
+        self._items = {}
+        self._ranges = {}
+        self._partItem = None
+    # end def
+
+    ### PRIVATE SUPPORT METHODS ###
+    def _updateRanges(self):
+        """
+        Maps the visible rect into part coordinates, widens it by half its
+        size on each side and finds the base range it covers on each helix.
+        """
+        if not self._showDetails:
+            self._ranges = {}
+            return
+        partItem = self._partItem
+        rect = partItem.mapRectFromScene(self._sceneRect)
+        dx, dy = rect.width()/2, rect.height()/2
+        rect.adjust(-dx, -dy, dx, dy)
+        maxIdx = partItem.part().maxBaseIdx()
+        ranges = {}
+        for vhi in partItem.virtualHelixItems():
+            vhRect = vhi.mapRectToItem(partItem, vhi.boundingRect())
+            if vhRect.bottom() < rect.top() or vhRect.top() > rect.bottom():
+                continue
+            x = vhi.mapToItem(partItem, 0, 0).x()
+            lowIdx = max(0, int(floor((rect.left() - x)/_baseWidth)))
+            highIdx = min(maxIdx, int(ceil((rect.right() - x)/_baseWidth)))
+            if lowIdx <= highIdx:
+                ranges[vhi] = (lowIdx, highIdx)
+        self._ranges = ranges
+    # end def
+
+    def _overlapsWindow(self, strand):
+        vhi = self._partItem.itemForVirtualHelix(strand.virtualHelix())
+        window = self._ranges.get(vhi)
+        if window == None:
+            return False
+        return strand.lowIdx() <= window[1] and strand.highIdx() >= window[0]
+    # end def
+
+    def _isWanted(self, strand):
+        if self._sceneRect == None:
+            return False
+        if self._overlapsWindow(strand):
+            return True
+        strand3p = strand.connection3p()
+        return strand3p != None and self._overlapsWindow(strand3p)
+    # end def
+
+    def _acquire(self, strand):
+        """Binds an item to strand. Returns True if strand is selected."""
+        vhi = self._partItem.itemForVirtualHelix(strand.virtualHelix())
+        if self._freeItems:
+            item = self._freeItems.pop()
+            item.rebind(strand, vhi)
+        else:
+            item = StrandItem(strand, vhi, self._viewroot)
+        self._items[strand] = item
+        document = self._partItem.document()
+        if document.isModelStrandSelected(strand):
+            item.selectIfRequired(document,
+                                  document.getSelectedStrandValue(strand))
+            return True
+        return False
+    # end def
+
+    def _release(self, strand):
+        item = self._items.pop(strand)
+        item.release()
+        if len(self._freeItems) < _maxFreeItems:
+            self._freeItems.append(item)
+        else:
+            item.remove()
+    # end def
+# end class
@@ -94,6 +94,7 @@ class VirtualHelixHandleItem(QGraphicsEllipseItem):
 
     def remove(self):
         scene = self.scene()
+        self._viewroot.vhiHandleSelectionGroup().removeFromGroup(self)
         scene.removeItem(self._label)
         scene.removeItem(self)
         self._label = None
@@ -177,8 +178,8 @@ class VirtualHelixHandleItem(QGraphicsEllipseItem):
         """
         All mousePressEvents are passed to the group if it's in a group
         """
-        selectionGroup = self.group()
-        if selectionGroup != None:
+        selectionGroup = self._viewroot.vhiHandleSelectionGroup()
+        if selectionGroup.isMember(self):
             selectionGroup.mousePressEvent(event)
         else:
             QGraphicsItem.mousePressEvent(self, event)
@@ -188,30 +189,19 @@ class VirtualHelixHandleItem(QGraphicsEllipseItem):
         """
         All mouseMoveEvents are passed to the group if it's in a group
         """
-        selectionGroup = self.group()
-        if selectionGroup != None:
-            selectionGroup.mousePressEvent(event)
+        selectionGroup = self._viewroot.vhiHandleSelectionGroup()
+        if selectionGroup.isMember(self):
+            selectionGroup.mouseMoveEvent(event)
         else:
             QGraphicsItem.mouseMoveEvent(self, event)
     # end def
 
-    def restoreParent(self, pos=None):
+    def clearSelectedState(self):
         """
-        Required to restore parenting and positioning in the partItem
+        Takes the handle out of the selection group and draws it unselected.
         """
-
-        # map the position
-        partItem = self._partItem
-        if pos == None:
-            pos = self.scenePos()
-        self.setParentItem(partItem)
+        self._viewroot.vhiHandleSelectionGroup().removeFromGroup(self)
         self.setSelectedColor(False)
-
-        assert(self.parentItem() == partItem)
-        # print "restore", self.number(), self.parentItem(), self.group()
-        assert(self.group() == None)
-        tempP = partItem.mapFromScene(pos)
-        self.setPos(tempP)
         self.setSelected(False)
     # end def
 
@@ -226,7 +216,7 @@ class VirtualHelixHandleItem(QGraphicsEllipseItem):
 
             # only add if the selectionGroup is not locked out
             if value == True and self._filterName in currentFilterDict:
-                if self.group() != selectionGroup:
+                if not selectionGroup.isMember(self):
                     selectionGroup.pendToAdd(self)
                     selectionGroup.setSelectionLock(selectionGroup)
                     self.setSelectedColor(True)
@@ -249,7 +239,7 @@ class VirtualHelixHandleItem(QGraphicsEllipseItem):
     
     def modelDeselect(self, document):
         pass
-        self.restoreParent()
+        self.clearSelectedState()
     # end def
     
     def modelSelect(self, document):
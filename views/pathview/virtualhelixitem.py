@@ -28,7 +28,6 @@
 from math import floor
 from controllers.itemcontrollers.virtualhelixitemcontroller import VirtualHelixItemController
 from model.enum import StrandType
-from strand.stranditem import StrandItem
 from views import styles
 from virtualhelixhandleitem import VirtualHelixHandleItem
 import util
@@ -38,6 +37,7 @@ util.qtWrapImport('QtGui', globals(), ['QBrush', 'QGraphicsItem', \
                                        'QGraphicsPathItem',  'QGraphicsRectItem', \
                                        'QPainterPath', 'QPen', 'QBrush', 'QColor'])
 _baseWidth = styles.PATH_BASE_WIDTH
+_noPen = QPen(Qt.NoPen)
 # _gridPen = QPen(styles.minorgridstroke, styles.MINOR_GRID_STROKE_WIDTH)
 # _gridPen.setCosmetic(True)
 
@@ -58,13 +58,15 @@ class VirtualHelixItem(QGraphicsPathItem):
         self._lastStrandSet = None
         self._lastIdx = None
         self._scaffoldBackground = None
+        self._stripPaths = None  # zoomed out strand strip, see _getStripPaths
+        self._stripOligos = set()  # oligos whose colors the strip shows
         self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
         self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
         self.setBrush(QBrush(Qt.NoBrush))
 
         view = viewroot.scene().views()[0]
         view.levelOfDetailChangedSignal.connect(self.levelOfDetailChangedSlot)
-        shouldShowDetails = view.shouldShowDetails()
+        self._showDetails = shouldShowDetails = view.shouldShowDetails()
 
         pen = QPen(styles.minorgridstroke, styles.MINOR_GRID_STROKE_WIDTH)
         pen.setCosmetic(shouldShowDetails)
@@ -84,16 +86,29 @@ class VirtualHelixItem(QGraphicsPathItem):
         pen = self.pen()
         pen.setCosmetic(boolval)
         self.setPen(pen)
+        if boolval != self._showDetails:
+            self._showDetails = boolval
+            self.invalidateStrip()
+            self.update()
+    # end def
+
+    def oligoAppearanceChangedSlot(self, oligo):
+        """
+        Recolors the strip. Connected only to the oligos it shows, since
+        color changes do not emit partStrandChangedSignal.
+        """
+        self.invalidateStrip()
     # end def
     
     def strandAddedSlot(self, sender, strand):
         """
-        Instantiates a StrandItem upon notification that the model has a
-        new Strand.  The StrandItem is responsible for creating its own
+        Hands a new Strand to the PartItem's StrandItemPool, which
+        instantiates a StrandItem for it once it is near the visible part of
+        the view.  The StrandItem is responsible for creating its own
         controller for communication with the model, and for adding itself to
         its parent (which is *this* VirtualHelixItem, i.e. 'self').
         """
-        StrandItem(strand, self, self._viewroot)
+        self._partItem.strandItemPool().strandAdded(strand)
     # end def
 
     def decoratorAddedSlot(self, decorator):
@@ -112,6 +127,7 @@ class VirtualHelixItem(QGraphicsPathItem):
     def virtualHelixRemovedSlot(self, virtualHelix):
         self._controller.disconnectSignals()
         self._controller = None
+        self.invalidateStrip()
         
         scene = self.scene()
         self._handle.remove()
@@ -160,6 +176,74 @@ class VirtualHelixItem(QGraphicsPathItem):
     # end def
 
     ### DRAWING METHODS ###
+    def paint(self, painter, option, widget=None):
+        # helices scrolled into view get their strands first while loading
+        self.part().materializeVirtualHelix(self._modelVirtualHelix)
+        if self._showDetails or widget == None:
+            # exports (no widget) draw the StrandItems, see bindAll
+            QGraphicsPathItem.paint(self, painter, option, widget)
+            return
+        # zoomed out: the StrandItemPool has released the strand items, so
+        # draw the outline and the strands from the model instead
+        bw = _baseWidth
+        painter.setPen(self.pen())
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRect(QRectF(0, 0, bw*(self.part().maxBaseIdx()+1), 2*bw))
+        painter.setPen(_noPen)
+        for color, path in self._getStripPaths():
+            painter.setBrush(QBrush(color))
+            painter.drawPath(path)
+    # end def
+
+    def invalidateStrip(self):
+        """
+        Called by the PartItem when the strands of this helix change, and
+        when one of the oligos on the strip changes color. update() also
+        discards the item's cached pixmap.
+        """
+        self._stripPaths = None
+        for oligo in self._stripOligos:
+            oligo.oligoAppearanceChangedSignal.disconnect(\
+                                            self.oligoAppearanceChangedSlot)
+        self._stripOligos = set()
+        if not self._showDetails:
+            self.update()
+    # end def
+
+    def _getStripPaths(self):
+        """
+        Returns the zoomed out drawing of the helix's strands as
+        (color, path) pairs: one merged QPainterPath per oligo color, with a
+        thin bar along each strand and a full height bar at each crossover.
+        Built from the model's strand intervals and cached until
+        invalidateStrip.
+        """
+        if self._stripPaths == None:
+            bw = _baseWidth
+            paths = {}
+            oligos = self._stripOligos
+            for strandSet in self._modelVirtualHelix.getStrandSets():
+                for strand in strandSet:
+                    oligo = strand.oligo()
+                    if oligo not in oligos:
+                        oligos.add(oligo)
+                        oligo.oligoAppearanceChangedSignal.connect(\
+                                            self.oligoAppearanceChangedSlot)
+                    color = oligo.color()
+                    path = paths.get(color)
+                    if path == None:
+                        path = paths[color] = QPainterPath()
+                        path.setFillRule(Qt.WindingFill)
+                    lowIdx, highIdx = strand.idxs()
+                    x, y = self.upperLeftCornerOfBase(lowIdx, strand)
+                    path.addRect(x, y + bw/4., (highIdx - lowIdx + 1)*bw, bw/2.)
+                    if strand.connection3p() != None:
+                        path.addRect(strand.idx3Prime()*bw + bw/4., 0, bw/2., 2*bw)
+            self._stripPaths = [(QColor(color), path) \
+                                for color, path in paths.iteritems()]
+        return self._stripPaths
+    # end def
+
     def isStrandOnTop(self, strand):
         sS = strand.strandSet()
         isEvenParity = self._modelVirtualHelix.isEvenParity()
@@ -187,61 +271,19 @@ class VirtualHelixItem(QGraphicsPathItem):
 
     def refreshPath(self):
         """
-        Returns a QPainterPath object for the minor grid lines.
-        The path also includes a border outline and a midline for
-        dividing scaffold and staple bases.
+        Sets the path to the border outline of the helix and a midline
+        dividing scaffold and staple bases. The minor grid lines are drawn
+        for every helix by the PartItem's GridItem.
         """
         bw = _baseWidth
-        bw2 = 2 * bw
-        part = self.part()
+        canvasSize = self.part().maxBaseIdx()+1
         path = QPainterPath()
-        subStepSize = part.subStepSize()
-        canvasSize = part.maxBaseIdx()+1
         # border
         path.addRect(0, 0, bw * canvasSize, 2 * bw)
-        # minor tick marks
-        for i in range(canvasSize):
-            x = round(bw * i) + .5
-            if i % subStepSize == 0:
-                path.moveTo(x-.5, 0)
-                path.lineTo(x-.5, bw2)
-                path.lineTo(x-.25, bw2)
-                path.lineTo(x-.25, 0)
-                path.lineTo(x, 0)
-                path.lineTo(x, bw2)
-                path.lineTo(x+.25, bw2)
-                path.lineTo(x+.25, 0)
-                path.lineTo(x+.5, 0)
-                path.lineTo(x+.5, bw2)
-
-                # path.moveTo(x-.5, 0)
-                # path.lineTo(x-.5, 2 * bw)
-                # path.lineTo(x+.5, 2 * bw)
-                # path.lineTo(x+.5, 0)
-
-            else:
-                path.moveTo(x, 0)
-                path.lineTo(x, 2 * bw)
-
         # staple-scaffold divider
         path.moveTo(0, bw)
         path.lineTo(bw * canvasSize, bw)
-        
         self.setPath(path)
-        
-        if self._modelVirtualHelix.scaffoldIsOnTop():
-            scaffoldY = 0
-        else:
-            scaffoldY = bw
-        # if self._scaffoldBackground == None:
-        #     highlightr = QGraphicsRectItem(0, scaffoldY, bw * canvasSize, bw, self)
-        #     highlightr.setBrush(QBrush(styles.scaffold_bkg_fill))
-        #     highlightr.setPen(QPen(Qt.NoPen))
-        #     highlightr.setFlag(QGraphicsItem.ItemStacksBehindParent)
-        #     self._scaffoldBackground = highlightr
-        # else:
-        #     self._scaffoldBackground.setRect(0, scaffoldY, bw * canvasSize, bw)
-            
     # end def
 
     def resize(self):
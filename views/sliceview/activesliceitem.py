@@ -45,6 +45,8 @@ class ActiveSliceItem(QGraphicsRectItem):
         super(ActiveSliceItem, self).__init__(partItem)
         self._partItem = partItem
         self._controller = ActiveSliceItemController(self, partItem.part())
+        self._lastIdx = None  # the index the helices were last updated for
+        self._activeVHIs = set()  # VirtualHelixItems drawn as active
         self.setFlag(QGraphicsItem.ItemHasNoContents)
     # end def
 
@@ -54,22 +56,39 @@ class ActiveSliceItem(QGraphicsRectItem):
             return
         partItem = self._partItem
         vhi = partItem.getVirtualHelixItemByCoord(*vh.coord())
+        if vhi == None:
+            return
         activeBaseIdx = partItem.part().activeBaseIndex()
         isActiveNow = vh.hasStrandAtIdx(activeBaseIdx)
-        vhi.setActiveSliceView(isActiveNow, activeBaseIdx)
+        self._setActive(vhi, isActiveNow, activeBaseIdx)
     # end def
 
     def updateIndexSlot(self, sender, newActiveSliceZIndex):
+        """
+        Restyles only the helices that gained or lost a scaffold strand at
+        the active slice since the last update, and turns the arrows of the
+        active ones.
+        """
         part = self.part()
         if part.numberOfVirtualHelices() == 0:
             return
-        newlyActiveVHs = set()
         activeBaseIdx = part.activeBaseIndex()
-        for vhi in self._partItem._virtualHelixHash.itervalues():
-            vh = vhi.virtualHelix()
-            if vh:
-                isActiveNow = vh.hasStrandAtIdx(activeBaseIdx)
-                vhi.setActiveSliceView(isActiveNow, activeBaseIdx)
+        lastIdx, self._lastIdx = self._lastIdx, activeBaseIdx
+        partItem = self._partItem
+        if lastIdx == None:
+            for vhi in partItem._virtualHelixHash.itervalues():
+                vh = vhi.virtualHelix()
+                if vh:
+                    isActiveNow = vh.hasStrandAtIdx(activeBaseIdx)
+                    self._setActive(vhi, isActiveNow, activeBaseIdx)
+            return
+        for vh, isActiveNow in part.virtualHelicesChangedBetween(lastIdx,
+                                                                 activeBaseIdx):
+            vhi = partItem.getVirtualHelixItemByCoord(*vh.coord())
+            if vhi != None:
+                self._setActive(vhi, isActiveNow, activeBaseIdx)
+        for vhi in self._activeVHIs:
+            vhi.updateArrow(activeBaseIdx)
     # end def
 
     def updateRectSlot(self, part):
@@ -82,8 +101,21 @@ class ActiveSliceItem(QGraphicsRectItem):
     # end def
 
     ### PUBLIC METHODS FOR DRAWING / LAYOUT ###
+    def virtualHelixItemRemoved(self, vhi):
+        self._activeVHIs.discard(vhi)
+    # end def
+
     def removed(self):
         self._partItem = None
         self._controller.disconnectSignals()
         self.controller = None
     # end def
+
+    ### PRIVATE SUPPORT METHODS ###
+    def _setActive(self, vhi, isActiveNow, idx):
+        vhi.setActiveSliceView(isActiveNow, idx)
+        if isActiveNow:
+            self._activeVHIs.add(vhi)
+        else:
+            self._activeVHIs.discard(vhi)
+    # end def
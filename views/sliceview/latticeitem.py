@@ -22,38 +22,42 @@
 #
 # http://www.opensource.org/licenses/mit-license.php
 """
-helixitem.py
-Created by Nick on 2011-09-28.
+latticeitem.py
+
+A single item that draws and handles every empty lattice position of a
+slice view PartItem.
 """
 
-import math
 import re
 from cadnano import app
 from model.enum import StrandType
 from views import styles
 import util
 
-try:
-    from OpenGL import GL
-except:
-    GL = False
-
-GL = False
-
 # import Qt stuff into the module namespace with PySide, PyQt4 independence
 util.qtWrapImport('QtCore', globals(), ['QPointF', 'QRectF', 'Qt'])
-util.qtWrapImport('QtGui', globals(), ['QBrush', 'QFont', 'QGraphicsItem',\
-                                       'QGraphicsSimpleTextItem', 'QPen',\
-                                       'QGraphicsTextItem', 'QDrag', \
-                                       'QUndoCommand', 'QGraphicsEllipseItem',\
-                                       'QTransform', 'QStyle'])
+util.qtWrapImport('QtGui', globals(), ['QBrush', 'QGraphicsItem', 'QPen'])
 
 # strand addition stores some meta information in the UndoCommand's text
 _strand_re = re.compile("\((\d+),(\d+)\)\.0\^(\d+)")
 
-class EmptyHelixItem(QGraphicsEllipseItem):
-    """docstring for EmptyHelixItem"""
-    # set up default, hover, and active drawing styles
+
+class LatticeItem(QGraphicsItem):
+    """
+    LatticeItem paints the empty circle of every lattice position of its
+    PartItem, so opening or resizing a large lattice creates no items.
+    Only the positions in the exposed rect are drawn, and the item is
+    cached as a pixmap in device coordinates, so panning and repainting
+    around a VirtualHelixItem reuse the pixmap instead of redrawing the
+    circles.
+
+    Hover and mouse events are mapped to lattice coordinates with
+    Part.positionToCoord rather than tested against per-position shapes.
+    A press on a position decides an action (create the virtual helix,
+    or add a scaffold or staple strand at the active slice), which is then
+    applied to every position the drag crosses.
+    """
+    # set up default and hover drawing styles
     _defaultBrush = QBrush(styles.grayfill)
     _defaultPen = QPen(styles.graystroke, styles.SLICE_HELIX_STROKE_WIDTH)
     _hoverBrush = QBrush(styles.bluefill)
@@ -63,140 +67,158 @@ class EmptyHelixItem(QGraphicsEllipseItem):
     _defaultRect = QRectF(0, 0, 2 * _radius, 2 * _radius)
     temp = (styles.SLICE_HELIX_HILIGHT_WIDTH - temp)/2
     _hoverRect = _defaultRect.adjusted(-temp, -temp, temp, temp)
-    _ZDefault = styles.ZSLICEHELIX 
-    _ZHovered = _ZDefault+1 
-    temp /= 2
-    _adjustmentPlus = (temp, temp)
-    _adjustmentMinus = (-temp, -temp)
-    # _PI = 3.141592
-    # _temp = [x*_PI*0.1 for x in range(20)]
-    # _temp = [(math.sin(angle) * _radius, math.cos(angle) * _radius) for angle in _temp]
-    def __init__(self, row, column, partItem):
-        """
-        row, column is a coordinate in Lattice terms
-        partItem is a PartItem that will act as a QGraphicsItem parent
-        """
-        super(EmptyHelixItem, self).__init__(parent=partItem)
+    _margin = styles.SLICE_HELIX_HILIGHT_WIDTH
+
+    def __init__(self, partItem):
+        """partItem is a PartItem that will act as a QGraphicsItem parent"""
+        super(LatticeItem, self).__init__(partItem)
         self._partItem = partItem
-        self._lastvh = None  # for decideAction
-        self.hide()
-        self._isHovered = False
+        self._rect = QRectF()
+        self._rows, self._cols = 0, 0
+        self._hoverCoord = None
+        self._dragAction = None
+        self._dragCoords = None  # coords the current drag has visited
         self.setAcceptsHoverEvents(True)
+        self.setZValue(styles.ZSLICEHELIX)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        self.resetLattice()
+    # end def
+
+    ### ACCESSORS ###
+    def boundingRect(self):
+        return self._rect
+    # end def
 
-        self.setNotHovered()
+    def part(self):
+        return self._partItem.part()
+    # end def
 
-        x, y = partItem.part().latticeCoordToPositionXY(row, column, partItem.scaleFactor())
-        self.setPos(x, y)
-        self._coord = (row, column)
-        self.show()
+    def virtualHelixAt(self, coord):
+        return self.part().virtualHelixAtCoord(coord)
     # end def
 
-    def virtualHelix(self):
-        """
-        virtualHelixItem should be the HelixItems only child if it exists
-        and virtualHelix should be it member
-        """
-        temp = self.virtualHelixItem()
-        if temp:
-            return temp.virtualHelix()
-        else:
-            return None
+    ### PUBLIC METHODS ###
+    def resetLattice(self):
+        """Picks up the current lattice dimensions of the part."""
+        part = self.part()
+        self.prepareGeometryChange()
+        self._rows, self._cols = part.latticeDimensions()
+        self._hoverCoord = None
+        x, y = part.latticeCoordToPositionXY(self._rows, self._cols,
+                                             self._partItem.scaleFactor())
+        d, m = 2 * self._radius, self._margin
+        self._rect = QRectF(-m, -m, x + d + 2*m, y + d + 2*m)
+        self.update()
     # end def
 
-    def virtualHelixItem(self):
+    def coordAtPos(self, pos):
         """
-        virtualHelixItem should be the HelixItems only child if it exists
-        and virtualHelix should be it member
+        Returns the (row, column) of the circle containing pos, which is
+        in item coordinates, or None if pos misses every circle.
         """
-        temp = self.childItems()
-        if len(temp) > 0:
-            return temp[0]
-        else:
-            return None
+        part = self.part()
+        sf = self._partItem.scaleFactor()
+        radius = self._radius
+        x, y = pos.x() - radius, pos.y() - radius  # circle upper left corner
+        row, col = part.positionToCoord(x, y, sf)
+        best, bestDist = None, radius * radius
+        # positionToCoord rounds to a nearby position; near the edges of a
+        # circle the containing one may be a neighbor of it
+        for r in (row - 1, row, row + 1):
+            if r < 0 or r >= self._rows:
+                continue
+            for c in (col - 1, col, col + 1):
+                if c < 0 or c >= self._cols:
+                    continue
+                cx, cy = part.latticeCoordToPositionXY(r, c, sf)
+                dist = (cx - x)**2 + (cy - y)**2
+                if dist <= bestDist:
+                    best, bestDist = (r, c), dist
+        return best
     # end def
 
-    def part(self):
-        return self._partItem.part()
+    def coordRect(self, coord):
+        """The hover rect of the circle at coord, in item coordinates."""
+        x, y = self.part().latticeCoordToPositionXY(coord[0], coord[1],
+                                                    self._partItem.scaleFactor())
+        return self._hoverRect.translated(x, y)
     # end def
 
-    def translateVH(self, delta):
-        """
-        used to update a child virtual helix position on a hover event
-        delta is a tuple of x and y values to translate
+    def setHoveredCoord(self, coord):
+        """Highlights the circle at coord, or none if coord is None."""
+        if coord == self._hoverCoord:
+            return
+        if self._hoverCoord != None:
+            self.update(self.coordRect(self._hoverCoord))
+        self._hoverCoord = coord
+        if coord != None:
+            self.update(self.coordRect(coord))
+            self._partItem.updateStatusBar("(%d, %d)" % coord)
+        else:
+            self._partItem.updateStatusBar("")
+    # end def
 
-        positive delta happens when hover happens
-        negative delta when something unhovers
-        """
-        temp = self.virtualHelixItem()
-
-        # xor the check to translate, 
-        # convert to a QRectF adjustment if necessary
-        check = (delta > 0) ^ self._isHovered
-        if temp and check:
-            pass
-            # temp.translate(*delta)
+    def updateCoord(self, row, col):
+        self.update(self.coordRect((row, col)))
     # end def
 
-    def setHovered(self):
-        # self.setFlag(QGraphicsItem.ItemHasNoContents, False)  
-        self.setBrush(self._hoverBrush)
-        self.setPen(self._hoverPen)
-        self.update(self.boundingRect())
-        # self.translateVH(self._adjustmentPlus)
-        self._isHovered = True
-        self.setZValue(self._ZHovered)
-        self.setRect(self._hoverRect)
-
-        self._partItem.updateStatusBar("(%d, %d)" % self._coord)
+    def paint(self, painter, option, widget=None):
+        part = self.part()
+        sf = self._partItem.scaleFactor()
+        positionXY = part.latticeCoordToPositionXY
+        rect = self._defaultRect
+        painter.setPen(self._defaultPen)
+        painter.setBrush(self._defaultBrush)
+        for row, col in self._coordsInRect(option.exposedRect):
+            x, y = positionXY(row, col, sf)
+            painter.drawEllipse(rect.translated(x, y))
+        if self._hoverCoord != None:
+            painter.setPen(self._hoverPen)
+            painter.setBrush(self._hoverBrush)
+            x, y = positionXY(self._hoverCoord[0], self._hoverCoord[1], sf)
+            painter.drawEllipse(self._hoverRect.translated(x, y))
     # end def
 
-    def hoverEnterEvent(self, event):
-        """
-        hoverEnterEvent changes the HelixItem brush and pen from default
-        to the hover colors if necessary.
-        """
-        self.setHovered()
+    ### PRIVATE SUPPORT METHODS ###
+    def _coordsInRect(self, rect):
+        """Yields the lattice coords whose circles may intersect rect."""
+        part = self.part()
+        sf = self._partItem.scaleFactor()
+        d = 2 * self._radius
+        row0, col0 = part.positionToCoord(rect.left() - d, rect.top() - d, sf)
+        row1, col1 = part.positionToCoord(rect.right(), rect.bottom(), sf)
+        for row in xrange(max(0, row0 - 1), min(self._rows, row1 + 2)):
+            for col in xrange(max(0, col0 - 1), min(self._cols, col1 + 2)):
+                yield row, col
     # end def
 
-    def setNotHovered(self):
-        """
-        """
-        # drawMe = False if self.virtualHelixItem() else True
-        # self.setFlag(QGraphicsItem.ItemHasNoContents, drawMe)
-        self.setBrush(self._defaultBrush)
-        self.setPen(self._defaultPen)
-        # self.translateVH(self._adjustmentMinus)
-        self._isHovered = False
-        self.setZValue(self._ZDefault)
-        self.setRect(self._defaultRect)
-
-        self._partItem.updateStatusBar("")
+    ### EVENT HANDLERS ###
+    def hoverMoveEvent(self, event):
+        self.setHoveredCoord(self.coordAtPos(event.pos()))
     # end def
 
     def hoverLeaveEvent(self, event):
-        """
-        hoverEnterEvent changes the HelixItem brush and pen from hover
-        to the default colors if necessary.
-        """
-        self.setNotHovered()
+        self.setHoveredCoord(None)
     # end def
 
     def mousePressEvent(self, event):
-        action = self.decideAction(event.modifiers())
-        action(self)
-        self.dragSessionAction = action
+        coord = self.coordAtPos(event.pos())
+        if coord == None:
+            # let the PartItem's deselector have it
+            event.ignore()
+            return
+        action = self.decideAction(coord, event.modifiers())
+        action(coord)
+        self._dragAction = action
+        self._dragCoords = set([coord])
     # end def
 
     def mouseMoveEvent(self, event):
-        partItem = self._partItem
-        posInParent = partItem.mapFromItem(self, QPointF(event.pos()))
-        # Qt doesn't have any way to ask for graphicsitem(s) at a
-        # particular position but it *can* do intersections, so we
-        # just use those instead
-        partItem.probe.setPos(posInParent)
-        for ci in partItem.probe.collidingItems():
-            if isinstance(ci, EmptyHelixItem):
-                self.dragSessionAction(ci)
+        coord = self.coordAtPos(event.pos())
+        if coord != None and coord not in self._dragCoords:
+            self._dragCoords.add(coord)
+            self._dragAction(coord)
     # end def
 
     def autoScafMidSeam(self, strands):
@@ -316,6 +338,8 @@ class EmptyHelixItem(QGraphicsEllipseItem):
 
     def mouseReleaseEvent(self, event):
         """docstring for mouseReleaseEvent"""
+        self._dragAction = None
+        self._dragCoords = None
         part = self.part()
         uS = part.undoStack()
         strands = []
@@ -337,36 +361,36 @@ class EmptyHelixItem(QGraphicsEllipseItem):
                 self.autoScafRaster(strands)
             util.endSuperMacro(part)
 
-    def decideAction(self, modifiers):
+    def decideAction(self, coord, modifiers):
         """ On mouse press, an action (add scaffold at the active slice, add
         segment at the active slice, or create virtualhelix if missing) is
         decided upon and will be applied to all other slices happened across by
         mouseMoveEvent. The action is returned from this method in the form of a
-        callable function."""
-        vh = self.virtualHelix()
+        callable taking a coord."""
+        vh = self.virtualHelixAt(coord)
         part = self.part()
 
         if vh == None:
-            return EmptyHelixItem.addVHIfMissing
+            return self.addVHIfMissing
 
         idx = part.activeBaseIndex()
         scafSSet, stapSSet = vh.getStrandSets()
         if modifiers & Qt.ShiftModifier:
             if not stapSSet.hasStrandAt(idx-1, idx+1):
-                return EmptyHelixItem.addStapAtActiveSliceIfMissing
+                return self.addStapAtActiveSliceIfMissing
             else:
-                return EmptyHelixItem.nop
+                return self.nop
 
         if not scafSSet.hasStrandAt(idx-1, idx+1):
-            return EmptyHelixItem.addScafAtActiveSliceIfMissing
-        return EmptyHelixItem.nop
+            return self.addScafAtActiveSliceIfMissing
+        return self.nop
     # end def
 
-    def nop(self):
-        self._partItem.updateStatusBar("(%d, %d)" % self._coord)
+    def nop(self, coord):
+        self._partItem.updateStatusBar("(%d, %d)" % coord)
 
-    def addScafAtActiveSliceIfMissing(self):
-        vh = self.virtualHelix()
+    def addScafAtActiveSliceIfMissing(self, coord):
+        vh = self.virtualHelixAt(coord)
         part = self.part()
         if vh == None:
             return
@@ -376,11 +400,11 @@ class EmptyHelixItem(QGraphicsEllipseItem):
         endIdx = min(idx+1, part.maxBaseIdx())
         vh.scaffoldStrandSet().createStrand(startIdx, endIdx)
 
-        self._partItem.updateStatusBar("(%d, %d)" % self._coord)
+        self._partItem.updateStatusBar("(%d, %d)" % coord)
     # end def
 
-    def addStapAtActiveSliceIfMissing(self):
-        vh = self.virtualHelix()
+    def addStapAtActiveSliceIfMissing(self, coord):
+        vh = self.virtualHelixAt(coord)
         part = self.part()
 
         if vh == None:
@@ -391,12 +415,11 @@ class EmptyHelixItem(QGraphicsEllipseItem):
         endIdx = min(idx+1, part.maxBaseIdx())
         vh.stapleStrandSet().createStrand(startIdx, endIdx)
 
-        self._partItem.updateStatusBar("(%d, %d)" % self._coord)
+        self._partItem.updateStatusBar("(%d, %d)" % coord)
     # end def
 
-    def addVHIfMissing(self):
-        vh = self.virtualHelix()
-        coord = self._coord
+    def addVHIfMissing(self, coord):
+        vh = self.virtualHelixAt(coord)
         part = self.part()
 
         if vh != None:
@@ -407,43 +430,6 @@ class EmptyHelixItem(QGraphicsEllipseItem):
         # vh.scaffoldStrandSet().createStrand(startIdx, endIdx)
         uS.endMacro()
 
-        self._partItem.updateStatusBar("(%d, %d)" % self._coord)
+        self._partItem.updateStatusBar("(%d, %d)" % coord)
     # end def
-
-    # if GL:
-    #     def paint(self, painter, option, widget):
-    #         painter.beginNativePainting()
-    # 
-    #         radius = self._radius
-    # 
-    #         # GL.glPushAttrib(GL.GL_ALL_ATTRIB_BITS)
-    #         # GL.glClear(GL.GL_COLOR_BUFFER_BIT)
-    # 
-    #         # Draw the filled circle
-    # 
-    #         GL.glColor3f (1, 0.5, 0)       # Set to orange
-    # 
-    #         GL.glBegin (GL.GL_POLYGON)
-    #         for X, Y in self._temp:
-    #             GL.glVertex2f (X,Y)
-    #         # end for
-    #         GL.glEnd()
-    # 
-    #         # Draw the anti-aliased outline
-    # 
-    #         # GL.glEnable(GL.GL_BLEND)
-    #         # GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
-    #         # GL.glEnable(GL.GL_LINE_SMOOTH)
-    # 
-    #         # GL.glBegin(GL.GL_LINE_LOOP)
-    #         # for angle in [x*PI*0.01 for x in range(200)]:
-    #         #     GL.glVertex2f(X + math.sin(angle) * radius, Y + math.cos(angle) * radius)
-    #         # # end for
-    #         # GL.glDisable(GL.GL_BLEND)
-    #         # GL.glEnd()
-    #         # GL.glPopAttrib()
-    #         painter.endNativePainting()
-    #     # end def
-    # # end if
-
-    
\ No newline at end of file
+# end class
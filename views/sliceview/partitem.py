@@ -24,7 +24,7 @@
 
 # from views.pathview.handles.activeslicehandle import ActiveSliceHandle
 from controllers.itemcontrollers.partitemcontroller import PartItemController
-from emptyhelixitem import EmptyHelixItem
+from latticeitem import LatticeItem
 from virtualhelixitem import VirtualHelixItem
 from activesliceitem import ActiveSliceItem
 
@@ -51,27 +51,24 @@ class PartItem(QGraphicsItem):
         """
         Parent should be either a SliceRootItem, or an AssemblyItem.
 
-        Invariant: keys in _emptyhelixhash = range(_nrows) x range(_ncols)
-        where x is the cartesian product.
-        
-        Order matters for deselector, probe, and setlattice
+        Empty lattice positions are drawn by a single LatticeItem; only
+        the virtual helices present get a VirtualHelixItem.
+
+        Order matters for deselector and setlattice
         """
         super(PartItem, self).__init__(parent)
         self._part = modelPart
         self._controller = PartItemController(self, modelPart)
         self._activeSliceItem = ActiveSliceItem(self, modelPart.activeBaseIndex())
         self._scaleFactor = self._radius/modelPart.radius()
-        self._emptyhelixhash = {}
         self._virtualHelixHash = {}
-        self._nrows, self._ncols = 0, 0
         self._rect = QRectF(0, 0, 0, 0)
         self._initDeselector()
         # Cache of VHs that were active as of last call to activeSliceChanged
         # If None, all slices will be redrawn and the cache will be filled.
         # Connect destructor. This is for removing a part from scenes.
-        self.probe = self.IntersectionProbe(self)
-        # initialize the PartItem with an empty set of old coords
-        self._setLattice([], modelPart.generatorFullLattice())
+        self._latticeItem = LatticeItem(self)
+        self._setLattice()
         self.setFlag(QGraphicsItem.ItemHasNoContents)  # never call paint
         self.setZValue(styles.ZPARTITEM)
         self._initModifierCircle()
@@ -122,16 +119,10 @@ class PartItem(QGraphicsItem):
         
         self._virtualHelixHash = None
         
-        for item in self._emptyhelixhash.items():
-            key, val = item
-            scene.removeItem(val)
-            del self._emptyhelixhash[key]
-        self._emptyhelixhash = None
-
         scene.removeItem(self)
         
+        self._latticeItem = None
         self._part = None
-        self.probe = None
         self._modCirc = None
         
         self.deselector = None
@@ -160,11 +151,10 @@ class PartItem(QGraphicsItem):
     def partVirtualHelixAddedSlot(self, sender, virtualHelix):
         vh = virtualHelix
         coords = vh.coord()
-
-        emptyHelixItem = self._emptyhelixhash[coords]
-        # TODO test to see if self._virtualHelixHash is necessary
-        vhi = VirtualHelixItem(vh, emptyHelixItem)
+        vhi = VirtualHelixItem(vh, self)
         self._virtualHelixHash[coords] = vhi
+        # a helix restored by undo may already have strands
+        self._activeSliceItem.strandChangedSlot(self._part, vh)
     # end def
 
     def partVirtualHelixRenumberedSlot(self, sender, coord):
@@ -184,6 +174,10 @@ class PartItem(QGraphicsItem):
         return self._rect
     # end def
 
+    def latticeItem(self):
+        return self._latticeItem
+    # end def
+
     def part(self):
         return self._part
     # end def
@@ -209,36 +203,15 @@ class PartItem(QGraphicsItem):
         self._rect = QRectF(0, 0, *self.part().dimensions())
     # end def
 
-    def _spawnEmptyHelixItemAt(self, row, column):
-        helix = EmptyHelixItem(row, column, self)
-        # helix.setFlag(QGraphicsItem.ItemStacksBehindParent, True)
-        self._emptyhelixhash[(row, column)] = helix
-    # end def
-
-    def _killHelixItemAt(row, column):
-        s = self._emptyhelixhash[(row, column)]
-        s.scene().removeItem(s)
-        del self._emptyhelixhash[(row, column)]
-    # end def
-
-    def _setLattice(self, oldCoords, newCoords):
+    def _setLattice(self):
         """A private method used to change the number of rows,
         cols in response to a change in the dimensions of the
-        part represented by the receiver"""
-        oldSet = set(oldCoords)
-        oldList = list(oldSet)
-        newSet = set(newCoords)
-        newList = list(newSet)
-        for coord in oldList:
-            if coord not in newSet:
-                self._killHelixItemAt(*coord)
-        # end for
-        for coord in newList:
-            if coord not in oldSet:
-                self._spawnEmptyHelixItemAt(*coord)
-        # end for
-        # self._updateGeometry(newCols, newRows)
-        # self.prepareGeometryChange()
+        part represented by the receiver. The LatticeItem draws every
+        position, so no items are created or destroyed."""
+        latticeItem = self._latticeItem
+        latticeItem.resetLattice()
+        self.prepareGeometryChange()
+        self._rect = latticeItem.mapRectToParent(latticeItem.boundingRect())
         # the Deselector copies our rect so it changes too
         self.deselector.prepareGeometryChange()
         self.zoomToFit()
@@ -246,10 +219,7 @@ class PartItem(QGraphicsItem):
 
     ### PUBLIC SUPPORT METHODS ###
     def getVirtualHelixItemByCoord(self, row, column):
-        if (row, column) in self._emptyhelixhash:
-            return self._virtualHelixHash[(row, column)]
-        else:
-            return None
+        return self._virtualHelixHash.get((row, column))
     # end def
 
     def paint(self, painter, option, widget=None):
@@ -261,8 +231,8 @@ class PartItem(QGraphicsItem):
             return
         if self.part().selectAllBehavior():
             return
-        for sh in self._emptyhelixhash.itervalues():
-            sh.setSelected(sh.virtualHelix() in newSel)
+        for vhi in self._virtualHelixHash.itervalues():
+            vhi.setSelected(vhi.virtualHelix() in newSel)
     # end def
 
     def setModifyState(self, bool):
@@ -276,8 +246,16 @@ class PartItem(QGraphicsItem):
         pass  # disabled for now.
         # self.window().statusBar().showMessage(statusString, timeout)
 
+    def virtualHelixItemRemoved(self, coord):
+        """Called by a VirtualHelixItem whose virtual helix was removed."""
+        vhi = self._virtualHelixHash.pop(coord, None)
+        if vhi != None:
+            self._activeSliceItem.virtualHelixItemRemoved(vhi)
+        self._latticeItem.updateCoord(*coord)
+    # end def
+
     def vhAtCoordsChanged(self, row, col):
-        self._emptyhelixhash[(row, col)].update()
+        self._latticeItem.updateCoord(row, col)
     # end def
 
     def zoomToFit(self):
@@ -300,16 +278,9 @@ class PartItem(QGraphicsItem):
             super(PartItem.Deselector, self).__init__()
             self.parentHGI = parentHGI
         def mousePressEvent(self, event):
-            self.parentHGI.part().setSelection(())
+            self.parentHGI.part().document().clearAllSelected()
             super(PartItem.Deselector, self).mousePressEvent(event)
         def boundingRect(self):
             return self.parentHGI.boundingRect()
         def paint(self, painter, option, widget=None):
             pass
-
-
-    class IntersectionProbe(QGraphicsItem):
-        def boundingRect(self):
-            return QRectF(0, 0, .1, .1)
-        def paint(self, painter, option, widget=None):
-            pass
\ No newline at end of file
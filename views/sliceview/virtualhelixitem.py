@@ -60,14 +60,18 @@ class VirtualHelixItem(QGraphicsEllipseItem):
     _font = styles.SLICE_NUM_FONT
     _ZVALUE = styles.ZSLICEHELIX+3
 
-    def __init__(self, modelVirtualHelix, emptyHelixItem):
+    def __init__(self, modelVirtualHelix, partItem):
         """
-        emptyHelixItem is a EmptyHelixItem that will act as a QGraphicsItem parent
+        partItem is a PartItem that will act as a QGraphicsItem parent
         """
-        super(VirtualHelixItem, self).__init__(parent=emptyHelixItem)
+        super(VirtualHelixItem, self).__init__(parent=partItem)
         self._virtualHelix = modelVirtualHelix
-        self._emptyHelixItem = emptyHelixItem
+        self._partItem = partItem
+        self._coord = row, col = modelVirtualHelix.coord()
         self.hide()
+        x, y = partItem.part().latticeCoordToPositionXY(row, col,
+                                                        partItem.scaleFactor())
+        self.setPos(x, y)
         # drawing related
 
         self.isHovered = False
@@ -104,9 +108,10 @@ class VirtualHelixItem(QGraphicsEllipseItem):
     def virtualHelixRemovedSlot(self, virtualHelix):
         self._controller.disconnectSignals()
         self._controller = None
-        self._emptyHelixItem.setNotHovered()
+        self._partItem.latticeItem().setHoveredCoord(None)
+        self._partItem.virtualHelixItemRemoved(self._coord)
         self._virtualHelix = None
-        self._emptyHelixItem = None
+        self._partItem = None
         self.scene().removeItem(self._label)
         self._label = None
         self.scene().removeItem(self)
@@ -177,7 +182,7 @@ class VirtualHelixItem(QGraphicsEllipseItem):
     # end def
 
     def part(self):
-        return self._emptyHelixItem.part()
+        return self._partItem.part()
 
     def virtualHelix(self):
         return self._virtualHelix
@@ -225,14 +230,14 @@ class VirtualHelixItem(QGraphicsEllipseItem):
         """
         # if self.selectAllBehavior():
         #     self.setSelected(True)
-        # forward the event to the emptyHelixItem as well
-        self._emptyHelixItem.hoverEnterEvent(event)
+        # highlight the lattice position under the helix as well
+        self._partItem.latticeItem().setHoveredCoord(self._coord)
     # end def
 
     def hoverLeaveEvent(self, event):
         # if self.selectAllBehavior():
         #     self.setSelected(False)
-        self._emptyHelixItem.hoverEnterEvent(event)
+        self._partItem.latticeItem().setHoveredCoord(None)
     # end def
 
     # def mousePressEvent(self, event):
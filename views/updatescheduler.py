@@ -0,0 +1,90 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+"""
+updatescheduler.py
+
+Coalesces item refreshes requested by model signals. A view root owns
+one UpdateScheduler. Slots call schedule(item, reason) instead of
+rebuilding right away. Once control returns to the event loop, each
+dirty item's applyScheduledUpdates(reasons) is called once with every
+reason recorded for it, so an item touched many times by one command or
+macro is rebuilt only once, before the next repaint.
+"""
+
+import util
+
+# import Qt stuff into the module namespace with PySide, PyQt4 independence
+util.qtWrapImport('QtCore', globals(), ['QTimer'])
+
+
+class UpdateScheduler(object):
+    def __init__(self):
+        self._dirty = {}  # item -> set of reasons
+        self._order = []  # dirty items, in the order first scheduled
+        self._pending = False
+        self.requested = 0  # schedule calls
+        self.applied = 0  # applyScheduledUpdates calls
+    # end def
+
+    def schedule(self, item, reason):
+        """Records that item needs refreshing because of reason."""
+        self.requested += 1
+        reasons = self._dirty.get(item)
+        if reasons == None:
+            self._dirty[item] = set([reason])
+            self._order.append(item)
+        else:
+            reasons.add(reason)
+        if not self._pending:
+            self._pending = True
+            QTimer.singleShot(0, self.flush)
+    # end def
+
+    def isDirty(self, item):
+        return item in self._dirty
+    # end def
+
+    def flush(self):
+        """
+        Applies the pending refreshes now. Items scheduled while flushing
+        are applied in the same pass.
+        """
+        self._pending = False
+        while self._order:
+            order, dirty = self._order, self._dirty
+            self._order, self._dirty = [], {}
+            for item in order:
+                self.applied += 1
+                item.applyScheduledUpdates(dirty[item])
+    # end def
+
+    def avoided(self):
+        """How many requested refreshes were merged into another one."""
+        return self.requested - self.applied - len(self._order)
+    # end def
+
+    def resetCounters(self):
+        self.requested = self.applied = 0
+    # end def
+# end class